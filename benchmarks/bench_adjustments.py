@@ -0,0 +1,69 @@
+"""
+    Stock adjustments of increasing batch sizes against a table of rows cookies: one UPDATE statement per
+    cookie (as in orm_data.py and database_ops.py), and sqlalchemy_core.adjustments.adjust_stock with one
+    executemany UPDATE and with a temporary table joined by one UPDATE. One adjustment in a hundred would
+    take its cookie below zero and is refused.
+
+    python -m benchmarks.bench_adjustments [rows] [repeat]
+"""
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine, update
+
+from benchmarks.bench_orm_scan import load
+from sqlalchemy_core.adjustments import adjust_stock
+from sqlalchemy_orm.models import Cookie
+
+SIZES = (1000, 10000, 50000, 200000)
+
+
+def per_statement(engine, cookies, pairs):
+    applied = 0
+    with engine.begin() as conn:
+        for cookie_id, delta in pairs:
+            u = update(cookies).where(cookies.c.cookie_id == cookie_id)
+            u = u.where(cookies.c.quantity + delta >= 0).values(quantity=cookies.c.quantity + delta)
+            applied += conn.execute(u).rowcount
+    return applied
+
+
+def batched(method):
+    def run(engine, cookies, pairs):
+        return sum(result.applied for result in adjust_stock(engine, cookies, pairs, method=method))
+    return run
+
+
+def main(rows=200000, repeat=3):
+    directory = tempfile.mkdtemp()
+    try:
+        engine = create_engine('sqlite:///' + os.path.join(directory, 'stock.db'))
+        load(engine, rows)
+        cookies = Cookie.__table__
+        randomizer = random.Random(42)
+        print('{:<8} {:<12} {:>9} {:>12} {:>10}'.format('pairs', 'method', 'applied', 'pairs/sec', 'seconds'))
+        for size in SIZES:
+            if size > rows:
+                break
+            pairs = [(cookie_id, -10 ** 6 if randomizer.random() < 0.01 else 5)
+                     for cookie_id in randomizer.sample(range(1, rows + 1), size)]
+            for name, run in (('statement', per_statement), ('executemany', batched('executemany')),
+                              ('temp_table', batched('temp_table'))):
+                best = None
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    applied = run(engine, cookies, pairs)
+                    elapsed = time.perf_counter() - start
+                    best = elapsed if best is None else min(best, elapsed)
+                print('{:<8} {:<12} {:>9} {:>12.0f} {:>10.3f}'.format(size, name, applied, size / best, best))
+        engine.dispose()
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,78 @@
+"""
+    Latency of get_orders_by_customer at 1, 100 and 1000 concurrent coroutines through the
+    executor-backed AsyncDataAccessLayer, and the longest event-loop stall seen meanwhile, compared
+    with calling the blocking function straight from the coroutines.
+
+    python -m benchmarks.bench_async_dal [workers] [users]
+    (workers defaults to one dedicated thread for SQLite)
+"""
+import asyncio
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from testing_database import app
+from testing_database.async_app import adal, get_orders_by_customer
+from testing_database.db import dal
+from benchmarks.bench_dal_pool import load
+from benchmarks.stats import percentile
+
+CONCURRENCY = (1, 100, 1000)
+
+
+async def heartbeat(stalls, interval=0.001):
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        stalls.append(time.perf_counter() - start - interval)
+
+
+async def lookup(name, blocking, start):
+    if blocking:
+        app.get_orders_by_customer(name, details=True)
+    else:
+        await get_orders_by_customer(name, details=True)
+    return time.perf_counter() - start
+
+
+async def run(concurrency, users, blocking):
+    rnd = random.Random(concurrency)
+    stalls = []
+    beat = asyncio.ensure_future(heartbeat(stalls))
+    await asyncio.sleep(0.01)
+    start = time.perf_counter()
+    # latency is measured from the moment all the lookups are issued
+    latencies = await asyncio.gather(*[lookup('user{}'.format(rnd.randint(1, users)), blocking, start)
+                                       for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    # let the heartbeat record the stall it was waiting on before stopping it
+    await asyncio.sleep(0.01)
+    beat.cancel()
+    return latencies, elapsed, max(stalls or [0.0])
+
+
+async def main(workers=None, users=2000):
+    directory = tempfile.mkdtemp()
+    try:
+        await adal.db_init('sqlite:///' + os.path.join(directory, 'cookies.db'), workers=workers)
+        dal.engine.execute('PRAGMA journal_mode=WAL')
+        load(users)
+        print('{:<10} {:>6} {:>10} {:>10} {:>10} {:>12} {:>14}'.format(
+            'mode', 'coros', 'p50 ms', 'p95 ms', 'p99 ms', 'lookups/s', 'max stall ms'))
+        for blocking in (False, True):
+            for concurrency in CONCURRENCY:
+                latencies, elapsed, stall = await run(concurrency, users, blocking)
+                print('{:<10} {:>6} {:>10.2f} {:>10.2f} {:>10.2f} {:>12.0f} {:>14.2f}'.format(
+                    'blocking' if blocking else 'executor', concurrency,
+                    percentile(latencies, 50) * 1000, percentile(latencies, 95) * 1000,
+                    percentile(latencies, 99) * 1000, concurrency / elapsed, stall * 1000))
+        await adal.close()
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    asyncio.get_event_loop().run_until_complete(main(*[int(arg) for arg in sys.argv[1:]]))
@@ -0,0 +1,89 @@
+"""
+    Orders per second written by session.add_all(batch) + session.commit() (one INSERT per order and per
+    line item) and by sqlalchemy_orm.checkout.write_orders(session, batch) + session.commit(), for checkout
+    bursts of increasing size. Every order has 1 to 4 line items; sessions do not expire on commit, so the
+    users and cookies are loaded once.
+
+    python -m benchmarks.bench_checkout [orders] [cookies] [users]
+"""
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+
+from sqlalchemy_orm.checkout import write_orders
+from sqlalchemy_orm.models import Base, Cookie, LineItems, Order, User
+
+BATCH_SIZES = (1, 10, 100, 1000)
+
+
+def load(engine, cookies, users):
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(Cookie.__table__.insert(), [
+            {'cookie_name': 'cookie {}'.format(i), 'cookie_sku': 'SKU{:08d}'.format(i), 'quantity': 10 ** 6,
+             'unit_cost': i % 300 / 100.0} for i in range(cookies)])
+        conn.execute(User.__table__.insert(), [
+            {'username': 'user{}'.format(i), 'email_address': 'user{}@cookie.com'.format(i), 'phone': '111',
+             'password': 'password'} for i in range(users)])
+
+
+def new_orders(count, users, cookies, randomizer):
+    orders = []
+    for _ in range(count):
+        order = Order(user=randomizer.choice(users))
+        for cookie in randomizer.sample(cookies, randomizer.randint(1, 4)):
+            quantity = randomizer.randint(1, 12)
+            order.line_items.append(LineItems(cookie=cookie, quantity=quantity,
+                                              extended_cost=quantity * cookie.unit_cost))
+        orders.append(order)
+    return orders
+
+
+def add_commit(session, batch):
+    session.add_all(batch)
+    session.commit()
+
+
+def batched(session, batch):
+    write_orders(session, batch)
+    session.commit()
+
+
+def main(orders=5000, cookies=1000, users=100):
+    directory = tempfile.mkdtemp()
+    try:
+        engine = create_engine('sqlite:///' + os.path.join(directory, 'checkout.db'))
+        load(engine, cookies, users)
+        Session = sessionmaker(bind=engine, expire_on_commit=False)
+        print('{:<6} {:<13} {:>10} {:>10}'.format('batch', 'method', 'orders/s', 'seconds'))
+        for batch_size in BATCH_SIZES:
+            for name, write in (('add_commit', add_commit), ('write_orders', batched)):
+                session = Session()
+                all_users, all_cookies = session.query(User).all(), session.query(Cookie).all()
+                elapsed = 0.0
+                for seed in range(0, orders, batch_size):
+                    # Order(user=...) cascades the new order into the session, so a burst is built just before
+                    # it is written
+                    batch = new_orders(batch_size, all_users, all_cookies, random.Random(seed))
+                    start = time.perf_counter()
+                    write(session, batch)
+                    elapsed += time.perf_counter() - start
+                session.close()
+                print('{:<6} {:<13} {:>10.0f} {:>10.2f}'.format(batch_size, name, orders / elapsed, elapsed))
+        with engine.connect() as conn:
+            print('{} orders, {} line items written'.format(
+                conn.execute(func.count(Order.__table__.c.order_id)).scalar(),
+                conn.execute(func.count(LineItems.__table__.c.line_items_id)).scalar()))
+        engine.dispose()
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,105 @@
+"""
+    Time and peak traced memory of extracting Chinook invoice lines (InvoiceLine joined with the InvoiceDate of
+    their Invoice) into per-column NumPy arrays: fetchall() of row tuples then one array per column, against
+    sqlalchemy_core.columnar.fetch_arrays (float64 prices, and int64 cents).
+
+    python -m benchmarks.bench_columnar [rows] [chunk_size]    # e.g. 10000000 for a 10M row extract
+"""
+import gc
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import create_engine, select
+
+from generate_models_db.models import Invoice, InvoiceLine
+from sqlalchemy_core.columnar import fetch_arrays
+
+LINES_PER_INVOICE = 5
+
+
+def load(engine, rows):
+    invoices, lines = Invoice.__table__, InvoiceLine.__table__
+    invoices.create(engine)
+    lines.create(engine)
+    start = datetime(2009, 1, 1)
+    with engine.begin() as conn:
+        conn.execute('PRAGMA synchronous=OFF')
+        n_invoices = -(-rows // LINES_PER_INVOICE)
+        for first in range(1, n_invoices + 1, 50000):
+            conn.execute(invoices.insert(), [
+                {'InvoiceId': i, 'CustomerId': 1 + i % 59, 'InvoiceDate': start + timedelta(hours=i), 'Total': 0}
+                for i in range(first, min(n_invoices + 1, first + 50000))])
+        for first in range(1, rows + 1, 50000):
+            conn.execute(lines.insert(), [
+                {'InvoiceLineId': i, 'InvoiceId': 1 + (i - 1) // LINES_PER_INVOICE, 'TrackId': 1 + i * 7919 % 3503,
+                 'UnitPrice': 1.99 if i % 20 == 0 else 0.99, 'Quantity': 1 + i % 3}
+                for i in range(first, min(rows + 1, first + 50000))])
+
+
+def extract_statement():
+    invoices, lines = Invoice.__table__, InvoiceLine.__table__
+    return select([lines.c.InvoiceLineId, lines.c.InvoiceId, lines.c.TrackId, lines.c.UnitPrice,
+                   lines.c.Quantity, invoices.c.InvoiceDate]).select_from(lines.join(invoices))
+
+
+def row_tuples(engine, chunk_size):
+    statement = extract_statement()
+    with engine.connect() as conn:
+        rows = conn.execute(statement).fetchall()
+    dtypes = ['int64', 'int64', 'int64', 'float64', 'int64', 'datetime64[us]']
+    return {column.name: np.array([row[i] for row in rows], dtype=dtype)
+            for i, (column, dtype) in enumerate(zip(statement.inner_columns, dtypes))}
+
+
+def columnar(engine, chunk_size):
+    with engine.connect() as conn:
+        return fetch_arrays(extract_statement(), conn, chunk_size=chunk_size)
+
+
+def columnar_cents(engine, chunk_size):
+    with engine.connect() as conn:
+        return fetch_arrays(extract_statement(), conn, chunk_size=chunk_size, numeric='cents')
+
+
+def measure(engine, extract, chunk_size, trace):
+    gc.collect()
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    arrays = extract(engine, chunk_size)
+    elapsed = time.perf_counter() - start
+    peak = 0
+    if trace:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return arrays, elapsed, peak
+
+
+def main(rows=1000000, chunk_size=100000):
+    directory = tempfile.mkdtemp()
+    try:
+        engine = create_engine('sqlite:///' + os.path.join(directory, 'chinook.db'))
+        load(engine, rows)
+        print('{:<16} {:>10} {:>12} {:>10} {:>12}'.format('extract', 'seconds', 'rows/sec', 'peak MiB',
+                                                          'result MiB'))
+        for name, extract in (('row tuples', row_tuples), ('columnar', columnar),
+                              ('columnar cents', columnar_cents)):
+            arrays, elapsed, _ = measure(engine, extract, chunk_size, trace=False)
+            size = sum(array.nbytes for array in arrays.values())
+            del arrays
+            _, _, peak = measure(engine, extract, chunk_size, trace=True)
+            print('{:<16} {:>10.2f} {:>12.0f} {:>10.1f} {:>12.1f}'.format(
+                name, elapsed, rows / elapsed, peak / 2.0 ** 20, size / 2.0 ** 20))
+        engine.dispose()
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
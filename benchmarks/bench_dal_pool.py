@@ -0,0 +1,67 @@
+"""
+    Concurrent reads through the pooled DataAccessLayer: every thread runs get_orders_by_customer
+    on its own pooled connection against a file-backed SQLite database in WAL mode.
+
+    python -m benchmarks.bench_dal_pool [lookups_per_thread] [max_threads] [users]
+"""
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+from testing_database.datagen import CookieShopData
+from testing_database.db import dal, prep_db
+from testing_database.app import get_orders_by_customer
+
+
+def load(users, orders_per_user=5, items_per_order=3, cookies=100, seed=0):
+    prep_db(CookieShopData(users=users, cookies=cookies, orders=users * orders_per_user,
+                           items_per_order=items_per_order, seed=seed))
+    with dal.connect() as conn:
+        # the join columns are not indexed in the schema; without these every lookup is a scan
+        conn.execute('CREATE INDEX ix_orders_user_id ON orders (user_id)')
+        conn.execute('CREATE INDEX ix_line_items_order_id ON line_items (order_id)')
+
+
+def run(threads, lookups, users):
+    def worker(seed):
+        rnd = random.Random(seed)
+        for _ in range(lookups):
+            get_orders_by_customer('user{}'.format(rnd.randint(1, users)), details=True)
+        dal.release()
+
+    workers = [threading.Thread(target=worker, args=(seed,)) for seed in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return time.perf_counter() - start
+
+
+def main(lookups=2000, max_threads=16, users=2000):
+    directory = tempfile.mkdtemp()
+    try:
+        dal.db_init('sqlite:///' + os.path.join(directory, 'cookies.db'), pool_size=max_threads)
+        dal.engine.execute('PRAGMA journal_mode=WAL')
+        load(users)
+        print('{:>8} {:>12} {:>10} {:>14}'.format('threads', 'lookups/s', 'speedup', 'avg wait ms'))
+        threads, baseline = 1, None
+        while threads <= max_threads:
+            dal._reset_stats()
+            elapsed = run(threads, lookups, users)
+            rate = threads * lookups / elapsed
+            baseline = baseline or rate
+            print('{:>8} {:>12.0f} {:>9.2f}x {:>14.3f}'.format(
+                threads, rate, rate / baseline, dal.pool_status()['avg_wait'] * 1000))
+            threads *= 2
+        dal.engine.dispose()
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,50 @@
+"""
+    Per-call latency of testing_database.app.get_orders_by_customer with the
+    precompiled statement cache against rebuilding and compiling the select on every call.
+
+    python -m benchmarks.bench_get_orders [calls]
+"""
+import sys
+import timeit
+
+from sqlalchemy.sql import select
+
+from testing_database.db import dal, prep_db
+from testing_database.app import get_orders_by_customer
+
+
+def get_orders_by_customer_uncached(cust_name, shipped=None, details=False):
+    columns = [dal.orders.c.order_id, dal.users.c.username, dal.users.c.phone]
+    joins = dal.users.join(dal.orders)
+    if details:
+        columns.extend([dal.cookies.c.cookie_name,
+                        dal.line_items.c.quantity,
+                        dal.line_items.c.extended_cost])
+        joins = joins.join(dal.line_items).join(dal.cookies)
+    cust_orders = select(columns)
+    cust_orders = cust_orders.select_from(joins).where(
+        dal.users.c.username == cust_name)
+    if shipped is not None:
+        cust_orders = cust_orders.where(dal.orders.c.shipped == shipped)
+    result = dal.connection.execute(cust_orders).fetchall()
+    return result
+
+
+def main(calls=5000):
+    dal.db_init('sqlite:///:memory:')
+    prep_db()
+    print('{:<10} {:<8} {:>12} {:>12} {:>8}'.format(
+        'shipped', 'details', 'uncached us', 'cached us', 'saved'))
+    for shipped in (None, True, False):
+        for details in (False, True):
+            args = ('cookiemon', shipped, details)
+            assert get_orders_by_customer(*args) == get_orders_by_customer_uncached(*args)
+            uncached = timeit.timeit(lambda: get_orders_by_customer_uncached(*args), number=calls)
+            cached = timeit.timeit(lambda: get_orders_by_customer(*args), number=calls)
+            print('{!s:<10} {!s:<8} {:>12.1f} {:>12.1f} {:>7.0%}'.format(
+                shipped, details, uncached / calls * 1e6, cached / calls * 1e6,
+                1 - cached / uncached))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,86 @@
+"""
+    Walking a 100K employee org chart (ten reports per manager, six levels) through the ORM relationships,
+    one query per node, against the recursive CTE queries of Employee.subtree/manager_chain/headcounts.
+
+    python -m benchmarks.bench_hierarchy [employees] [calls]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from sqlalchemy_orm.models import Base, Employee
+from benchmarks.stats import summarize
+
+FANOUT = 10
+
+
+def load(engine, size):
+    Base.metadata.create_all(engine)
+    table = Employee.__table__
+    with engine.begin() as conn:
+        conn.execute(table.insert(), [{'id': i, 'manager_id': (i - 2) // FANOUT + 1 if i > 1 else None,
+                                       'name': 'employee {}'.format(i)} for i in range(1, size + 1)])
+        # the recursive step looks up reports by manager_id
+        conn.execute('CREATE INDEX ix_employees_manager_id ON employees (manager_id)')
+
+
+def walk_reports(employee):
+    count = 1
+    for report in employee.reports:
+        count += walk_reports(report)
+    return count
+
+
+def walk_managers(employee):
+    count = 0
+    while employee.manager is not None:
+        employee = employee.manager
+        count += 1
+    return count
+
+
+def timed(session, fn, calls):
+    latencies, rows = [], 0
+    for _ in range(calls):
+        session.expunge_all()
+        start = time.perf_counter()
+        rows += fn()
+        latencies.append(time.perf_counter() - start)
+    return summarize(latencies, rows)
+
+
+def main(size=100000, calls=5):
+    directory = tempfile.mkdtemp()
+    try:
+        engine = create_engine('sqlite:///' + os.path.join(directory, 'employees.db'))
+        load(engine, size)
+        session = sessionmaker(bind=engine)()
+        middle, leaf = 2, size
+        cases = [
+            ('subtree of a manager, reports', lambda: walk_reports(session.query(Employee).get(middle))),
+            ('subtree of a manager, CTE', lambda: Employee.subtree(session, middle).count()),
+            ('whole chart, reports', lambda: walk_reports(session.query(Employee).get(1))),
+            ('whole chart, CTE', lambda: len(Employee.subtree(session, 1).all())),
+            ('manager chain, manager', lambda: walk_managers(session.query(Employee).get(leaf))),
+            ('manager chain, CTE', lambda: len(Employee.manager_chain(session, leaf).all())),
+            ('headcount of a manager, CTE', lambda: len(Employee.headcounts(session, middle))),
+            ('headcount of every manager, CTE', lambda: len(Employee.headcounts(session))),
+        ]
+        print('{:<34} {:>10} {:>10} {:>8}'.format('case', 'p50 ms', 'max ms', 'rows'))
+        for name, fn in cases:
+            result = timed(session, fn, 1 if 'chart' in name or 'every' in name else calls)
+            print('{:<34} {:>10.2f} {:>10.2f} {:>8}'.format(
+                name, result['p50_ms'], result['max_ms'], result['rows'] // result['calls']))
+        session.close()
+        engine.dispose()
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
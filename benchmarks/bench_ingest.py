@@ -0,0 +1,75 @@
+"""
+    Rows/sec and peak traced memory of sqlalchemy_orm.ingest for every write method,
+    streaming a generated supplier feed into a file-backed SQLite database.
+
+    python -m benchmarks.bench_ingest [rows] [chunk_size] [csv|jsonl]
+"""
+import csv
+import json
+import os
+import shutil
+import sys
+import tempfile
+import tracemalloc
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from sqlalchemy_orm.models import Base
+from sqlalchemy_orm.ingest import METHODS, ingest_file
+
+FIELDS = ['cookie_name', 'cookie_recipe_url', 'cookie_sku', 'quantity', 'unit_cost']
+
+
+def write_feed(path, rows):
+    with open(path, 'w', newline='') as f:
+        if path.endswith('.csv'):
+            writer = csv.writer(f)
+            writer.writerow(FIELDS)
+        for i in range(rows):
+            row = ['cookie {}'.format(i), 'http://some.aweso.me/cookie/{}.html'.format(i),
+                   'SKU{:08d}'.format(i), str(i % 500), '{:.2f}'.format(i % 300 / 100.0)]
+            if path.endswith('.csv'):
+                writer.writerow(row)
+            else:
+                f.write(json.dumps(dict(zip(FIELDS, row))) + '\n')
+
+
+def run(directory, feed, method, chunk_size, trace=False):
+    path = os.path.join(directory, '{}.db'.format(method))
+    if os.path.exists(path):
+        os.remove(path)
+    engine = create_engine('sqlite:///' + path)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    if trace:
+        tracemalloc.start()
+    stats = ingest_file(session, feed, method=method, chunk_size=chunk_size)
+    peak = 0
+    if trace:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    session.close()
+    engine.dispose()
+    return stats, peak
+
+
+def main(rows=200000, chunk_size=10000, fmt='csv'):
+    directory = tempfile.mkdtemp()
+    try:
+        feed = os.path.join(directory, 'feed.' + fmt)
+        write_feed(feed, rows)
+        print('{:<22} {:>10} {:>12} {:>14}'.format('method', 'rows', 'rows/sec', 'peak MiB'))
+        for method in METHODS:
+            stats, _ = run(directory, feed, method, chunk_size)
+            # traced separately: tracemalloc slows the ingest down
+            _, peak = run(directory, feed, method, chunk_size, trace=True)
+            print('{:<22} {:>10} {:>12.0f} {:>14.1f}'.format(
+                method, stats.rows, stats.rows_per_sec, peak / 2.0 ** 20))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    main(*([int(arg) for arg in args[:2]] + args[2:]))
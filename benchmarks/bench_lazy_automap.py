@@ -0,0 +1,60 @@
+"""
+    Start-up cost of automap on a SQLite schema of many tables (500 by default, see bench_reflection): the time
+    from nothing to the first query on one class, with Base.prepare(engine, reflect=True) and with
+    lazy_automap_base(), the first time (no cache file) and in a later process (cache file present).
+
+    python -m benchmarks.bench_lazy_automap [tables]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.ext.automap import automap_base
+from sqlalchemy.orm import Session
+
+from benchmarks.bench_reflection import create_schema
+from reflection.lazy_automap import lazy_automap_base
+
+
+def first_query(engine, base, name):
+    cls = getattr(base.classes, name)
+    session = Session(engine)
+    session.query(cls).first()
+    session.close()
+    return base
+
+
+def main(tables=500):
+    directory = tempfile.mkdtemp()
+    try:
+        engine = create_engine('sqlite:///' + os.path.join(directory, 'schema.db'))
+        create_schema(engine, tables)
+        path = os.path.join(directory, 'schema.reflection')
+        # the middle of the schema: references earlier tables and is referenced by later ones
+        name = 't{}'.format(tables // 2)
+
+        def eager():
+            base = automap_base()
+            base.prepare(engine, reflect=True)
+            return base
+
+        print('{:<36} {:>10} {:>8}'.format('case', 'ms', 'mapped'))
+        for case, make in (('prepare(reflect=True)', eager),
+                           ('lazy, no cache', lambda: lazy_automap_base(engine)),
+                           ('lazy, first run (writes the cache)', lambda: lazy_automap_base(engine, path)),
+                           ('lazy, cache file present', lambda: lazy_automap_base(engine, path))):
+            start = time.perf_counter()
+            base = first_query(engine, make(), name)
+            elapsed = time.perf_counter() - start
+            mapped = len(base.classes._data)
+            print('{:<36} {:>10.1f} {:>8}'.format(case, elapsed * 1000, mapped))
+        engine.dispose()
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
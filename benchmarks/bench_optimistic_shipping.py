@@ -0,0 +1,119 @@
+"""
+    Contention harness for optimistic (version_id) shipping.
+
+    A thread pool ships orders that all draw from a handful of cookies in a file-backed SQLite
+    database (WAL, BEGIN IMMEDIATE for writes), and we report throughput and how often a shipper
+    had to retry because another one updated the same cookie first.
+
+    python -m benchmarks.bench_optimistic_shipping [core|orm] [orders] [cookies]
+"""
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm.exc import StaleDataError
+
+WORKERS = (1, 2, 4, 8, 16, 32)
+
+
+def file_engine(path):
+    engine = create_engine('sqlite:///' + path,
+                           connect_args={'timeout': 30,
+                                         'isolation_level': 'IMMEDIATE',
+                                         'check_same_thread': False})
+
+    @event.listens_for(engine, 'connect')
+    def set_wal(dbapi_connection, connection_record):
+        dbapi_connection.execute('PRAGMA journal_mode=WAL')
+
+    return engine
+
+
+def load(engine, tables, n_orders, n_cookies, seed=0):
+    cookies, users, orders, line_items = tables
+    rnd = random.Random(seed)
+    with engine.begin() as conn:
+        conn.execute(users.insert(), username='cookiemon', email_address='mon@cookie.com',
+                     phone='111-111-1111', password='password')
+        conn.execute(cookies.insert(), [{'cookie_name': 'cookie {}'.format(i), 'quantity': 10 ** 9,
+                                         'unit_cost': 0.5, 'version_id': 1}
+                                        for i in range(n_cookies)])
+        conn.execute(orders.insert(), [{'order_id': i + 1, 'user_id': 1, 'shipped': False}
+                                       for i in range(n_orders)])
+        conn.execute(line_items.insert(), [{'order_id': i + 1, 'cookie_id': cookie_id + 1,
+                                            'quantity': rnd.randint(1, 12)}
+                                           for i in range(n_orders)
+                                           for cookie_id in rnd.sample(range(n_cookies),
+                                                                       rnd.randint(1, 3))])
+
+
+def run(mode, workers, n_orders, n_cookies):
+    directory = tempfile.mkdtemp()
+    engine = file_engine(os.path.join(directory, 'shipping.db'))
+    local = threading.local()
+    if mode == 'core':
+        from sqlalchemy_core.shipping import (metadata, cookies, users, orders, line_items,
+                                              ship_it_optimistic)
+        metadata.create_all(engine)
+        load(engine, (cookies, users, orders, line_items), n_orders, n_cookies)
+
+        def ship(order_id):
+            if not hasattr(local, 'conn'):
+                local.conn = engine.connect()
+            stats = {}
+            try:
+                shipped = ship_it_optimistic(order_id, local.conn, max_retries=10, stats=stats)
+            except StaleDataError:
+                shipped = False
+            return shipped, stats.get('conflicts', 0)
+    else:
+        from sqlalchemy_orm.models import Base
+        from sqlalchemy_orm.shipping import ship_it_optimistic
+        Base.metadata.create_all(engine)
+        tables = [Base.metadata.tables[name] for name in ('cookies', 'users', 'orders', 'line_items')]
+        load(engine, tables, n_orders, n_cookies)
+        Session = sessionmaker(bind=engine)
+
+        def ship(order_id):
+            if not hasattr(local, 'session'):
+                local.session = Session()
+            stats = {}
+            try:
+                shipped = ship_it_optimistic(order_id, local.session, max_retries=10, stats=stats)
+            except StaleDataError:
+                local.session.rollback()
+                shipped = False
+            return shipped, stats.get('conflicts', 0)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(ship, range(1, n_orders + 1)))
+    elapsed = time.perf_counter() - start
+    engine.dispose()
+    shutil.rmtree(directory)
+
+    shipped = sum(1 for ok, _ in results if ok)
+    conflicts = sum(conflicts for _, conflicts in results)
+    return shipped, conflicts, elapsed
+
+
+def main(mode='core', n_orders=2000, n_cookies=10):
+    print('{:>8} {:>10} {:>10} {:>12} {:>14}'.format(
+        'workers', 'shipped', 'failed', 'orders/s', 'conflict rate'))
+    for workers in WORKERS:
+        shipped, conflicts, elapsed = run(mode, workers, n_orders, n_cookies)
+        print('{:>8} {:>10} {:>10} {:>12.0f} {:>14.1%}'.format(
+            workers, shipped, n_orders - shipped, n_orders / elapsed,
+            conflicts / float(n_orders + conflicts)))
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    main(*(args[:1] + [int(arg) for arg in args[1:]]))
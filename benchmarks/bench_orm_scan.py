@@ -0,0 +1,76 @@
+"""
+    Time and peak traced memory of a full Cookie scan with .all(), plain query iteration
+    and sqlalchemy_orm.streaming (yield_per + expunge per batch).
+
+    python -m benchmarks.bench_orm_scan [rows] [batch_size]
+"""
+import gc
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from sqlalchemy_orm.models import Base, Cookie
+from sqlalchemy_orm.streaming import stream_cookies
+
+
+def load(engine, rows):
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        for start in range(0, rows, 50000):
+            conn.execute(Cookie.__table__.insert(), [
+                {'cookie_name': 'cookie {}'.format(i), 'cookie_recipe_url': 'http://some.aweso.me/cookie/{}.html'.format(i),
+                 'cookie_sku': 'SKU{:08d}'.format(i), 'quantity': i % 500, 'unit_cost': i % 300 / 100.0}
+                for i in range(start, min(rows, start + 50000))])
+
+
+def scan_all(session, batch_size):
+    return sum(cookie.quantity for cookie in session.query(Cookie).order_by(Cookie.cookie_id).all())
+
+
+def scan_iter(session, batch_size):
+    return sum(cookie.quantity for cookie in session.query(Cookie).order_by(Cookie.cookie_id))
+
+
+def scan_stream(session, batch_size):
+    return sum(cookie.quantity for cookie in stream_cookies(session, batch_size))
+
+
+def measure(Session, scan, batch_size, trace):
+    session = Session()
+    gc.collect()
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    total = scan(session, batch_size)
+    elapsed = time.perf_counter() - start
+    peak = 0
+    if trace:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    session.close()
+    return total, elapsed, peak
+
+
+def main(rows=200000, batch_size=1000):
+    directory = tempfile.mkdtemp()
+    try:
+        engine = create_engine('sqlite:///' + os.path.join(directory, 'scan.db'))
+        load(engine, rows)
+        Session = sessionmaker(bind=engine)
+        print('{:<8} {:>10} {:>12} {:>10}'.format('scan', 'rows/sec', 'seconds', 'peak MiB'))
+        for name, scan in (('all', scan_all), ('iter', scan_iter), ('stream', scan_stream)):
+            total, elapsed, _ = measure(Session, scan, batch_size, trace=False)
+            _, _, peak = measure(Session, scan, batch_size, trace=True)
+            print('{:<8} {:>10.0f} {:>12.2f} {:>10.1f}'.format(name, rows / elapsed, elapsed, peak / 2.0 ** 20))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
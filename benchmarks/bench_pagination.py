@@ -0,0 +1,78 @@
+"""
+    Time per page of OFFSET/LIMIT and keyset pagination (sqlalchemy_core.pagination) at increasing page
+    depths, for session.query(Cookie) and select([cookies]) ordered by (quantity, cookie_id), with an index on
+    (quantity, cookie_id). The token of each keyset page is made beforehand, outside the timing.
+
+    python -m benchmarks.bench_pagination [rows] [page_size] [repeat]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from sqlalchemy import Index, create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.bench_orm_scan import load
+from sqlalchemy_core.pagination import encode_token, keyset_page
+from sqlalchemy_orm.models import Cookie
+
+DEPTHS = (1, 10, 100, 1000, 10000, 40000)
+
+
+def best_of(repeat, run):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = run()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    assert rows, 'empty page'
+    return rows, best
+
+
+def main(rows=1000000, page_size=20, repeat=5):
+    directory = tempfile.mkdtemp()
+    try:
+        engine = create_engine('sqlite:///' + os.path.join(directory, 'pages.db'))
+        load(engine, rows)
+        cookies = Cookie.__table__
+        Index('ix_cookies_quantity_cookie_id', cookies.c.quantity, cookies.c.cookie_id).create(engine)
+        session = sessionmaker(bind=engine)()
+        conn = engine.connect()
+        orm_ordering = [Cookie.quantity, Cookie.cookie_id]
+        core_ordering = [cookies.c.quantity, cookies.c.cookie_id]
+        print('{:<6} {:>7} {:>12} {:>12}'.format('api', 'page', 'offset ms', 'keyset ms'))
+        for depth in DEPTHS:
+            offset = (depth - 1) * page_size
+            if offset >= rows:
+                break
+            token = None
+            if depth > 1:
+                last = session.query(Cookie.quantity, Cookie.cookie_id).order_by(*orm_ordering).offset(
+                    offset - 1).first()
+                token = encode_token(orm_ordering, list(last))
+            runs = (
+                ('orm',
+                 lambda: session.query(Cookie).order_by(*orm_ordering).offset(offset).limit(page_size).all(),
+                 lambda: keyset_page(session.query(Cookie), orm_ordering, page_size, token).rows),
+                ('core',
+                 lambda: conn.execute(select([cookies]).order_by(*core_ordering).offset(offset).limit(
+                     page_size)).fetchall(),
+                 lambda: keyset_page(select([cookies]), core_ordering, page_size, token, conn).rows))
+            for api, by_offset, by_keyset in runs:
+                offset_rows, offset_time = best_of(repeat, by_offset)
+                keyset_rows, keyset_time = best_of(repeat, by_keyset)
+                assert [row.cookie_id for row in offset_rows] == [row.cookie_id for row in keyset_rows]
+                session.expunge_all()
+                print('{:<6} {:>7} {:>12.2f} {:>12.2f}'.format(api, depth, offset_time * 1000, keyset_time * 1000))
+        conn.close()
+        session.close()
+        engine.dispose()
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,69 @@
+"""
+    Hydration time and memory per row of a Cookie listing, as ORM entities (query.all()) and as read models
+    (sqlalchemy_orm.read_models.read_all), for the same query. Memory is what the list of results keeps
+    alive (traced by tracemalloc), divided by the number of rows.
+
+    python -m benchmarks.bench_read_models [rows]
+"""
+import gc
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.bench_orm_scan import load
+from sqlalchemy_orm.models import Cookie
+from sqlalchemy_orm.read_models import read_all
+
+
+def entities(session):
+    return session.query(Cookie).order_by(Cookie.cookie_id).all()
+
+
+def read_models(session):
+    return read_all(session.query(Cookie).order_by(Cookie.cookie_id))
+
+
+def measure(Session, listing, trace):
+    session = Session()
+    gc.collect()
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    rows = listing(session)
+    elapsed = time.perf_counter() - start
+    retained = 0
+    if trace:
+        gc.collect()
+        retained = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+    count = len(rows)
+    del rows
+    session.close()
+    return count, elapsed, retained
+
+
+def main(rows=1000000):
+    directory = tempfile.mkdtemp()
+    try:
+        engine = create_engine('sqlite:///' + os.path.join(directory, 'listing.db'))
+        load(engine, rows)
+        Session = sessionmaker(bind=engine)
+        print('{:<12} {:>10} {:>10} {:>12} {:>12}'.format('listing', 'seconds', 'rows/sec', 'us/row', 'bytes/row'))
+        for name, listing in (('entities', entities), ('read models', read_models)):
+            count, elapsed, _ = measure(Session, listing, trace=False)
+            _, _, retained = measure(Session, listing, trace=True)
+            print('{:<12} {:>10.2f} {:>10.0f} {:>12.2f} {:>12.0f}'.format(
+                name, elapsed, count / elapsed, elapsed / count * 1e6, retained / count))
+        engine.dispose()
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,75 @@
+"""
+    Start-up cost of reflecting a SQLite schema of many tables (500 by default, ten columns, an index and up to
+    two foreign keys each): plain metadata.reflect() against the ReflectionCache when the schema is unchanged,
+    when one table changed, and when only one table (and what it references) is needed.
+
+    python -m benchmarks.bench_reflection [tables]
+"""
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from sqlalchemy import MetaData, create_engine
+
+from reflection.reflection_cache import ReflectionCache
+
+
+def create_schema(engine, tables, seed=0):
+    rnd = random.Random(seed)
+    with engine.begin() as conn:
+        for i in range(tables):
+            columns = ['id INTEGER PRIMARY KEY'] + ['c{} VARCHAR(50)'.format(c) for c in range(7)]
+            parents = rnd.sample(range(i), min(i, 2))
+            columns.extend('t{0}_id INTEGER REFERENCES t{0} (id)'.format(parent) for parent in parents)
+            conn.execute('CREATE TABLE t{} ({})'.format(i, ', '.join(columns)))
+            conn.execute('CREATE INDEX ix_t{0}_c0 ON t{0} (c0)'.format(i))
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main(tables=500):
+    directory = tempfile.mkdtemp()
+    try:
+        engine = create_engine('sqlite:///' + os.path.join(directory, 'schema.db'))
+        create_schema(engine, tables)
+        path = os.path.join(directory, 'schema.reflection')
+
+        def plain():
+            metadata = MetaData()
+            metadata.reflect(bind=engine)
+            return metadata
+
+        def cached(only=None):
+            cache = ReflectionCache(path)
+            cache.reflect(engine, only=only)
+            return cache
+
+        print('{:<34} {:>10} {:>10}'.format('case', 'ms', 'inspected'))
+        elapsed, metadata = timed(plain)
+        print('{:<34} {:>10.1f} {:>10}'.format('metadata.reflect()', elapsed * 1000, len(metadata.tables)))
+        for name, change in (('cache, first run', None),
+                             ('cache, unchanged', None),
+                             ('cache, one leaf table altered', 'ALTER TABLE t{} ADD COLUMN extra INTEGER'.format(
+                                 tables - 1)),
+                             ('cache, one root table altered', 'ALTER TABLE t0 ADD COLUMN extra INTEGER'),
+                             ('cache, unchanged again', None)):
+            if change:
+                engine.execute(change)
+            elapsed, cache = timed(cached)
+            print('{:<34} {:>10.1f} {:>10}'.format(name, elapsed * 1000, len(cache.inspected)))
+        elapsed, cache = timed(lambda: cached(only=['t{}'.format(tables - 1)]))
+        print('{:<34} {:>10.1f} {:>10}'.format('cache, unchanged, one table', elapsed * 1000, len(cache.inspected)))
+        engine.dispose()
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
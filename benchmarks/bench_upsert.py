@@ -0,0 +1,98 @@
+"""
+    Nightly catalogue sync: rows cookies, half of them already in a table of rows cookies, written by
+    sqlalchemy_core.upsert (INSERT ... ON CONFLICT DO UPDATE per chunk), by a Core two pass sync (select the
+    existing SKUs of a chunk, executemany the INSERTs and the UPDATEs) and by the ORM (query each SKU, update
+    the Cookie or add a new one). Every method starts from a copy of the same database.
+
+    python -m benchmarks.bench_upsert [rows]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from sqlalchemy import bindparam, create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from sqlalchemy_core.upsert import upsert
+from sqlalchemy_orm.ingest import chunked
+from sqlalchemy_orm.models import Base, Cookie
+
+
+def catalogue(numbers, quantity):
+    return [{'cookie_name': 'cookie {}'.format(i), 'cookie_sku': 'SKU{:08d}'.format(i), 'quantity': quantity,
+             'unit_cost': i % 300 / 100.0} for i in numbers]
+
+
+def sync_upsert(engine, rows):
+    stats = upsert(engine, Cookie, rows, rules={'quantity': 'add'})
+    return stats.inserted, stats.updated
+
+
+def sync_two_pass(engine, rows):
+    cookies = Cookie.__table__
+    update = cookies.update().where(cookies.c.cookie_sku == bindparam('sku')).values(
+        cookie_name=bindparam('cookie_name'), quantity=cookies.c.quantity + bindparam('quantity'),
+        unit_cost=bindparam('unit_cost'), version_id=cookies.c.version_id + 1)
+    inserted = updated = 0
+    with engine.begin() as conn:
+        for chunk in chunked(rows, 900):
+            existing = {sku for sku, in conn.execute(select([cookies.c.cookie_sku]).where(
+                cookies.c.cookie_sku.in_([row['cookie_sku'] for row in chunk])))}
+            new = [row for row in chunk if row['cookie_sku'] not in existing]
+            old = [dict(row, sku=row['cookie_sku']) for row in chunk if row['cookie_sku'] in existing]
+            if new:
+                conn.execute(cookies.insert(), new)
+            if old:
+                conn.execute(update, old)
+            inserted += len(new)
+            updated += len(old)
+    return inserted, updated
+
+
+def sync_orm(engine, rows):
+    session = sessionmaker(bind=engine)()
+    inserted = updated = 0
+    for row in rows:
+        cookie = session.query(Cookie).filter(Cookie.cookie_sku == row['cookie_sku']).first()
+        if cookie is None:
+            session.add(Cookie(row['cookie_name'], sku=row['cookie_sku'], quantity=row['quantity'],
+                               unit_cost=row['unit_cost']))
+            inserted += 1
+        else:
+            cookie.cookie_name, cookie.unit_cost = row['cookie_name'], row['unit_cost']
+            cookie.quantity += row['quantity']
+            updated += 1
+    session.commit()
+    session.close()
+    return inserted, updated
+
+
+def main(rows=100000):
+    directory = tempfile.mkdtemp()
+    try:
+        base = os.path.join(directory, 'base.db')
+        engine = create_engine('sqlite:///' + base)
+        Base.metadata.create_all(engine)
+        with engine.begin() as conn:
+            conn.execute(Cookie.__table__.insert(), catalogue(range(rows), 100))
+        engine.dispose()
+        sync = catalogue(range(rows // 2, rows // 2 + rows), 5)
+        print('{:<10} {:>10} {:>10} {:>12} {:>10}'.format('method', 'inserted', 'updated', 'rows/sec', 'seconds'))
+        for name, run in (('upsert', sync_upsert), ('two_pass', sync_two_pass), ('orm', sync_orm)):
+            path = os.path.join(directory, name + '.db')
+            shutil.copy(base, path)
+            engine = create_engine('sqlite:///' + path)
+            start = time.perf_counter()
+            inserted, updated = run(engine, sync)
+            elapsed = time.perf_counter() - start
+            engine.dispose()
+            print('{:<10} {:>10} {:>10} {:>12.0f} {:>10.2f}'.format(
+                name, inserted, updated, len(sync) / elapsed, elapsed))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,77 @@
+"""
+    Nightly valuation of a generated cookie shop (testing_database.datagen): per cookie value and totals of
+    the inventory, per order cost and extended_cost reconciliation of the line items, done by
+    sqlalchemy_core.valuation (columnar chunks, NumPy, integer cents) and by the equivalent SQL aggregations
+    (fetching the per cookie values, the per order costs and the mismatched line items).
+
+    python -m benchmarks.bench_valuation [cookies] [orders] [chunk_size]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from sqlalchemy import Integer, cast, create_engine, func, select
+
+from sqlalchemy_core.inventory_totals import recompute
+from sqlalchemy_core.valuation import value_inventory, value_line_items
+from testing_database.datagen import CookieShopData, load
+from testing_database.db import DataAccessLayer
+
+# one line item in a thousand has a hand-entered extended_cost that is off by a cent
+DRIFT_EVERY = 1000
+
+
+def cents(expression):
+    return cast(func.round(expression * 100), Integer())
+
+
+def sql_valuation(conn, cookies, line_items):
+    values = conn.execute(select([cookies.c.cookie_id,
+                                  cents(func.coalesce(cookies.c.quantity, 0) *
+                                        func.coalesce(cookies.c.unit_cost, 0))])).fetchall()
+    totals = recompute(conn, cookies)
+    join = line_items.join(cookies, line_items.c.cookie_id == cookies.c.cookie_id)
+    expected = cents(line_items.c.quantity * cookies.c.unit_cost)
+    recorded = cents(line_items.c.extended_cost)
+    orders = conn.execute(select([line_items.c.order_id, func.sum(expected)]).select_from(join).group_by(
+        line_items.c.order_id)).fetchall()
+    mismatched = conn.execute(select([line_items.c.line_items_id, recorded - expected]).select_from(join).where(
+        recorded != expected)).fetchall()
+    sums = conn.execute(select([func.sum(expected), func.sum(recorded)]).select_from(join)).first()
+    return len(values), totals['inventory_value_cents'], len(orders), len(mismatched), tuple(sums)
+
+
+def numpy_valuation(conn, cookies, line_items, chunk_size):
+    inventory = value_inventory(conn, cookies, chunk_size)
+    lines = value_line_items(conn, line_items, cookies, chunk_size)
+    return (len(inventory.value_cents), inventory.totals['inventory_value_cents'], len(lines.order_id),
+            len(lines.mismatched), (lines.expected_cents, lines.recorded_cents))
+
+
+def main(cookies=1000000, orders=500000, chunk_size=100000):
+    directory = tempfile.mkdtemp()
+    try:
+        engine = create_engine('sqlite:///' + os.path.join(directory, 'shop.db'))
+        dal = DataAccessLayer()
+        dal.metadata.create_all(engine)
+        with engine.connect() as conn:
+            counts = load(conn, dal.metadata, CookieShopData(users=orders // 10, cookies=cookies, orders=orders))
+            conn.execute(dal.line_items.update().where(dal.line_items.c.line_items_id % DRIFT_EVERY == 0).values(
+                extended_cost=dal.line_items.c.extended_cost + 0.01))
+        print('{} cookies, {} line items'.format(counts['cookies'], counts['line_items']))
+        print('{:<8} {:>10}  {}'.format('method', 'seconds', '(cookies, value cents, orders, mismatched, sums)'))
+        with engine.connect() as conn:
+            for name, run in (('sql', lambda: sql_valuation(conn, dal.cookies, dal.line_items)),
+                              ('numpy', lambda: numpy_valuation(conn, dal.cookies, dal.line_items, chunk_size))):
+                start = time.perf_counter()
+                result = run()
+                print('{:<8} {:>10.2f}  {}'.format(name, time.perf_counter() - start, result))
+        engine.dispose()
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
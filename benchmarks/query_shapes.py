@@ -0,0 +1,253 @@
+"""
+    Benchmark suite for the query shapes of sqlalchemy_core/database_ops.py and sqlalchemy_orm/orm_data.py.
+
+    Every shape runs in its Core form and its ORM form against the same file-backed SQLite database,
+    loaded with `size` cookies (and proportional users, orders, line items and employees), and records
+    latency percentiles and rows/sec. Results can be written as JSON and compared between commits:
+
+    python -m benchmarks.query_shapes --sizes 1000,100000 --output before.json
+    python -m benchmarks.query_shapes --sizes 1000,100000 --output after.json
+    python -m benchmarks.query_shapes --compare before.json after.json
+
+    Databases are kept in --db-dir (a temporary directory by default) and reused when they exist,
+    which matters for the 10M row sizes.
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from sqlalchemy import create_engine, select, update, delete, desc, func, cast, and_, or_, Numeric
+from sqlalchemy.orm import sessionmaker, aliased
+
+from sqlalchemy_orm.models import Base, Cookie, User, Order, LineItems, Employee
+from benchmarks.stats import summarize, run_metadata
+
+cookies = Cookie.__table__
+users = User.__table__
+orders = Order.__table__
+line_items = LineItems.__table__
+employees = Employee.__table__
+manager = employees.alias('manager')
+Manager = aliased(Employee, name='manager')
+
+FLAVOURS = ['chocolate chip', 'dark chocolate chip', 'peanut butter', 'oatmeal raisin', 'molasses']
+CHUNK = 50000
+
+
+def load(engine, size):
+    """Deterministically load `size` cookies and size/10 users, size/2 orders, size line items
+    and size/10 employees (ten reports per manager)."""
+    n_users = max(10, size // 10)
+    n_orders = max(10, size // 2)
+    n_employees = max(10, size // 10)
+    Base.metadata.create_all(engine)
+
+    def chunks(n, row):
+        for start in range(0, n, CHUNK):
+            yield [row(i) for i in range(start, min(n, start + CHUNK))]
+
+    with engine.begin() as conn:
+        for chunk in chunks(size, lambda i: {
+                'cookie_name': '{} {}'.format(FLAVOURS[i % len(FLAVOURS)], i),
+                'cookie_recipe_url': 'http://some.aweso.me/cookie/{}.html'.format(i),
+                'cookie_sku': 'SKU{:08d}'.format(i),
+                'quantity': i * 7 % 150,
+                'unit_cost': i % 300 / 100.0}):
+            conn.execute(cookies.insert(), chunk)
+        for chunk in chunks(n_users, lambda i: {
+                'username': 'user{}'.format(i), 'email_address': 'user{}@cookie.com'.format(i),
+                'phone': '111-111-1111', 'password': 'password'}):
+            conn.execute(users.insert(), chunk)
+        for chunk in chunks(n_orders, lambda i: {
+                'order_id': i + 1, 'user_id': i * 7919 % n_users + 1, 'shipped': i % 3 == 0}):
+            conn.execute(orders.insert(), chunk)
+        for chunk in chunks(size, lambda i: {
+                'order_id': i % n_orders + 1, 'cookie_id': i * 104729 % size + 1,
+                'quantity': i % 12 + 1, 'extended_cost': (i % 12 + 1) * 0.5}):
+            conn.execute(line_items.insert(), chunk)
+        for chunk in chunks(n_employees, lambda i: {
+                'id': i + 1, 'manager_id': (i - 1) // 10 + 1 if i else None,
+                'name': 'employee {}'.format(i)}):
+            conn.execute(employees.insert(), chunk)
+
+
+def rolled_back(conn, statement):
+    transaction = conn.begin()
+    rowcount = conn.execute(statement).rowcount
+    transaction.rollback()
+    return rowcount
+
+
+def orm_rolled_back(session, fn):
+    rowcount = fn()
+    session.rollback()
+    return rowcount
+
+
+"""
+    Every shape is a pair of callables (Core form, ORM form) returning the number of rows fetched
+    or changed; P holds the parameters they use.
+"""
+
+P = {'username': 'user42', 'cookie_name': 'chocolate chip 0', 'manager': 'employee 0'}
+
+SHAPES = {
+    'like_filter': (
+        lambda conn: len(conn.execute(select([cookies]).where(
+            cookies.c.cookie_name.like('%chocolate%')).where(cookies.c.quantity == 12)).fetchall()),
+        lambda session: len(session.query(Cookie).filter(
+            Cookie.cookie_name.like('%chocolate%'), Cookie.quantity == 12).all())),
+    'between_or_contains': (
+        lambda conn: len(conn.execute(select([cookies]).where(or_(
+            cookies.c.quantity.between(10, 50), cookies.c.cookie_name.contains('chip')))).fetchall()),
+        lambda session: len(session.query(Cookie).filter(or_(
+            Cookie.quantity.between(10, 50), Cookie.cookie_name.contains('chip'))).all())),
+    'and_filter': (
+        lambda conn: len(conn.execute(select([cookies]).where(and_(
+            cookies.c.quantity > 23, cookies.c.unit_cost < 0.40))).fetchall()),
+        lambda session: len(session.query(Cookie).filter(
+            Cookie.quantity > 23, Cookie.unit_cost < 0.40).all())),
+    'inv_cost_cast': (
+        lambda conn: len(conn.execute(select([
+            cookies.c.cookie_name,
+            cast((cookies.c.quantity * cookies.c.unit_cost), Numeric(12, 2)).label('inv_cost')])).fetchall()),
+        lambda session: len(session.query(
+            Cookie.cookie_name,
+            cast((Cookie.quantity * Cookie.unit_cost), Numeric(12, 2)).label('inv_cost')).all())),
+    'sku_concat': (
+        lambda conn: len(conn.execute(select([
+            cookies.c.cookie_name, 'SKU-' + cookies.c.cookie_sku])).fetchall()),
+        lambda session: len(session.query(Cookie.cookie_name, 'SKU-' + Cookie.cookie_sku).all())),
+    'order_by_desc_limit': (
+        lambda conn: len(conn.execute(select([cookies.c.cookie_name, cookies.c.quantity]).order_by(
+            desc(cookies.c.quantity)).limit(2)).fetchall()),
+        lambda session: len(session.query(Cookie).order_by(desc(Cookie.quantity)).limit(2).all())),
+    'sum_count': (
+        lambda conn: len(conn.execute(select([func.sum(cookies.c.quantity),
+                                              func.count(cookies.c.cookie_name)])).fetchall()),
+        lambda session: len(session.query(func.sum(Cookie.quantity),
+                                          func.count(Cookie.cookie_name)).all())),
+    'three_way_join': (
+        lambda conn: len(conn.execute(select([
+            orders.c.order_id, users.c.username, users.c.phone, cookies.c.cookie_name,
+            line_items.c.quantity, line_items.c.extended_cost]).select_from(
+            users.join(orders).join(line_items).join(cookies)).where(
+            users.c.username == P['username'])).fetchall()),
+        lambda session: len(session.query(
+            Order.order_id, User.username, User.phone, Cookie.cookie_name,
+            LineItems.quantity, LineItems.extended_cost).join(User).join(LineItems).join(Cookie).filter(
+            User.username == P['username']).all())),
+    'outerjoin_group_by': (
+        lambda conn: len(conn.execute(select([users.c.username, func.count(orders.c.order_id)]).select_from(
+            users.outerjoin(orders)).group_by(users.c.username)).fetchall()),
+        lambda session: len(session.query(User.username, func.count(Order.order_id)).outerjoin(
+            Order).group_by(User.username).all())),
+    'employee_alias': (
+        lambda conn: len(conn.execute(select([employees.c.name]).where(and_(
+            employees.c.manager_id == manager.c.id, manager.c.name == P['manager']))).fetchall()),
+        lambda session: len(session.query(Employee.name).join(Manager, Employee.manager).filter(
+            Manager.name == P['manager']).all())),
+    'update_quantity': (
+        lambda conn: rolled_back(conn, update(cookies).where(
+            cookies.c.cookie_name == P['cookie_name']).values(quantity=cookies.c.quantity + 120)),
+        lambda session: orm_rolled_back(session, lambda: session.query(Cookie).filter(
+            Cookie.cookie_name == P['cookie_name']).update(
+            {Cookie.quantity: Cookie.quantity - 20}, synchronize_session=False))),
+    'delete_by_name': (
+        lambda conn: rolled_back(conn, delete(cookies).where(cookies.c.cookie_name.like('molasses%'))),
+        lambda session: orm_rolled_back(session, lambda: session.query(Cookie).filter(
+            Cookie.cookie_name.like('molasses%')).delete(synchronize_session=False))),
+}
+
+
+def run_shape(fn, target, calls, warmup):
+    for _ in range(warmup):
+        fn(target)
+    latencies, rows = [], 0
+    for _ in range(calls):
+        start = time.perf_counter()
+        rows += fn(target)
+        latencies.append(time.perf_counter() - start)
+    return summarize(latencies, rows)
+
+
+def run(sizes, shapes, calls, warmup, db_dir):
+    results = []
+    for size in sizes:
+        path = os.path.join(db_dir, 'shapes_{}.db'.format(size))
+        fresh = not os.path.exists(path)
+        engine = create_engine('sqlite:///' + path)
+        if fresh:
+            start = time.perf_counter()
+            load(engine, size)
+            print('loaded size {} in {:.1f}s'.format(size, time.perf_counter() - start))
+        session = sessionmaker(bind=engine)()
+        with engine.connect() as conn:
+            for name in shapes:
+                core, orm = SHAPES[name]
+                for form, fn, target in (('core', core, conn), ('orm', orm, session)):
+                    result = run_shape(fn, target, calls, warmup)
+                    result.update(shape=name, form=form, size=size)
+                    results.append(result)
+                    print('{:>9} {:<20} {:<5} {:>9.2f} {:>9.2f} {:>9.2f} {:>13.0f}'.format(
+                        size, name, form, result['p50_ms'], result['p95_ms'], result['p99_ms'],
+                        result['rows_per_sec']))
+                    session.expunge_all()
+        session.close()
+        engine.dispose()
+    return results
+
+
+def compare(before_path, after_path):
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+    key = lambda result: (result['size'], result['shape'], result['form'])
+    baseline = {key(result): result for result in before['results']}
+    print('{} -> {}'.format(before['metadata']['commit'], after['metadata']['commit']))
+    print('{:>9} {:<20} {:<5} {:>12} {:>12} {:>8}'.format('size', 'shape', 'form', 'p50 before', 'p50 after',
+                                                        'change'))
+    for result in after['results']:
+        old = baseline.get(key(result))
+        if old is None:
+            continue
+        print('{:>9} {:<20} {:<5} {:>12.2f} {:>12.2f} {:>+8.0%}'.format(
+            result['size'], result['shape'], result['form'], old['p50_ms'], result['p50_ms'],
+            result['p50_ms'] / old['p50_ms'] - 1 if old['p50_ms'] else 0.0))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1000,10000,100000',
+                        help='comma separated numbers of cookies, e.g. 1000,1000000,10000000')
+    parser.add_argument('--shapes', default=','.join(SHAPES), help='comma separated shape names')
+    parser.add_argument('--calls', type=int, default=20)
+    parser.add_argument('--warmup', type=int, default=2)
+    parser.add_argument('--db-dir', help='where to keep (and reuse) the loaded databases')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'), help='compare two result files')
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    db_dir = args.db_dir or tempfile.mkdtemp()
+    try:
+        print('{:>9} {:<20} {:<5} {:>9} {:>9} {:>9} {:>13}'.format(
+            'size', 'shape', 'form', 'p50 ms', 'p95 ms', 'p99 ms', 'rows/sec'))
+        results = run([int(size) for size in args.sizes.split(',')], args.shapes.split(','),
+                      args.calls, args.warmup, db_dir)
+    finally:
+        if not args.db_dir:
+            shutil.rmtree(db_dir)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'metadata': run_metadata(), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
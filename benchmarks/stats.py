@@ -0,0 +1,42 @@
+"""
+    Helpers shared by the benchmarks: latency percentiles and machine readable run metadata.
+"""
+import platform
+import sqlite3
+import subprocess
+import time
+
+import sqlalchemy
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100.0 * (len(values) - 1))))]
+
+
+def summarize(latencies, rows):
+    """Latency percentiles in milliseconds and rows/sec for a list of per-call latencies in seconds."""
+    total = sum(latencies)
+    return {'calls': len(latencies),
+            'rows': rows,
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p95_ms': percentile(latencies, 95) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000,
+            'max_ms': max(latencies) * 1000,
+            'rows_per_sec': rows / total if total else 0.0}
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'],
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_metadata():
+    return {'commit': git_commit(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'sqlalchemy': sqlalchemy.__version__,
+            'sqlite': sqlite3.sqlite_version}
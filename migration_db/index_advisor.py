@@ -0,0 +1,295 @@
+import argparse
+import os
+import re
+import time
+from collections import namedtuple
+
+from sqlalchemy import inspect, select, func, and_, desc, text
+
+from sqlalchemy_core.instrumentation import Instrumentation
+
+"""
+    :Index advisor
+    Only the columns declared with index=True (and primary and unique keys) are indexed, so most joins and
+    filters of the cookie shop scan whole tables. advise() finds the missing indexes from a workload, a callable
+    that runs the queries of interest against the engine:
+
+    1- run the workload under Instrumentation, which records the EXPLAIN QUERY PLAN of every statement;
+    2- for every table the plans SCAN (or build an AUTOMATIC index on) and every TEMP B-TREE, propose indexes
+       from the columns the statement filters, joins, ranges and orders on, plain and covering;
+    3- create all of them, run the workload again and keep only the indexes the planner actually uses,
+       repeating until no new index is proposed;
+    4- time the workload before and after, per statement.
+
+    The database is left as it was unless apply=True. write_revision() turns the indexes into an Alembic
+    revision with op.create_index/op.drop_index:
+
+    python -m migration_db.index_advisor --scale 10
+    python -m migration_db.index_advisor --url sqlite:///cookies.db --revision-dir migration_db/alembic
+
+    The candidates come from the SQL text, which SQLAlchemy always renders with table qualified columns,
+    and the plans are SQLite's: other databases would need their own plan parsing.
+"""
+
+ALEMBIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'alembic')
+
+_QUALIFIED = re.compile(r'\b(\w+)\.(\w+)\b')
+_ALIAS = re.compile(r'\b(\w+) AS (\w+)\b')
+_PARAM = r'(?:\?|:\w+|%\(\w+\)s|%s)'
+_EQUALS = re.compile(r'\b(\w+)\.(\w+)\s*(?:=\s*' + _PARAM + r'|IN\s*\(|IS\s+(?:NOT\s+)?NULL)')
+_JOIN = re.compile(r'\b(\w+)\.(\w+)\s*=\s*(\w+)\.(\w+)\b')
+_RANGE = re.compile(r'\b(\w+)\.(\w+)\s*(?:<|>|BETWEEN\b)')
+_CLAUSE = re.compile(r'\b(ORDER|GROUP) BY (.*?)(?=\bLIMIT\b|\bOFFSET\b|\bHAVING\b|\bORDER BY\b|$)')
+# SQLite before 3.36 writes SCAN TABLE orders (AS o) where newer versions write SCAN o
+_SCAN = re.compile(r'\bSCAN (?:TABLE )?(?!TABLE\b)(\w+)\b(?!(?: AS \w+)? USING (?:COVERING )?INDEX)')
+_AUTOMATIC = re.compile(r'\bSEARCH (?:TABLE )?(\w+)(?: AS \w+)? USING AUTOMATIC (?:PARTIAL )?(?:COVERING )?INDEX')
+_TEMP_B_TREE = re.compile(r'\bUSE TEMP B-TREE FOR (ORDER|GROUP) BY')
+_USING_INDEX = re.compile(r'\bUSING (?:COVERING )?INDEX (\w+)')
+
+MAX_COLUMNS = 5
+MAX_ROUNDS = 3
+
+
+class Index(namedtuple('Index', 'table columns')):
+
+    @property
+    def name(self):
+        return 'ix_{}_{}'.format(self.table, '_'.join(self.columns))
+
+    def create(self, conn):
+        conn.execute('CREATE INDEX {} ON {} ({})'.format(self.name, self.table, ', '.join(self.columns)))
+
+    def drop(self, conn):
+        conn.execute('DROP INDEX {}'.format(self.name))
+
+
+Advice = namedtuple('Advice', 'indexes before after')
+
+
+class Statement:
+    """The columns one SQL statement filters, joins, ranges and orders on, per table."""
+
+    def __init__(self, sql, tables):
+        self.sql = sql
+        self.aliases = {alias: table for table, alias in _ALIAS.findall(sql) if table in tables}
+        self.aliases.update((table, table) for table in tables)
+        self.equals = self._columns(_EQUALS.findall(sql))
+        self.joins = self._columns(pair for join in _JOIN.findall(sql) for pair in (join[:2], join[2:]))
+        self.ranges = self._columns(_RANGE.findall(sql))
+        self.ordered = self._columns(column for _, clause in _CLAUSE.findall(sql)
+                                     for column in _QUALIFIED.findall(clause))
+        self.referenced = self._columns(_QUALIFIED.findall(sql))
+
+    def _columns(self, pairs):
+        columns = {}
+        for name, column in pairs:
+            table = self.aliases.get(name)
+            if table is not None and column not in columns.setdefault(table, []):
+                columns[table].append(column)
+        return columns
+
+    def flagged_tables(self, plan):
+        """Tables scanned (or given a throwaway AUTOMATIC index) by the plan, or sorted in a TEMP B-TREE."""
+        flagged = [self.aliases[name] for name in _SCAN.findall(plan) + _AUTOMATIC.findall(plan)
+                   if name in self.aliases]
+        if _TEMP_B_TREE.search(plan):
+            flagged.extend(self.ordered)
+        return list(dict.fromkeys(flagged))
+
+    def candidates(self, table):
+        equals = [column for column in self.equals.get(table, []) if column not in self.joins.get(table, [])]
+        keys = []
+        for join in self.joins.get(table, []):
+            # join column first, so the same index also serves the variants without the filters
+            keys.append([join] + equals)
+        if equals:
+            keys.append(equals + self.ranges.get(table, [])[:1])
+            keys.append(equals + self.ordered.get(table, []))
+        elif not keys:
+            keys.append(self.ranges.get(table, [])[:1] or self.ordered.get(table, []))
+        candidates = []
+        for key in keys:
+            key = list(dict.fromkeys(key))
+            if not key:
+                continue
+            candidates.append(Index(table, tuple(key)))
+            covering = key + [column for column in self.referenced.get(table, []) if column not in key]
+            if len(key) < len(covering) <= MAX_COLUMNS:
+                candidates.append(Index(table, tuple(covering)))
+        return candidates
+
+
+def existing_keys(engine, table):
+    """Column lists that are already indexed on table, including the primary key."""
+    inspector = inspect(engine)
+    keys = [tuple(index['column_names']) for index in inspector.get_indexes(table)]
+    keys.append(tuple(inspector.get_pk_constraint(table)['constrained_columns']))
+    keys.extend(tuple(unique['column_names']) for unique in inspector.get_unique_constraints(table))
+    return keys
+
+
+def record(engine, workload, repeat=1, explain=True):
+    """Run the workload `repeat` times and return the per statement snapshot of Instrumentation."""
+    instrumentation = Instrumentation(slow_threshold=0.0 if explain else float('inf'), explain=explain)
+    instrumentation.attach(engine)
+    try:
+        for _ in range(repeat):
+            workload()
+    finally:
+        instrumentation.detach(engine)
+    return instrumentation.snapshot()
+
+
+def propose(engine, statements):
+    tables = set(inspect(engine).get_table_names())
+    proposals = []
+    for stats in statements:
+        if not stats['plan']:
+            continue
+        statement = Statement(stats['template'], tables)
+        for table in statement.flagged_tables(stats['plan']):
+            existing = existing_keys(engine, table)
+            for index in statement.candidates(table):
+                if any(key[:len(index.columns)] == index.columns for key in existing):
+                    continue
+                if index not in proposals:
+                    proposals.append(index)
+    return proposals
+
+
+def advise(engine, workload, repeat=5, apply=False):
+    """Find the indexes the workload needs and time it with and without them, see above."""
+    before = record(engine, workload, repeat, explain=False)
+    kept = []
+    # the candidate indexes that exist right now, dropped in the finally unless they are applied
+    created = []
+    with engine.connect() as conn:
+        try:
+            for _ in range(MAX_ROUNDS):
+                proposals = [index for index in propose(engine, record(engine, workload)) if index not in kept]
+                if not proposals:
+                    break
+                for index in proposals:
+                    index.create(conn)
+                    created.append(index)
+                used = set()
+                for stats in record(engine, workload):
+                    used.update(_USING_INDEX.findall(stats['plan'] or ''))
+                for index in proposals:
+                    if index.name in used:
+                        kept.append(index)
+                    else:
+                        index.drop(conn)
+                        created.remove(index)
+                # an index that is a prefix of another kept index on the same table is redundant
+                for index in list(kept):
+                    if any(other is not index and other.table == index.table and
+                           other.columns[:len(index.columns)] == index.columns for other in kept):
+                        index.drop(conn)
+                        created.remove(index)
+                        kept.remove(index)
+            after = record(engine, workload, repeat, explain=False)
+            if apply:
+                created = []
+        finally:
+            for index in created:
+                index.drop(conn)
+    return Advice(kept, before, after)
+
+
+def report(advice):
+    lines = ['proposed indexes:']
+    lines.extend('    {} ON {} ({})'.format(index.name, index.table, ', '.join(index.columns))
+                 for index in advice.indexes)
+    after = {stats['template']: stats for stats in advice.after}
+    lines.append('{:>12} {:>12} {:>8}  statement'.format('before ms', 'after ms', 'change'))
+    for stats in advice.before:
+        new = after.get(stats['template'])
+        if new is None:
+            continue
+        lines.append('{:>12.3f} {:>12.3f} {:>+8.0%}  {}'.format(
+            stats['avg_ms'], new['avg_ms'], new['avg_ms'] / stats['avg_ms'] - 1 if stats['avg_ms'] else 0.0,
+            stats['template'][:100]))
+    return '\n'.join(lines)
+
+
+def write_revision(indexes, directory=ALEMBIC_DIR, message='Add indexes proposed by the index advisor'):
+    """Write an Alembic revision creating the indexes on top of the current head; returns its path."""
+    from alembic.script import ScriptDirectory
+    from alembic.util import rev_id
+
+    script = ScriptDirectory(directory)
+    upgrades = ['op.create_index({!r}, {!r}, {!r})'.format(index.name, index.table, list(index.columns))
+                for index in indexes]
+    downgrades = ['op.drop_index({!r}, table_name={!r})'.format(index.name, index.table)
+                  for index in reversed(indexes)]
+    revision = script.generate_revision(rev_id(), message, head='head',
+                                        upgrades='\n    '.join(upgrades),
+                                        downgrades='\n    '.join(downgrades))
+    return revision.path
+
+
+def replay_workload(engine, statements):
+    """A workload replaying recorded (sql, parameters) pairs, e.g. taken from a log."""
+    def workload():
+        with engine.connect() as conn:
+            for sql, parameters in statements:
+                conn.execute(text(sql), parameters or {}).fetchall()
+
+    return workload
+
+
+def cookie_shop_workload(users, calls=20):
+    """get_orders_by_customer in all its variants and the Core query shapes of database_ops.py."""
+    from testing_database.app import get_orders_by_customer
+    from testing_database.db import dal
+
+    names = ['user{}'.format(1 + i * 7919 % users) for i in range(calls)]
+    cookies, orders, line_items, users_table = dal.cookies, dal.orders, dal.line_items, dal.users
+    queries = [
+        select([cookies]).where(and_(cookies.c.quantity > 23, cookies.c.unit_cost < 0.40)),
+        select([cookies.c.cookie_name, cookies.c.quantity]).order_by(desc(cookies.c.quantity)).limit(5),
+        select([users_table.c.username, func.count(orders.c.order_id)]).select_from(
+            users_table.outerjoin(orders)).group_by(users_table.c.username),
+        select([line_items.c.cookie_id, func.sum(line_items.c.quantity)]).group_by(line_items.c.cookie_id),
+    ]
+
+    def workload():
+        for name in names:
+            for shipped in (None, True):
+                for details in (False, True):
+                    get_orders_by_customer(name, shipped, details)
+        for query in queries:
+            dal.connection.execute(query).fetchall()
+
+    return workload
+
+
+def main(argv=None):
+    from testing_database.datagen import CookieShopData
+    from testing_database.db import dal, prep_db
+
+    parser = argparse.ArgumentParser(description='Propose indexes for the cookie shop workload.')
+    parser.add_argument('--url', help='an existing cookie shop database (default: generate one in memory)')
+    parser.add_argument('--scale', type=int, default=10, help='datagen scale when generating the database')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--apply', action='store_true', help='keep the indexes in the database')
+    parser.add_argument('--revision-dir', help='write an Alembic revision into this alembic directory')
+    args = parser.parse_args(argv)
+
+    dal.db_init(args.url or 'sqlite:///:memory:')
+    n_users = 1000 * args.scale
+    if args.url:
+        n_users = dal.connection.execute(select([func.count()]).select_from(dal.users)).scalar()
+    else:
+        start = time.perf_counter()
+        prep_db(CookieShopData(users=n_users, cookies=100 * args.scale, orders=5000 * args.scale))
+        print('generated the database in {:.1f}s'.format(time.perf_counter() - start))
+    advice = advise(dal.engine, cookie_shop_workload(n_users), args.repeat, args.apply)
+    print(report(advice))
+    if args.revision_dir and advice.indexes:
+        print('wrote {}'.format(write_revision(advice.indexes, args.revision_dir)))
+
+
+if __name__ == '__main__':
+    main()
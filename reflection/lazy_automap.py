@@ -0,0 +1,174 @@
+from sqlalchemy import util
+from sqlalchemy.ext import automap
+from sqlalchemy.ext.automap import automap_base
+from sqlalchemy.ext.declarative.base import _DeferredMapperConfig
+from sqlalchemy.orm import configure_mappers
+from sqlalchemy.orm.mapper import _CONFIGURE_MUTEX
+
+from reflection.reflection_cache import ReflectionCache
+
+"""
+    :Lazy automap
+    Base.prepare(engine, reflect=True) reflects and maps every table of the database before the first query,
+    even when the code only uses Artist and Album. lazy_automap_base() maps each class the first time it is
+    asked for instead:
+
+        Base = lazy_automap_base(engine, cache_path='chinook.reflection')
+        Artist = Base.classes.Artist
+
+    maps Artist together with the tables its relationships need: the tables it references (and theirs, as
+    reflection does) and the tables referencing it, so artist.album_collection works. A table mapped along the
+    way (Album here) gets the relationships to tables mapped later as they are mapped (Album.track_collection
+    once Track is asked for), and all of them when it is asked for itself.
+
+    The table descriptions come from a ReflectionCache, so with a cache_path a new process builds its classes
+    from the file without inspecting the database, and only the tables changed since are inspected again.
+    Classes are named after their tables (the default classname_for_table) and the relationships follow the
+    default automap naming; the other prepare() arguments can be passed to lazy_automap_base().
+
+    Base.classes.keys() lists every table that can be mapped without mapping any; iterating Base.classes maps
+    them all.
+"""
+
+
+def _association(description):
+    """Whether automap makes the table a many-to-many secondary rather than a class (see _is_many_to_many)."""
+    foreign_keys = description['foreign_keys']
+    columns = {column for fk in foreign_keys for column in fk['constrained_columns']}
+    return len(foreign_keys) == 2 and columns == {column['name'] for column in description['columns']}
+
+
+class _Mapped:
+    """Stands in for the _DeferredMapperConfig of an already mapped class in the automap helpers."""
+
+    def __init__(self, cls):
+        self.cls = cls
+        self.local_table = cls.__table__
+        self.properties = {prop.key: prop for prop in cls.__mapper__.iterate_properties}
+        self.existing = set(self.properties)
+
+    def apply(self):
+        for key, prop in self.properties.items():
+            if key not in self.existing:
+                setattr(self.cls, key, prop)
+
+
+class LazyAutomap:
+
+    def __init__(self, base, engine, cache_path=None, **prepare_options):
+        self.base = base
+        self.cache = ReflectionCache(cache_path)
+        self.descriptions = self.cache.refresh(engine)
+        self.options = dict(collection_class=list,
+                            name_for_scalar_relationship=automap.name_for_scalar_relationship,
+                            name_for_collection_relationship=automap.name_for_collection_relationship,
+                            generate_relationship=automap.generate_relationship)
+        self.options.update(prepare_options)
+        # table -> the tables with a foreign key to it
+        self.referencing = {}
+        for name, description in self.descriptions.items():
+            for fk in description['foreign_keys']:
+                self.referencing.setdefault(fk['referred_table'], set()).add(name)
+        self.complete = set()
+        self.mappable = sorted(name for name, description in self.descriptions.items()
+                               if description['primary_key']['constrained_columns'] and
+                               not _association(description))
+
+    def resolve(self, name):
+        """Map the class of table `name` and the tables its relationships need; returns the class."""
+        if name not in self.descriptions:
+            raise AttributeError(name)
+        if name not in self.complete:
+            self.map_tables([name] + sorted(self.referencing.get(name, ())))
+            self.complete.add(name)
+        try:
+            return self.base.classes._data[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def map_all(self):
+        self.map_tables(sorted(self.descriptions))
+        self.complete.update(self.descriptions)
+
+    def map_tables(self, names):
+        """Like Base.prepare() for the tables named (and the tables they reference), keeping earlier classes."""
+        metadata = self.base.metadata
+        self.cache.build(metadata, names)
+        classes = self.base.classes._data
+        with _CONFIGURE_MUTEX:
+            table_to_map_config = {cls.__table__: _Mapped(cls) for cls in classes.values()}
+            new = {}
+            many_to_many = []
+            for table in metadata.tables.values():
+                lcl_m2m, rem_m2m, m2m_const = automap._is_many_to_many(self.base, table)
+                if lcl_m2m is not None:
+                    if table.name not in self.complete:
+                        many_to_many.append((lcl_m2m, rem_m2m, m2m_const, table))
+                elif not table.primary_key or table in table_to_map_config:
+                    continue
+                else:
+                    mapped_cls = type(automap.classname_for_table(self.base, table.name, table),
+                                      (self.base,), {'__table__': table})
+                    map_config = _DeferredMapperConfig.config_for_cls(mapped_cls)
+                    classes[mapped_cls.__name__] = mapped_cls
+                    table_to_map_config[table] = new[table] = map_config
+
+            for map_config in new.values():
+                automap._relationships_for_fks(self.base, map_config, table_to_map_config, **self.options)
+            for lcl_m2m, rem_m2m, m2m_const, table in many_to_many:
+                automap._m2m_relationship(self.base, lcl_m2m, rem_m2m, m2m_const, table, table_to_map_config,
+                                          **self.options)
+                self.complete.add(table.name)
+
+            for map_config in _DeferredMapperConfig.classes_for_base(self.base):
+                map_config.map()
+            # after the new classes are mapped, as these relationships may point at them
+            for map_config in table_to_map_config.values():
+                if isinstance(map_config, _Mapped):
+                    map_config.apply()
+        configure_mappers()
+
+
+class LazyClasses(util.Properties):
+    """Base.classes of a lazy automap base: looking a class up maps it."""
+
+    __slots__ = ('_automap',)
+
+    def __init__(self, lazy):
+        super().__init__({})
+        object.__setattr__(self, '_automap', lazy)
+
+    def __getattr__(self, key):
+        if key.startswith('__'):
+            raise AttributeError(key)
+        return self._automap.resolve(key)
+
+    def __getitem__(self, key):
+        try:
+            return self._automap.resolve(key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        return key in self._automap.mappable
+
+    def __iter__(self):
+        self._automap.map_all()
+        return super().__iter__()
+
+    def __len__(self):
+        return len(self._automap.mappable)
+
+    def keys(self):
+        return list(self._automap.mappable)
+
+    def mapped(self):
+        """Names of the classes mapped so far."""
+        return sorted(self._data)
+
+
+def lazy_automap_base(engine, cache_path=None, declarative_base=None, **prepare_options):
+    """An automap base whose classes are reflected and mapped on first use, see above."""
+    base = automap_base(declarative_base)
+    base.classes = LazyClasses(LazyAutomap(base, engine, cache_path, **prepare_options))
+    return base
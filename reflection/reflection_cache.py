@@ -0,0 +1,210 @@
+import hashlib
+import os
+import pickle
+import tempfile
+
+import sqlalchemy
+from sqlalchemy import (MetaData, Table, Column, ForeignKeyConstraint, PrimaryKeyConstraint, UniqueConstraint,
+                        Index, inspect, text)
+
+"""
+    :Reflection cache
+    metadata.reflect(bind=engine) queries the database for every column, key and index of every table, then builds
+    the Table objects, which takes seconds on schemas with hundreds of tables, on every start. ReflectionCache keeps
+    what the Inspector returned for each table in a file, along with a fingerprint of the schema, and on the next
+    start:
+
+    + uses the file as it is when the fingerprint is unchanged: the same database file (or URL), the same
+      PRAGMA schema_version (bumped by every schema change) and the same hash of sqlite_master, since two
+      databases can be at the same schema_version;
+    + otherwise compares a hash of each table's sqlite_master entries (its CREATE TABLE and CREATE INDEX
+      statements) and inspects only the tables that were added or changed.
+
+    The Table objects are built from the cached descriptions, for every table or only for the ones asked for
+    (plus the tables their foreign keys point at), which is where most of the time of a full reflection goes:
+
+        cache = ReflectionCache('chinook.reflection')
+        metadata = cache.reflect(engine)                        # like metadata.reflect(bind=engine)
+        metadata = cache.reflect(engine, only=['Album'])        # Album and Artist only
+        cache.status, cache.inspected    # 'hit', 'partial' or 'full', and the tables inspected this time
+
+    reflect() of every table into a new MetaData also keeps the pickled MetaData in the file, so a hit unpickles
+    it instead of building every Table again.
+
+    That is still not free: on the 500 table schema of benchmarks/bench_reflection.py, where metadata.reflect()
+    takes about 1.5 s, an unchanged schema loads in about 0.45-0.5 s, nearly all of it unpickling the Table and
+    Column objects (a changed schema takes 0.75-1 s, as it also builds and pickles the MetaData again). Loading
+    in milliseconds means not building the tables that are not used: reflect(engine, only=[...]) builds the
+    tables asked for and the ones they reference (80-100 ms there, mostly reading the file), and
+    lazy_automap.py maps classes from the cache as they are asked for.
+
+    ReflectionCache(None) keeps the descriptions in memory only.
+    Other databases have no such cheap fingerprint here, so they are always inspected in full (and not cached).
+    The file is tied to the SQLAlchemy version it was written with; a different version inspects again.
+    Only load cache files you wrote yourself: unpickling runs code.
+"""
+
+FORMAT = 2
+
+
+def table_fingerprints(connection):
+    """{table name: hash of its sqlite_master entries} for the tables of a SQLite database."""
+    entries = {}
+    for type_, name, table, sql in connection.execute(
+            "SELECT type, name, tbl_name, sql FROM sqlite_master "
+            "WHERE type IN ('table', 'index') AND name NOT LIKE 'sqlite_%' ORDER BY type DESC, name"):
+        entries.setdefault(table, []).append('{}:{}:{}'.format(type_, name, sql))
+    return {table: hashlib.sha1('\n'.join(sql).encode('utf-8')).hexdigest() for table, sql in entries.items()}
+
+
+def database_key(engine):
+    """What the cache file is tied to: the absolute path of a SQLite database file, or else the URL."""
+    url = engine.url
+    if url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:'):
+        return os.path.abspath(url.database)
+    return str(url)
+
+
+def schema_hash(fingerprints):
+    return hashlib.sha1(repr(sorted(fingerprints.items())).encode('utf-8')).hexdigest()
+
+
+def describe(inspector, name):
+    """What metadata.reflect() asks the Inspector about a table, as plain data."""
+    return {'columns': inspector.get_columns(name),
+            'primary_key': inspector.get_pk_constraint(name),
+            'foreign_keys': inspector.get_foreign_keys(name),
+            'indexes': inspector.get_indexes(name),
+            'unique_constraints': inspector.get_unique_constraints(name)}
+
+
+def build_table(metadata, name, description):
+    primary_key = description['primary_key']
+    columns = [Column(column['name'], column['type'],
+                      nullable=column['nullable'],
+                      autoincrement=column.get('autoincrement', 'auto'),
+                      server_default=text(column['default']) if column.get('default') is not None else None)
+               for column in description['columns']]
+    constraints = [PrimaryKeyConstraint(*primary_key['constrained_columns'], name=primary_key.get('name'))]
+    for fk in description['foreign_keys']:
+        target = '.'.join(part for part in (fk.get('referred_schema'), fk['referred_table']) if part)
+        constraints.append(ForeignKeyConstraint(
+            fk['constrained_columns'], ['{}.{}'.format(target, column) for column in fk['referred_columns']],
+            name=fk.get('name'), **fk.get('options', {})))
+    constraints.extend(UniqueConstraint(*unique['column_names'], name=unique.get('name'))
+                       for unique in description['unique_constraints'])
+    table = Table(name, metadata, *(columns + constraints))
+    for index in description['indexes']:
+        Index(index['name'], *[table.c[column] for column in index['column_names'] if column is not None],
+              unique=bool(index['unique']))
+    return table
+
+
+class ReflectionCache:
+
+    def __init__(self, path):
+        self.path = path
+        self.status = None
+        self.inspected = []
+        self.descriptions = {}
+        # what the cache file holds, once it is loaded as a hit or saved
+        self._cached = None
+
+    def _load(self):
+        if self.path is None:
+            return None
+        try:
+            with open(self.path, 'rb') as f:
+                cached = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            return None
+        if cached.get('format') != FORMAT or cached.get('sqlalchemy') != sqlalchemy.__version__:
+            return None
+        return cached
+
+    def _save(self, **entries):
+        if self.path is None:
+            return
+        self._cached = dict(entries, format=FORMAT, sqlalchemy=sqlalchemy.__version__,
+                            descriptions=self.descriptions)
+        directory = os.path.dirname(os.path.abspath(self.path))
+        handle, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(handle, 'wb') as f:
+                pickle.dump(self._cached, f, protocol=pickle.HIGHEST_PROTOCOL)
+            # readers never see a half written cache
+            os.replace(tmp, self.path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def refresh(self, engine):
+        """Bring the table descriptions up to date with the database; returns them."""
+        with engine.connect() as connection:
+            inspector = inspect(connection)
+            self._cached = None
+            if engine.dialect.name != 'sqlite':
+                self.descriptions = {name: describe(inspector, name) for name in inspector.get_table_names()}
+                self.status, self.inspected = 'full', sorted(self.descriptions)
+                return self.descriptions
+
+            schema_version = connection.execute('PRAGMA schema_version').scalar()
+            fingerprints = table_fingerprints(connection)
+            database, schema = database_key(engine), schema_hash(fingerprints)
+            cached = self._load()
+            if cached is not None and (cached['database'], cached['schema_version'], cached['schema']) == \
+                    (database, schema_version, schema):
+                self.descriptions, self._cached = cached['descriptions'], cached
+                self.status, self.inspected = 'hit', []
+                return self.descriptions
+
+            if cached is None:
+                self.descriptions, changed, self.status = {}, sorted(fingerprints), 'full'
+            else:
+                self.descriptions, self.status = cached['descriptions'], 'partial'
+                changed = sorted(name for name, fingerprint in fingerprints.items()
+                                 if cached['fingerprints'].get(name) != fingerprint)
+                for name in set(self.descriptions) - set(fingerprints):
+                    del self.descriptions[name]
+            for name in changed:
+                self.descriptions[name] = describe(inspector, name)
+            self.inspected = changed
+            self._save(database=database, schema_version=schema_version, schema=schema,
+                       fingerprints=fingerprints, metadata=None)
+            return self.descriptions
+
+    def reflect(self, engine, metadata=None, only=None):
+        """Like metadata.reflect(bind=engine, only=only), from the cached descriptions.
+
+        The tables referenced by foreign keys of the tables built are built too, as reflection does.
+        """
+        descriptions = self.refresh(engine)
+        if only is None and metadata is None and self._cached is not None:
+            if self._cached['metadata'] is not None:
+                return pickle.loads(self._cached['metadata'])
+            metadata = self.build(MetaData(), sorted(descriptions))
+            self._cached['metadata'] = pickle.dumps(metadata, protocol=pickle.HIGHEST_PROTOCOL)
+            self._save(**self._cached)
+            return metadata
+        metadata = MetaData() if metadata is None else metadata
+        self.build(metadata, sorted(descriptions) if only is None else only)
+        return metadata
+
+    def build(self, metadata, names):
+        """Add the named tables, and the tables their foreign keys point at, to metadata."""
+        pending = list(names)
+        while pending:
+            name = pending.pop()
+            if name in metadata.tables:
+                continue
+            description = self.descriptions.get(name)
+            if description is None:
+                raise sqlalchemy.exc.NoSuchTableError(name)
+            build_table(metadata, name, description)
+            pending.extend(fk['referred_table'] for fk in description['foreign_keys'])
+        return metadata
+
+
+def reflect_cached(engine, path, only=None):
+    """metadata.reflect(bind=engine, only=only), through a ReflectionCache kept in path."""
+    return ReflectionCache(path).reflect(engine, only=only)
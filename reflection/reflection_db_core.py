@@ -91,6 +91,10 @@ print(metadata.tables)
     and in the Chinook database they are uppercase. Due to SQLite’s handling of case sensitivity,
     both the lower- and uppercase names point to the same tables in the database.
 
+    TIP: reflecting the whole database runs again on every start. reflection_cache.ReflectionCache keeps the
+    reflected descriptions in a file and only inspects the tables changed since (see reflection_cache.py):
+    metadata = ReflectionCache('chinook.reflection').reflect(engine)
+
 """
 
 playlist = metadata.tables['Album']
@@ -14,6 +14,10 @@ Base.prepare(engine, reflect=True)
     :Reflecting a Database with Automap
     In order to reflect a database, instead of using the declarative_base we’ve been using with the ORM so far,
     we’re going to use the automap_base.
+
+    TIP: prepare(reflect=True) reflects and maps every table up front. lazy_automap.lazy_automap_base(engine,
+    cache_path) maps each class (and the tables its relationships need) the first time Base.classes is asked
+    for it, from a reflection cache file (see lazy_automap.py).
 """
 
 print(Base.classes.keys())
@@ -0,0 +1,166 @@
+from collections import OrderedDict, namedtuple
+
+from sqlalchemy import Column, Integer, MetaData, Table, and_, bindparam, func, inspect, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
+
+from sqlalchemy_core.upsert import batch_transaction, max_variables
+
+"""
+    :Batched stock adjustments
+    update(cookies).where(cookies.c.cookie_id == cookie_id).values(quantity=cookies.c.quantity - 20) once per
+    cookie makes a 50000 SKU stock adjustment 50000 round trips. adjust_stock takes the whole list of
+    (cookie key, delta) pairs, or (cookie key, new quantity) with mode='set', and writes it with a fixed number
+    of statements:
+
+        results = adjust_stock(connection, cookies, [(1, -20), (2, 120)])
+        results = adjust_stock(session, Cookie.__table__, [('CC01', 40)], key='cookie_sku', mode='set')
+
+    1- The stock of the cookies in the batch is read once, and the adjustments are checked in the order given:
+       one that names no cookie, or would take a cookie below zero (the quantity_positive constraint), is
+       not applied. With atomic=True a single failure leaves the whole batch unapplied.
+    2- The rest is written with one compiled UPDATE executed for every pair (method='executemany'), or, for
+       very large batches, loaded into a temporary table and applied by one UPDATE correlated with it
+       (method='temp_table'). By default the temp table is used from TEMP_TABLE_ROWS pairs.
+    3- The UPDATE also checks the quantity stays positive and bumps version_id when the table has one. If it
+       does not change exactly the rows that were checked, the inventory changed underneath us: the batch is
+       rolled back and StaleDataError is raised, as ship_it_optimistic does.
+
+    The result is one Adjusted(key, applied, quantity) per pair, quantity being the stock after the pair was
+    applied (or the stock it was refused on, None for an unknown key).
+
+    Given an engine or a connection outside a transaction, the batch is committed. Given a session, or a
+    connection in a transaction, the batch runs in a SAVEPOINT and is left for the caller to commit: a failure
+    only rolls back the batch, not the caller's other changes. The session is flushed first, and the objects it
+    has loaded from the table are expired afterwards, since the UPDATE changed their quantity and version_id
+    behind its back (a flush of a stale version_id would raise StaleDataError).
+"""
+
+Adjusted = namedtuple('Adjusted', 'key applied quantity')
+
+MODES = ('delta', 'set')
+METHODS = ('executemany', 'temp_table')
+
+# from this many pairs, one INSERT executemany into a temp table and one UPDATE beat one UPDATE per pair
+TEMP_TABLE_ROWS = 20000
+
+
+def _stock(connection, table, key_column, keys):
+    """{key: quantity} of the keys that exist, read in chunks within the bound variable limit."""
+    statement = select([key_column, table.c.quantity]).where(key_column.in_(bindparam('keys', expanding=True)))
+    size = max_variables(connection.dialect)
+    stock = {}
+    for start in range(0, len(keys), size):
+        stock.update(connection.execute(statement, keys=keys[start:start + size]).fetchall())
+    return stock
+
+
+def check(stock, pairs, mode='delta'):
+    """[Adjusted] of the pairs applied one after the other to stock ({key: quantity}), which is updated."""
+    results = []
+    for key, value in pairs:
+        if key not in stock:
+            results.append(Adjusted(key, False, None))
+            continue
+        quantity = value if mode == 'set' else (stock[key] or 0) + value
+        if quantity < 0:
+            results.append(Adjusted(key, False, stock[key]))
+        else:
+            stock[key] = quantity
+            results.append(Adjusted(key, True, quantity))
+    return results
+
+
+def _versioned(table, values):
+    if 'version_id' in table.c:
+        values['version_id'] = table.c.version_id + 1
+    return values
+
+
+def _executemany(connection, table, key_column, pairs, mode):
+    current = func.coalesce(table.c.quantity, 0)
+    if mode == 'set':
+        condition, quantity = bindparam('b_value') >= 0, bindparam('b_value')
+    else:
+        condition, quantity = current + bindparam('b_value') >= 0, current + bindparam('b_value')
+    u = table.update().where(and_(key_column == bindparam('b_key'), condition))
+    u = u.values(**_versioned(table, {'quantity': quantity}))
+    return connection.execute(u, [{'b_key': key, 'b_value': value} for key, value in pairs]).rowcount
+
+
+def _temp_table(connection, table, key_column, pairs, mode):
+    batch = Table('stock_adjustments', MetaData(),
+                  Column('position', Integer(), primary_key=True),
+                  Column('key', key_column.type, nullable=False, index=True),
+                  Column('value', Integer(), nullable=False),
+                  prefixes=['TEMPORARY'])
+    batch.create(connection)
+    try:
+        connection.execute(batch.insert(), [{'key': key, 'value': value} for key, value in pairs])
+        matching = batch.c.key == key_column
+        current = func.coalesce(table.c.quantity, 0)
+        if mode == 'set':
+            # the last value given for a key wins
+            quantity = select([batch.c.value]).where(matching).order_by(batch.c.position.desc()).limit(1)
+            quantity = quantity.as_scalar()
+            condition = quantity >= 0
+        else:
+            quantity = current + select([func.sum(batch.c.value)]).where(matching).as_scalar()
+            condition = quantity >= 0
+        u = table.update().where(and_(key_column.in_(select([batch.c.key])), condition))
+        u = u.values(**_versioned(table, {'quantity': quantity}))
+        return connection.execute(u).rowcount
+    finally:
+        batch.drop(connection)
+
+
+def _expire(session, table):
+    for instance in list(session.identity_map.values()):
+        if table in inspect(instance).mapper.tables:
+            session.expire(instance)
+
+
+def adjust_stock(connectable, table, pairs, key='cookie_id', mode='delta', method=None, atomic=False):
+    """Apply (key, delta) pairs (or (key, new quantity) with mode='set') to the quantity of the cookies in
+    table, with one UPDATE for the whole batch; returns one Adjusted(key, applied, quantity) per pair.
+
+    connectable is an engine, a connection or a session (which is left for the caller to commit), see above.
+    """
+    if mode not in MODES:
+        raise ValueError('mode must be one of {}'.format(', '.join(MODES)))
+    if method is not None and method not in METHODS:
+        raise ValueError('method must be one of {}'.format(', '.join(METHODS)))
+    if isinstance(connectable, Engine):
+        with connectable.connect() as connection:
+            return adjust_stock(connection, table, pairs, key, mode, method, atomic)
+    if isinstance(connectable, Session):
+        connectable.flush()
+        results = adjust_stock(connectable.connection(), table, pairs, key, mode, method, atomic)
+        if any(result.applied for result in results):
+            _expire(connectable, table)
+        return results
+    connection = connectable
+    pairs = list(pairs)
+    key_column = table.c[key]
+
+    with batch_transaction(connection):
+        stock = _stock(connection, table, key_column, list(OrderedDict.fromkeys(pair[0] for pair in pairs)))
+        results = check(dict(stock), pairs, mode)
+        applied = [pair for pair, result in zip(pairs, results) if result.applied]
+        if atomic and len(applied) < len(pairs):
+            return [Adjusted(result.key, False, stock.get(result.key)) for result in results]
+        if not applied:
+            return results
+        if method is None:
+            method = 'temp_table' if len(applied) >= TEMP_TABLE_ROWS else 'executemany'
+        if method == 'executemany':
+            expected, changed = len(applied), _executemany(connection, table, key_column, applied, mode)
+        else:
+            expected = len({pair[0] for pair in applied})
+            changed = _temp_table(connection, table, key_column, applied, mode)
+        if changed != expected:
+            # leaving the block with the exception rolls the batch back
+            raise StaleDataError('stock adjustment expected to change {} rows of {}, changed {}'.format(
+                expected, table.name, changed))
+    return results
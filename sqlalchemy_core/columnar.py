@@ -0,0 +1,117 @@
+import numpy as np
+
+from sqlalchemy import Boolean, Date, DateTime, Float, Integer, Numeric
+
+"""
+    :Columnar results
+    fetchall() returns one row object per row, which analysts then turn into columns one at a time.
+    fetch_arrays() runs a Core select (or an ORM query) and returns one NumPy array per result column instead:
+
+        arrays = fetch_arrays(order_queries[(False, True)], connection, {'cust_name': 'cookiemon'})
+        arrays['extended_cost'].sum()
+
+        records = fetch_records(session.query(InvoiceLine))        # the same as a numpy record array
+        records.UnitPrice.mean()
+
+    Rows are fetched chunk_size at a time straight from the DBAPI cursor (no row objects, no result
+    processing) and each chunk is converted column by column, so the row tuples of a single chunk are all that
+    is alive besides the arrays. The dtype comes from the type of the selected column:
+
+    + Integer: int64, Boolean: bool, Float: float64
+    + Numeric: float64, or int64 cents with numeric='cents' (rounded half to even)
+    + DateTime: datetime64[us], Date: datetime64[D] (NULL is NaT)
+    + anything else (strings, ...): object
+
+    Integer, Boolean and cents columns holding NULL come back as float64 with NaN, and a chunk of values that
+    do not fit the declared type (SQLite stores whatever it is given) as object.
+"""
+
+CHUNK_SIZE = 100000
+
+
+def column_kind(type_, numeric='float64'):
+    """The dtype a column of SQLAlchemy type type_ is fetched into ('cents' is int64 cents)."""
+    if isinstance(type_, Boolean):
+        return 'bool'
+    if isinstance(type_, Integer):
+        return 'int64'
+    if isinstance(type_, Float):
+        return 'float64'
+    if isinstance(type_, Numeric):
+        return numeric
+    if isinstance(type_, DateTime):
+        return 'datetime64[us]'
+    if isinstance(type_, Date):
+        return 'datetime64[D]'
+    return 'object'
+
+
+def to_array(values, kind):
+    """One chunk of a column (a sequence of DBAPI values) as an array of the given kind."""
+    if kind == 'object':
+        array = np.empty(len(values), dtype=object)
+        array[:] = values
+        return array
+    try:
+        if kind in ('int64', 'bool', 'cents') and None in values:
+            array = np.array(values, dtype=np.float64)
+            return np.round(array * 100) if kind == 'cents' else array
+        if kind == 'cents':
+            return np.rint(np.array(values, dtype=np.float64) * 100).astype(np.int64)
+        return np.array(values, dtype=kind)
+    except (TypeError, ValueError):
+        # values that do not match the declared type (SQLite stores whatever it is given)
+        return to_array(values, 'object')
+
+
+def _execute(source, connectable, params, numeric):
+    """(result, column names, column kinds) of a select run on connectable, or of an ORM query."""
+    if hasattr(source, 'session') and hasattr(source, 'statement'):
+        # an ORM query: its select, executed by its session (or the given connectable)
+        statement = source.statement
+        params = dict(source._params, **(params or {}))
+        connectable = connectable if connectable is not None else source.session
+    else:
+        statement = source
+    if connectable is None:
+        raise ValueError('fetching a select needs a connection, an engine or a session')
+    result = connectable.execute(statement, params or {})
+    names = result.keys()
+    # the select of a compiled statement; text() has no typed columns, everything is fetched as objects
+    columns = list(getattr(getattr(statement, 'statement', statement), 'inner_columns', ()))
+    kinds = [column_kind(column.type, numeric) for column in columns] if len(columns) == len(names) else \
+        ['object'] * len(names)
+    return result, names, kinds
+
+
+def _chunks(result, names, kinds, chunk_size):
+    try:
+        cursor = result.cursor
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield {name: to_array(values, kind) for name, kind, values in zip(names, kinds, zip(*rows))}
+    finally:
+        result.close()
+
+
+def iter_chunks(source, connectable=None, params=None, chunk_size=CHUNK_SIZE, numeric='float64'):
+    """Yield {column name: array} for every chunk_size rows of a select or ORM query."""
+    return _chunks(*_execute(source, connectable, params, numeric), chunk_size=chunk_size)
+
+
+def fetch_arrays(source, connectable=None, params=None, chunk_size=CHUNK_SIZE, numeric='float64'):
+    """{column name: array} of all the rows of a select (run on connectable) or of an ORM query."""
+    result, names, kinds = _execute(source, connectable, params, numeric)
+    chunks = list(_chunks(result, names, kinds, chunk_size))
+    if not chunks:
+        return {name: np.empty(0, dtype=np.int64 if kind == 'cents' else kind) for name, kind in zip(names, kinds)}
+    return {name: chunks[0][name] if len(chunks) == 1 else np.concatenate([chunk.pop(name) for chunk in chunks])
+            for name in names}
+
+
+def fetch_records(source, connectable=None, params=None, chunk_size=CHUNK_SIZE, numeric='float64'):
+    """The rows of a select or ORM query as a numpy record array (columns as attributes)."""
+    arrays = fetch_arrays(source, connectable, params, chunk_size, numeric)
+    return np.rec.fromarrays(list(arrays.values()), names=list(arrays))
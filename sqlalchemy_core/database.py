@@ -0,0 +1,70 @@
+import threading
+
+from sqlalchemy import create_engine
+
+from sqlalchemy_core.models import metadata, employee_metadata
+
+"""
+    :Engines
+    Importing models.py only declares the tables. The engines are created the first time they are asked for,
+    with the tables of their metadata (create_all is a no-op for the tables that exist):
+
+        engine = get_engine()                     # sqlite:///cookies.db
+        conn = get_employee_engine().connect()    # sqlite:///employees.db
+
+    cookies_engine.configure('sqlite:///:memory:') before the first call points it somewhere else
+    (calling it later disposes of the engine already created and starts over).
+"""
+
+
+class LazyEngine:
+    """An engine created on first use, together with the tables of metadata."""
+
+    def __init__(self, url, metadata=None, **options):
+        self.url = url
+        self.metadata = metadata
+        self.options = options
+        self._engine = None
+        self._lock = threading.Lock()
+
+    @property
+    def created(self):
+        return self._engine is not None
+
+    def configure(self, url=None, **options):
+        with self._lock:
+            self._dispose()
+            self.url = url or self.url
+            self.options.update(options)
+        return self
+
+    def get(self):
+        if self._engine is None:
+            with self._lock:
+                if self._engine is None:
+                    engine = create_engine(self.url, **self.options)
+                    if self.metadata is not None:
+                        self.metadata.create_all(engine)
+                    self._engine = engine
+        return self._engine
+
+    def dispose(self):
+        with self._lock:
+            self._dispose()
+
+    def _dispose(self):
+        if self._engine is not None:
+            self._engine.dispose()
+            self._engine = None
+
+
+cookies_engine = LazyEngine('sqlite:///cookies.db', metadata)
+employees_engine = LazyEngine('sqlite:///employees.db', employee_metadata)
+
+
+def get_engine():
+    return cookies_engine.get()
+
+
+def get_employee_engine():
+    return employees_engine.get()
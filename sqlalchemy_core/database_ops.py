@@ -1,6 +1,8 @@
-from .models import cookies, users, line_items, orders, engine
+from .models import cookies, users, line_items, orders
+from .database import get_engine
 from sqlalchemy import insert, select
 
+engine = get_engine()
 conn = engine.connect()
 
 ins = cookies.insert().values(
@@ -158,6 +160,12 @@ record = rp.first()
 print(record.keys())
 print(record.inventory_count)
 
+# the same totals without scanning cookies, from the summary row kept up to date by triggers
+from .inventory_totals import read_totals
+from .models import inventory_totals
+
+print(read_totals(conn, inventory_totals))
+
 """
     Filtring queries (where clause)
 """
@@ -187,6 +195,9 @@ s = select([cookies.c.cookie_name, cast((cookies.c.quantity * cookies.c.unit_cos
 for row in conn.execute(s):
     print('{} - {}'.format(row.cookie_name, row.inv_cost))
 
+# valuing the whole catalogue (and checking line_items.extended_cost) in integer cents, in columnar chunks:
+# sqlalchemy_core/valuation.py
+
 """
 
     Boolean Operators
@@ -242,6 +253,8 @@ u = update(cookies).where(cookies.c.cookie_name == "chocolate chip")
 u = u.values(quantity=(cookies.c.quantity + 120))
 result = conn.execute(u)
 print(result.rowcount)
+# TIP: to restock many cookies at once, adjust_stock(conn, cookies, [(cookie_id, 120), ...]) runs one UPDATE for
+# the batch and reports which adjustments were applied, see sqlalchemy_core/adjustments.py
 
 """
 
@@ -398,8 +411,10 @@ print(conn.execute(stmt).fetchall())
 
 """
 
-from models import engine_emp, employees
+from .models import employees
+from .database import get_employee_engine
 
+engine_emp = get_employee_engine()
 conn1 = engine_emp.connect()
 emp = insert(employees).values(
     manager_id=1,
@@ -430,6 +445,15 @@ results = conn1.execute(query).fetchall()
 for r in results:
     print(r)
 
+# Everyone below employee 1, at any depth, and the managers above employee 2, in one query each (see hierarchy.py)
+
+from .hierarchy import subtree_query, manager_chain_query
+
+for r in conn1.execute(subtree_query(employees, 1)):
+    print(r)
+for r in conn1.execute(manager_chain_query(employees, 2)):
+    print(r)
+
 """
     :Grouping
     When using grouping, you need one or more columns to group on and one or more columns
@@ -0,0 +1,74 @@
+from sqlalchemy import select, literal, func
+
+"""
+    :Hierarchies with recursive CTEs
+    The employees table points at itself through manager_id. Following `marsha.reports` walks the org chart one
+    level (and one query) at a time. A recursive common table expression walks the whole chart in the database:
+
+    WITH RECURSIVE subtree(id, manager_id, name, depth) AS (
+        SELECT id, manager_id, name, 0 FROM employee WHERE id = :root_id
+        UNION ALL
+        SELECT employee.id, employee.manager_id, employee.name, subtree.depth + 1
+        FROM employee, subtree WHERE employee.manager_id = subtree.id
+    )
+    SELECT * FROM subtree
+
+    The functions below build one such query for any table with id, manager_id and name columns, so they work on
+    the employee table of sqlalchemy_core/models.py as well as on Employee.__table__ of the ORM, which wraps them
+    in Employee.subtree(), Employee.manager_chain() and Employee.headcounts().
+    max_depth stops the recursion on a cycle in the data. Index manager_id: the recursive step looks it up once
+    per level.
+"""
+
+MAX_DEPTH = 100
+
+
+def subtree_cte(table, root_id, max_depth=MAX_DEPTH):
+    """The employee root_id and everyone below them, with their depth below root_id."""
+    tree = select([table.c.id, table.c.manager_id, table.c.name, literal(0).label('depth')]).where(
+        table.c.id == root_id).cte('subtree', recursive=True)
+    child = table.alias('child')
+    return tree.union_all(
+        select([child.c.id, child.c.manager_id, child.c.name, (tree.c.depth + 1).label('depth')]).where(
+            child.c.manager_id == tree.c.id).where(tree.c.depth < max_depth))
+
+
+def subtree_query(table, root_id, max_depth=MAX_DEPTH):
+    tree = subtree_cte(table, root_id, max_depth)
+    return select([tree]).order_by(tree.c.depth, tree.c.id)
+
+
+def manager_chain_cte(table, employee_id, max_depth=MAX_DEPTH):
+    """The managers of employee_id up to the root, with their distance from employee_id (1 for the manager)."""
+    chain = select([table.c.id, table.c.manager_id, table.c.name, literal(1).label('depth')]).where(
+        table.c.id == select([table.c.manager_id]).where(table.c.id == employee_id).as_scalar()).cte(
+        'manager_chain', recursive=True)
+    manager = table.alias('manager')
+    return chain.union_all(
+        select([manager.c.id, manager.c.manager_id, manager.c.name, (chain.c.depth + 1).label('depth')]).where(
+            manager.c.id == chain.c.manager_id).where(chain.c.depth < max_depth))
+
+
+def manager_chain_query(table, employee_id, max_depth=MAX_DEPTH):
+    chain = manager_chain_cte(table, employee_id, max_depth)
+    return select([chain]).order_by(chain.c.depth)
+
+
+def headcount_query(table, manager_id=None, max_depth=MAX_DEPTH):
+    """Per manager: id, name, headcount (everyone below them) and depth (levels below them).
+
+    The CTE pairs every employee with each of their reports at any level; with manager_id it only
+    starts from that manager, which is much cheaper than the whole chart.
+    """
+    anchor = select([table.c.id.label('ancestor'), table.c.id.label('descendant'), literal(0).label('depth')])
+    if manager_id is not None:
+        anchor = anchor.where(table.c.id == manager_id)
+    closure = anchor.cte('closure', recursive=True)
+    child = table.alias('child')
+    closure = closure.union_all(
+        select([closure.c.ancestor, child.c.id, (closure.c.depth + 1).label('depth')]).where(
+            child.c.manager_id == closure.c.descendant).where(closure.c.depth < max_depth))
+    headcount = (func.count() - 1).label('headcount')
+    return select([table.c.id, table.c.name, headcount, func.max(closure.c.depth).label('depth')]).where(
+        table.c.id == closure.c.ancestor).group_by(table.c.id, table.c.name).having(
+        func.count() > 1).order_by(headcount.desc(), table.c.id)
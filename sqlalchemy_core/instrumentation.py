@@ -0,0 +1,212 @@
+import bisect
+import functools
+import logging
+import re
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+"""
+    :Statement instrumentation
+    echo=True logs every statement, which is too much to read and too slow for production. Instrumentation
+    hooks the before/after_cursor_execute events of an engine instead and keeps, per statement template:
+
+    + the number of executions, the total, min and max time, and a latency histogram;
+    + the EXPLAIN QUERY PLAN (EXPLAIN on other databases) of the first execution slower than slow_threshold.
+
+    Statements are grouped by their SQL with the bound parameters left as placeholders, so
+    `WHERE cookie_id = ?` is one template whatever the cookie. The numbers are available from snapshot(),
+    and start_logging() writes a summary line every `interval` seconds.
+
+    It is opt-in: attach it to one engine, or to the Engine class to cover every engine of the project,
+    including those created at import time by models.py, DataAccessLayer.db_init and the ORM engines:
+
+        from sqlalchemy.engine import Engine
+        from sqlalchemy_core.instrumentation import instrumentation
+
+        instrumentation.attach(Engine)
+        instrumentation.start_logging(interval=60)
+        ...
+        instrumentation.snapshot()
+"""
+
+logger = logging.getLogger(__name__)
+
+# upper bounds of the histogram buckets, in milliseconds; the last bucket is everything slower
+BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+_WHITESPACE = re.compile(r'\s+')
+# "IN (?, ?, ?)" and multi-row "VALUES (?, ?), (?, ?)" are the same template whatever their length
+_PARAM_LIST = re.compile(r'\((?:\s*(?:\?|%s|%\(\w+\)s|:\w+)\s*,)+\s*(?:\?|%s|%\(\w+\)s|:\w+)\s*\)')
+_REPEATED_ROWS = re.compile(r'(\(\?, \.\.\.\))(?:\s*,\s*\(\?, \.\.\.\))+')
+_EXPLAINABLE = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH', 'REPLACE')
+
+
+# an application runs a few hundred distinct statements, so each is only normalised once
+@functools.lru_cache(maxsize=4096)
+def statement_template(statement):
+    statement = _WHITESPACE.sub(' ', statement).strip()
+    statement = _PARAM_LIST.sub('(?, ...)', statement)
+    return _REPEATED_ROWS.sub(r'\1, ...', statement)
+
+
+class StatementStats:
+
+    __slots__ = ('template', 'count', 'total', 'min', 'max', 'histogram', 'slow', 'plan')
+
+    def __init__(self, template):
+        self.template = template
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = 0.0
+        self.histogram = [0] * (len(BUCKETS_MS) + 1)
+        self.slow = 0
+        self.plan = None
+
+    def record(self, elapsed):
+        self.count += 1
+        self.total += elapsed
+        self.min = elapsed if self.min is None else min(self.min, elapsed)
+        self.max = max(self.max, elapsed)
+        self.histogram[bisect.bisect_left(BUCKETS_MS, elapsed * 1000)] += 1
+
+    def percentile_ms(self, q):
+        """Upper bound of the histogram bucket holding the q-th percentile (max for the last one)."""
+        rank = q / 100.0 * self.count
+        seen = 0
+        for bucket, count in enumerate(self.histogram):
+            seen += count
+            if count and seen >= rank:
+                return BUCKETS_MS[bucket] if bucket < len(BUCKETS_MS) else self.max * 1000
+        return 0.0
+
+    def as_dict(self):
+        return {'template': self.template,
+                'count': self.count,
+                'total_ms': self.total * 1000,
+                'avg_ms': self.total / self.count * 1000 if self.count else 0.0,
+                'min_ms': (self.min or 0.0) * 1000,
+                'max_ms': self.max * 1000,
+                'p50_ms': self.percentile_ms(50),
+                'p95_ms': self.percentile_ms(95),
+                'p99_ms': self.percentile_ms(99),
+                'histogram': dict(zip([str(bound) for bound in BUCKETS_MS] + ['inf'], self.histogram)),
+                'slow': self.slow,
+                'plan': self.plan}
+
+
+class Instrumentation:
+
+    def __init__(self, slow_threshold=0.1, explain=True):
+        self.slow_threshold = slow_threshold
+        self.explain = explain
+        self.statements = {}
+        self._lock = threading.Lock()
+        self._targets = []
+        self._logging = None
+
+    def attach(self, target=Engine):
+        """Start recording the statements of an engine (or of every engine, with the Engine class)."""
+        if target in self._targets:
+            return self
+        event.listen(target, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(target, 'after_cursor_execute', self._after_cursor_execute)
+        self._targets.append(target)
+        return self
+
+    def detach(self, target=Engine):
+        if target in self._targets:
+            event.remove(target, 'before_cursor_execute', self._before_cursor_execute)
+            event.remove(target, 'after_cursor_execute', self._after_cursor_execute)
+            self._targets.remove(target)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        # kept on the execution context, so a statement that fails (after_cursor_execute never runs for it)
+        # leaves nothing behind for the next one to pair with
+        if context is not None:
+            context.instrumentation_start = time.perf_counter()
+        else:
+            conn.info['instrumentation_start'] = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            start = context.instrumentation_start
+        else:
+            start = conn.info.pop('instrumentation_start')
+        elapsed = time.perf_counter() - start
+        template = statement_template(statement)
+        slow = elapsed >= self.slow_threshold
+        with self._lock:
+            stats = self.statements.get(template)
+            if stats is None:
+                stats = self.statements[template] = StatementStats(template)
+            stats.record(elapsed)
+            if slow:
+                stats.slow += 1
+            explain = slow and self.explain and stats.plan is None
+            if explain:
+                # claimed under the lock so concurrent slow executions only explain once
+                stats.plan = ''
+        if explain:
+            stats.plan = self._explain(conn, statement, parameters[0] if executemany else parameters)
+
+    def _explain(self, conn, statement, parameters):
+        if not statement.lstrip().upper().startswith(_EXPLAINABLE):
+            return None
+        prefix = 'EXPLAIN QUERY PLAN ' if conn.dialect.name == 'sqlite' else 'EXPLAIN '
+        # a raw DBAPI cursor, so the EXPLAIN itself is neither instrumented nor echoed
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute(prefix + statement, parameters)
+            return '\n'.join(' '.join(str(column) for column in row) for row in cursor.fetchall())
+        except Exception as error:
+            logger.debug('could not explain %s: %s', statement, error)
+            return None
+        finally:
+            cursor.close()
+
+    def snapshot(self, limit=None):
+        """Per template statistics, the templates taking the most total time first."""
+        with self._lock:
+            statements = [stats.as_dict() for stats in self.statements.values()]
+        statements.sort(key=lambda stats: stats['total_ms'], reverse=True)
+        return statements[:limit] if limit else statements
+
+    def reset(self):
+        with self._lock:
+            self.statements = {}
+
+    def log_line(self, limit=3):
+        statements = self.snapshot()
+        top = ' | '.join('{:.0f}ms x{} p95<={}ms {}'.format(
+            stats['total_ms'], stats['count'], stats['p95_ms'], stats['template'][:80])
+            for stats in statements[:limit])
+        return 'statements={} templates={} total={:.0f}ms slow={} top: {}'.format(
+            sum(stats['count'] for stats in statements), len(statements),
+            sum(stats['total_ms'] for stats in statements), sum(stats['slow'] for stats in statements), top)
+
+    def start_logging(self, interval=60, limit=3, level=logging.INFO):
+        """Log log_line() every `interval` seconds from a daemon thread until stop_logging()."""
+        self.stop_logging()
+        stop = threading.Event()
+
+        def run():
+            while not stop.wait(interval):
+                logger.log(level, self.log_line(limit))
+
+        thread = threading.Thread(target=run, name='sql-instrumentation', daemon=True)
+        self._logging = (stop, thread)
+        thread.start()
+
+    def stop_logging(self):
+        if self._logging is not None:
+            stop, thread = self._logging
+            stop.set()
+            thread.join()
+            self._logging = None
+
+
+instrumentation = Instrumentation()
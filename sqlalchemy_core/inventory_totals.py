@@ -0,0 +1,163 @@
+import argparse
+
+from sqlalchemy import Table, Column, Integer, MetaData, DDL, select, func, cast, create_engine, event
+
+"""
+    :Inventory totals
+    select([func.sum(cookies.c.quantity)]) and select([func.count(cookies.c.cookie_name)]) read the whole cookies
+    table on every dashboard refresh. maintain_totals() keeps the answers in a one row summary table instead:
+
+    + total_units: sum of quantity
+    + sku_count: number of cookies with a name
+    + inventory_value_cents: sum of quantity * unit_cost, in integer cents so the running total does not drift
+
+    The summary is maintained by triggers (SQLite and PostgreSQL) created with the tables, so every INSERT, UPDATE
+    and DELETE of cookies adds its difference, whether it comes from the ORM, Core, executemany or a bulk
+    query.update(); reading the totals is then a primary key lookup:
+
+        inventory_totals = maintain_totals(cookies)
+        metadata.create_all(engine)
+        read_totals(connection, inventory_totals)
+
+    The triggers make every write of cookies also update the summary row, which serializes writers on that row.
+    verify() recomputes the totals with a full scan and returns the drift, if any; rebuild() resets them:
+
+    python -m sqlalchemy_core.inventory_totals sqlite:///cookies.db [--install] [--rebuild]
+"""
+
+COLUMNS = ('total_units', 'sku_count', 'inventory_value_cents')
+
+_ROW_VALUES = {
+    'total_units': 'COALESCE({row}.quantity, 0)',
+    'sku_count': '(CASE WHEN {row}.cookie_name IS NULL THEN 0 ELSE 1 END)',
+    'inventory_value_cents': 'CAST(ROUND(COALESCE({row}.quantity, 0) * COALESCE({row}.unit_cost, 0) * 100) '
+                             'AS INTEGER)',
+}
+
+
+def _changes(sign, row):
+    return ', '.join('{column} = {column} {sign} {value}'.format(
+        column=column, sign=sign, value=_ROW_VALUES[column].format(row=row)) for column in COLUMNS)
+
+
+def _seed(cookies):
+    return 'SELECT 1, {} FROM {}'.format(', '.join(
+        'COALESCE(SUM({}), 0)'.format(_ROW_VALUES[column].format(row=cookies.name)) for column in COLUMNS),
+        cookies.name)
+
+
+def _sqlite_ddl(cookies, summary):
+    update = 'UPDATE {} SET {{}} WHERE id = 1;'.format(summary.name)
+    triggers = {
+        'INSERT': update.format(_changes('+', 'NEW')),
+        'UPDATE': update.format(_changes('-', 'OLD')) + ' ' + update.format(_changes('+', 'NEW')),
+        'DELETE': update.format(_changes('-', 'OLD')),
+    }
+    statements = ['CREATE TRIGGER IF NOT EXISTS {table}_totals_{op} AFTER {op} ON {table} BEGIN {body} END'.format(
+        table=cookies.name, op=op, body=body) for op, body in triggers.items()]
+    statements.append('INSERT OR IGNORE INTO {} (id, {}) {}'.format(
+        summary.name, ', '.join(COLUMNS), _seed(cookies)))
+    return statements
+
+
+def _postgresql_ddl(cookies, summary):
+    update = 'UPDATE {} SET {{}} WHERE id = 1;'.format(summary.name)
+    return [
+        'CREATE OR REPLACE FUNCTION {table}_totals() RETURNS trigger AS $$ BEGIN '
+        "IF TG_OP IN ('UPDATE', 'DELETE') THEN {old} END IF; "
+        "IF TG_OP IN ('INSERT', 'UPDATE') THEN {new} END IF; "
+        'RETURN NULL; END $$ LANGUAGE plpgsql'.format(
+            table=cookies.name, old=update.format(_changes('-', 'OLD')), new=update.format(_changes('+', 'NEW'))),
+        'DROP TRIGGER IF EXISTS {table}_totals ON {table}'.format(table=cookies.name),
+        'CREATE TRIGGER {table}_totals AFTER INSERT OR UPDATE OR DELETE ON {table} '
+        'FOR EACH ROW EXECUTE PROCEDURE {table}_totals()'.format(table=cookies.name),
+        'INSERT INTO {} (id, {}) {} ON CONFLICT (id) DO NOTHING'.format(
+            summary.name, ', '.join(COLUMNS), _seed(cookies)),
+    ]
+
+
+def totals_table(metadata, name='inventory_totals'):
+    return Table(name, metadata,
+                 Column('id', Integer(), primary_key=True),
+                 *[Column(column, Integer(), nullable=False, default=0) for column in COLUMNS])
+
+
+def maintain_totals(cookies, name='inventory_totals'):
+    """Add the summary table of cookies to its metadata, with the triggers created after create_all()."""
+    summary = totals_table(cookies.metadata, name)
+    for dialect, statements in (('sqlite', _sqlite_ddl), ('postgresql', _postgresql_ddl)):
+        for statement in statements(cookies, summary):
+            event.listen(cookies.metadata, 'after_create', DDL(statement).execute_if(dialect=dialect))
+    return summary
+
+
+def install(connection, cookies, name='inventory_totals'):
+    """Create the summary table and triggers of cookies in an existing database."""
+    summary = totals_table(MetaData(), name)
+    summary.create(connection, checkfirst=True)
+    ddl = _sqlite_ddl if connection.dialect.name == 'sqlite' else _postgresql_ddl
+    for statement in ddl(cookies, summary):
+        connection.execute(statement)
+    return summary
+
+
+def read_totals(connectable, summary):
+    """The maintained totals, from the one summary row (works with a connection or a session)."""
+    row = connectable.execute(select([summary.c[column] for column in COLUMNS]).where(summary.c.id == 1)).first()
+    return dict(zip(COLUMNS, row)) if row is not None else dict.fromkeys(COLUMNS, 0)
+
+
+def recompute(connectable, cookies):
+    """The totals computed from the cookies table itself, with the same per row rounding as the triggers."""
+    quantity = func.coalesce(cookies.c.quantity, 0)
+    row = connectable.execute(select([
+        func.coalesce(func.sum(quantity), 0),
+        func.count(cookies.c.cookie_name),
+        func.coalesce(func.sum(cast(func.round(quantity * func.coalesce(cookies.c.unit_cost, 0) * 100),
+                                    Integer())), 0)])).first()
+    return dict(zip(COLUMNS, (int(value) for value in row)))
+
+
+def verify(connectable, cookies, summary):
+    """{column: (stored, recomputed)} for every total that drifted; empty when they agree."""
+    stored = read_totals(connectable, summary)
+    actual = recompute(connectable, cookies)
+    return {column: (stored[column], actual[column]) for column in COLUMNS if stored[column] != actual[column]}
+
+
+def rebuild(connection, cookies, summary):
+    totals = recompute(connection, cookies)
+    with connection.begin():
+        if connection.execute(summary.update().where(summary.c.id == 1).values(**totals)).rowcount == 0:
+            connection.execute(summary.insert().values(id=1, **totals))
+    return totals
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Verify (or rebuild) the maintained inventory totals.')
+    parser.add_argument('url', help='e.g. sqlite:///cookies.db')
+    parser.add_argument('--table', default='cookies')
+    parser.add_argument('--summary', default='inventory_totals')
+    parser.add_argument('--install', action='store_true', help='create the summary table and triggers first')
+    parser.add_argument('--rebuild', action='store_true', help='reset the totals to the recomputed ones')
+    args = parser.parse_args(argv)
+
+    engine = create_engine(args.url)
+    metadata = MetaData()
+    cookies = Table(args.table, metadata, autoload=True, autoload_with=engine)
+    with engine.connect() as connection:
+        summary = install(connection, cookies, args.summary) if args.install else \
+            Table(args.summary, metadata, autoload=True, autoload_with=engine)
+        drift = verify(connection, cookies, summary)
+        for column, (stored, actual) in sorted(drift.items()):
+            print('{:<22} stored {:>14} recomputed {:>14} drift {:>+12}'.format(
+                column, stored, actual, stored - actual))
+        if not drift:
+            print('no drift: {}'.format(read_totals(connection, summary)))
+        elif args.rebuild:
+            print('rebuilt: {}'.format(rebuild(connection, cookies, summary)))
+    return 1 if drift and not args.rebuild else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -1,7 +1,6 @@
-from sqlalchemy import Integer, MetaData, String, Numeric, DateTime, Table, Column, ForeignKey, BOOLEAN, create_engine
+from sqlalchemy import Integer, MetaData, String, Numeric, DateTime, Table, Column, ForeignKey, BOOLEAN
 from datetime import datetime
 
-engine = create_engine('sqlite:///cookies.db')
 metadata = MetaData()
 
 """
@@ -34,6 +33,9 @@ metadata = MetaData()
             cookie_sku
             quantity
             unit_cost
+
+    This module only declares the tables; the engines that create them (cookies.db, employees.db) on first use
+    are in database.py.
 """
 
 users = Table('users', metadata,
@@ -50,7 +52,7 @@ cookies = Table('cookies', metadata,
                 Column('cookie_id', Integer(), primary_key=True),
                 Column('cookie_name', String(50), index=True),
                 Column('cookie_recipe_url', String(255)),
-                Column('cookie_sku', String(55)),
+                Column('cookie_sku', String(55), unique=True),
                 Column('quantity', Integer()),
                 Column('unit_cost', Numeric(12, 2))
                 )
@@ -82,17 +84,16 @@ line_items = Table('line_items', metadata,
 # Define Foreign key explicitly
 # order_id = ForeignKeyConstraint(['order_id'], ['orders.order_id'])
 
-# create all tables and columns defined above
-metadata.create_all(engine)
+from sqlalchemy_core.inventory_totals import maintain_totals
 
+# running totals of the cookies table, maintained by triggers, see inventory_totals.py
+inventory_totals = maintain_totals(cookies)
 
-engine_emp = create_engine('sqlite:///employees.db')
-metadata = MetaData()
+
+employee_metadata = MetaData()
 
 employees = Table(
-    'employee', metadata,
+    'employee', employee_metadata,
     Column('id', Integer, primary_key=True),
     Column('manager_id', None, ForeignKey('employee.id')),
     Column('name', String(255)))
-
-metadata.create_all(engine_emp)
@@ -0,0 +1,153 @@
+import base64
+import hashlib
+import json
+from collections import namedtuple
+from datetime import date, datetime
+from decimal import Decimal
+
+from sqlalchemy import and_, or_, tuple_
+from sqlalchemy.sql import operators
+
+"""
+    :Keyset pagination
+    query.order_by(Cookie.quantity).offset(10000 * 20).limit(20) makes the database walk (and throw away) the
+    200000 rows before the page, so every page costs more than the one before. Keyset ("seek") pagination
+    remembers where the previous page ended instead, and asks for the rows after it:
+
+        WHERE (cookies.quantity, cookies.cookie_id) > (:last_quantity, :last_cookie_id)
+        ORDER BY cookies.quantity, cookies.cookie_id LIMIT 20
+
+    which an index on (quantity, cookie_id) answers by seeking straight to the first row of the page
+    (on SQLite an index on quantity alone does, as the rowid cookie_id is part of every index):
+
+        page = keyset_page(session.query(Cookie), [Cookie.quantity, Cookie.cookie_id], page_size=20)
+        page = keyset_page(session.query(Cookie), [Cookie.quantity, Cookie.cookie_id], 20, page.next_token)
+
+        page = keyset_page(select([cookies]), [cookies.c.quantity, cookies.c.cookie_id], 20, token, connection)
+
+    The ordering must end with a unique column (the primary key) so that every row has a distinct position,
+    and its columns must be selected and NOT NULL (NULLs do not compare; use coalesce() labels otherwise).
+    Ascending and descending columns can be mixed (desc(Cookie.quantity), Cookie.cookie_id); the predicate is
+    then spelled out as ORs, which indexes serve less well than a row value comparison.
+
+    next_token is None on the last page. Tokens are opaque url safe strings, tied to the ordering they were
+    made for: using one with another ordering raises InvalidToken. They are not signed, so a client can forge
+    the position it continues from, nothing more.
+"""
+
+Page = namedtuple('Page', 'rows next_token')
+
+
+class InvalidToken(ValueError):
+    pass
+
+
+def _order_terms(ordering):
+    """[(column, descending)] of the order_by expressions."""
+    terms = []
+    for expression in ordering:
+        modifier = getattr(expression, 'modifier', None)
+        if modifier in (operators.desc_op, operators.asc_op):
+            terms.append((expression.element, modifier is operators.desc_op))
+        else:
+            terms.append((expression, False))
+    return terms
+
+
+def _fingerprint(terms):
+    # Cookie.quantity and cookies.c.quantity are the same ordering
+    spec = ','.join('{}{}'.format(str(getattr(column, '__clause_element__', lambda: column)()),
+                                  ' DESC' if descending else '') for column, descending in terms)
+    return hashlib.sha1(spec.encode('utf-8')).hexdigest()[:12]
+
+
+def _encode_value(value):
+    if isinstance(value, Decimal):
+        return {'d': str(value)}
+    if isinstance(value, datetime):
+        return {'t': value.isoformat()}
+    if isinstance(value, date):
+        return {'D': value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        (tag, text), = value.items()
+        if tag == 'd':
+            return Decimal(text)
+        if tag == 't':
+            return datetime.fromisoformat(text)
+        if tag == 'D':
+            return date.fromisoformat(text)
+    return value
+
+
+def encode_token(ordering, values):
+    """The continuation token of the row with these values of the ordering columns."""
+    payload = {'o': _fingerprint(_order_terms(ordering)), 'k': [_encode_value(value) for value in values]}
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode('utf-8')).decode('ascii')
+
+
+def decode_token(ordering, token):
+    """The values of the ordering columns stored in token."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token.encode('ascii')).decode('utf-8'))
+        fingerprint, values = payload['o'], [_decode_value(value) for value in payload['k']]
+    except (ValueError, TypeError, KeyError, AttributeError):
+        raise InvalidToken('malformed page token')
+    if fingerprint != _fingerprint(_order_terms(ordering)) or len(values) != len(ordering):
+        raise InvalidToken('page token made for another ordering')
+    return values
+
+
+def after(ordering, values):
+    """The predicate of the rows that come after the row with these values of the ordering columns."""
+    terms = _order_terms(ordering)
+    directions = {descending for _, descending in terms}
+    if len(directions) == 1:
+        columns = tuple_(*[column for column, _ in terms])
+        return columns < tuple_(*values) if directions.pop() else columns > tuple_(*values)
+    clauses = []
+    for i, (column, descending) in enumerate(terms):
+        equal = [terms[j][0] == values[j] for j in range(i)]
+        clauses.append(and_(*(equal + [column < values[i] if descending else column > values[i]])))
+    return or_(*clauses)
+
+
+def _key(row, terms, orm):
+    if orm:
+        # an entity, or a tuple row of an ORM query: the ordering columns are its attributes
+        return [getattr(row, column.key) for column, _ in terms]
+    return [row[column] for column, _ in terms]
+
+
+def keyset_page(source, ordering, page_size=20, token=None, connectable=None):
+    """The page of an ORM query or Core select (run on connectable) that follows token (the first without)."""
+    terms = _order_terms(ordering)
+    orm = hasattr(source, 'session') and hasattr(source, 'statement')
+    if token is not None:
+        predicate = after(ordering, decode_token(ordering, token))
+        source = source.filter(predicate) if orm else source.where(predicate)
+    source = source.order_by(*ordering).limit(page_size + 1)
+    if orm:
+        rows = source.all()
+    elif connectable is None:
+        raise ValueError('paging a select needs a connection, an engine or a session')
+    else:
+        rows = connectable.execute(source).fetchall()
+    next_token = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_token = encode_token(ordering, _key(rows[-1], terms, orm))
+    return Page(rows, next_token)
+
+
+def iter_pages(source, ordering, page_size=20, token=None, connectable=None):
+    """Yield every page from token (or the first) to the last."""
+    while True:
+        page = keyset_page(source, ordering, page_size, token, connectable)
+        yield page
+        token = page.next_token
+        if token is None:
+            break
@@ -0,0 +1,230 @@
+import logging
+import random
+import time
+from collections import OrderedDict, namedtuple
+from datetime import datetime
+
+from sqlalchemy import (Boolean, CheckConstraint, Column, DateTime, ForeignKey, Integer, MetaData, Numeric, String,
+                        Table, and_, bindparam, func, select, update)
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
+
+"""
+    :Shipping orders
+    The tables of the shipping examples in transactions.py, with the version_id counter of the cookies, and the
+    functions that ship orders from them. Importing this module creates no engine and no file: every function
+    takes the connection to work in.
+
+        metadata.create_all(engine)
+        with engine.connect() as conn:
+            ship_orders([1, 2], conn)
+            ship_it_optimistic(3, conn)
+"""
+
+logger = logging.getLogger(__name__)
+metadata = MetaData()
+
+cookies = Table('cookies', metadata,
+                Column('cookie_id', Integer(), primary_key=True),
+                Column('cookie_name', String(50), index=True),
+                Column('cookie_recipe_url', String(255)),
+                Column('cookie_sku', String(55)),
+                Column('quantity', Integer()),
+                Column('unit_cost', Numeric(12, 2)),
+                Column('version_id', Integer(), nullable=False, default=1),
+                CheckConstraint('quantity >= 0', name='quantity_positive')
+                )
+
+users = Table('users', metadata,
+              Column('user_id', Integer(), primary_key=True),
+              Column('username', String(15), nullable=False, unique=True),
+              Column('email_address', String(255), nullable=False),
+              Column('phone', String(20), nullable=False),
+              Column('password', String(25), nullable=False),
+              Column('created_on', DateTime(), default=datetime.now),
+              Column('updated_on', DateTime(), default=datetime.now, onupdate=datetime.now)
+              )
+
+orders = Table('orders', metadata,
+               Column('order_id', Integer()),
+               Column('user_id', ForeignKey('users.user_id')),
+               Column('shipped', Boolean(), default=False)
+               )
+
+line_items = Table('line_items', metadata,
+                   Column('line_items_id', Integer(), primary_key=True),
+                   Column('order_id', ForeignKey('orders.order_id')),
+                   Column('cookie_id', ForeignKey('cookies.cookie_id')),
+                   Column('quantity', Integer()),
+                   Column('extended_cost', Numeric(12, 2))
+                   )
+
+"""
+    :Shipping a batch of orders
+    ship_it issues one UPDATE per line item and one more for the order, which adds up quickly when
+    the fulfilment run ships tens of thousands of orders. ship_orders ships a whole batch with a fixed
+    number of statements:
+
+    1- The batch of order ids is loaded into a temporary table, so no statement depends on its size.
+    2- The orders of the batch that exist and are not shipped yet, the demand per order and cookie, and the
+       stock of the cookies involved, are read once. The other orders are skipped.
+    3- Orders are allocated in the order they were given; an order that would take a cookie below zero
+       (the quantity_positive constraint) is dropped from the batch and reported back.
+    4- One UPDATE marks the remaining orders shipped, and one correlated-subquery UPDATE decrements every
+       cookie by their demand.
+
+    The result is a Shipment(shipped, unshipped, skipped, error) of order ids. If the inventory changed
+    underneath us (the CheckConstraint fires) or another shipper shipped one of the orders first, the whole
+    batch is rolled back, nothing is shipped and error is the exception: the caller can ship the batch again.
+    Any other error rolls the batch back and is raised.
+"""
+
+Shipment = namedtuple('Shipment', 'shipped unshipped skipped error')
+
+ship_batch = Table('ship_batch', MetaData(),
+                   Column('position', Integer(), primary_key=True),
+                   Column('order_id', Integer(), nullable=False, index=True),
+                   prefixes=['TEMPORARY']
+                   )
+
+
+def _roll_back(conn, transaction):
+    transaction.rollback()
+    # pysqlite only starts the transaction at the first INSERT, so the rollback may leave the temp table
+    ship_batch.drop(conn, checkfirst=True)
+
+
+def ship_orders(order_ids, conn):
+    """Ship a batch of orders in one transaction; returns Shipment(shipped, unshipped, skipped, error).
+
+    unshipped are the orders there is not enough stock for, skipped the ones that do not exist or are already
+    shipped.
+    """
+    order_ids = list(OrderedDict.fromkeys(order_ids))
+    if not order_ids:
+        return Shipment([], [], [], None)
+    transaction = conn.begin()
+    try:
+        ship_batch.create(conn)
+        conn.execute(ship_batch.insert(), [{'order_id': order_id} for order_id in order_ids])
+
+        batch_ids = select([ship_batch.c.order_id])
+        s = select([orders.c.order_id]).where(and_(orders.c.order_id.in_(batch_ids), orders.c.shipped == False))
+        skipped = set(order_ids) - {row.order_id for row in conn.execute(s)}
+
+        s = select([line_items.c.cookie_id, cookies.c.quantity]).distinct()
+        s = s.select_from(line_items.join(cookies)).where(line_items.c.order_id.in_(batch_ids))
+        stock = {row.cookie_id: row.quantity or 0 for row in conn.execute(s)}
+
+        s = select([ship_batch.c.order_id, line_items.c.cookie_id,
+                    func.sum(line_items.c.quantity).label('quantity')])
+        s = s.select_from(ship_batch.join(line_items, line_items.c.order_id == ship_batch.c.order_id))
+        s = s.group_by(ship_batch.c.position, ship_batch.c.order_id, line_items.c.cookie_id)
+        s = s.order_by(ship_batch.c.position)
+        demand = OrderedDict()
+        for row in conn.execute(s):
+            demand.setdefault(row.order_id, []).append((row.cookie_id, row.quantity))
+
+        unshipped = set()
+        for order_id, items in demand.items():
+            if order_id in skipped:
+                continue
+            if all(stock.get(cookie_id, 0) >= quantity for cookie_id, quantity in items):
+                for cookie_id, quantity in items:
+                    stock[cookie_id] -= quantity
+            else:
+                unshipped.add(order_id)
+
+        if unshipped or skipped:
+            d = ship_batch.delete().where(ship_batch.c.order_id == bindparam('dropped_id'))
+            conn.execute(d, [{'dropped_id': order_id} for order_id in unshipped | skipped])
+        shipped = [order_id for order_id in order_ids if order_id not in unshipped | skipped]
+
+        u = update(orders).where(and_(orders.c.order_id.in_(batch_ids), orders.c.shipped == False))
+        u = u.values(shipped=True)
+        changed = conn.execute(u).rowcount
+        if changed != len(shipped):
+            raise StaleDataError('{} of the {} orders to ship were shipped by another shipper'.format(
+                len(shipped) - changed, len(shipped)))
+
+        batch_demand = select([func.sum(line_items.c.quantity)]).where(and_(
+            line_items.c.cookie_id == cookies.c.cookie_id,
+            line_items.c.order_id.in_(batch_ids)
+        )).as_scalar()
+        u = update(cookies).where(cookies.c.cookie_id.in_(
+            select([line_items.c.cookie_id]).where(line_items.c.order_id.in_(batch_ids))))
+        u = u.values(quantity=cookies.c.quantity - batch_demand,
+                     version_id=cookies.c.version_id + 1)
+        conn.execute(u)
+
+        ship_batch.drop(conn)
+        transaction.commit()
+    except (IntegrityError, StaleDataError) as error:
+        _roll_back(conn, transaction)
+        return Shipment([], [], [], error)
+    except Exception:
+        _roll_back(conn, transaction)
+        raise
+    return Shipment(shipped, [order_id for order_id in order_ids if order_id in unshipped],
+                    [order_id for order_id in order_ids if order_id in skipped], None)
+
+
+"""
+    :Optimistic concurrency
+    In our fast-paced warehouse two shippers can read the same stock level and both decrement it,
+    so one of the updates is lost. Instead of holding a lock while we work, every cookie row carries
+    a version_id counter: we read the stock and its version outside of any transaction, and the UPDATE
+    only applies if the version is still the one we read (bumping it at the same time).
+    If another shipper got there first, the UPDATE matches no row, we roll back and try again after a
+    short, randomised and bounded backoff.
+    The order itself is marked shipped first, only if it is not shipped yet: an order that does not exist or
+    that another shipper already shipped takes no stock.
+"""
+
+
+def ship_it_optimistic(order_id, conn, max_retries=5, backoff=0.01, max_backoff=0.5, stats=None):
+    """Ship an order using the version_id counter of the cookies it takes stock from.
+
+    Returns True once the order is shipped, and False if there is not enough stock or the order does not exist
+    or is already shipped. Raises StaleDataError when the order still conflicts with other shippers after max_retries retries.
+    The number of conflicts is added to stats['conflicts'] when a stats dict is given.
+    """
+    s = select([line_items.c.cookie_id, cookies.c.version_id,
+                func.sum(line_items.c.quantity).label('quantity')])
+    s = s.select_from(line_items.join(cookies)).where(line_items.c.order_id == order_id)
+    s = s.group_by(line_items.c.cookie_id, cookies.c.version_id)
+    u = update(cookies).where(and_(cookies.c.cookie_id == bindparam('b_cookie_id'),
+                                   cookies.c.version_id == bindparam('b_version_id')))
+    u = u.values(quantity=cookies.c.quantity - bindparam('b_quantity'),
+                 version_id=cookies.c.version_id + 1)
+    ship = update(orders).where(and_(orders.c.order_id == order_id, orders.c.shipped == False))
+    ship = ship.values(shipped=True)
+    for attempt in range(max_retries + 1):
+        cookies_to_ship = conn.execute(s).fetchall()
+        transaction = conn.begin()
+        try:
+            if conn.execute(ship).rowcount != 1:
+                transaction.rollback()
+                logger.warning('order %s does not exist or is already shipped', order_id)
+                return False
+            stale = False
+            for cookie in cookies_to_ship:
+                result = conn.execute(u, b_cookie_id=cookie.cookie_id, b_version_id=cookie.version_id,
+                                      b_quantity=cookie.quantity)
+                if result.rowcount != 1:
+                    stale = True
+                    break
+            if not stale:
+                transaction.commit()
+                return True
+            transaction.rollback()
+        except IntegrityError as error:
+            transaction.rollback()
+            logger.warning('order %s not shipped: %s', order_id, error.orig)
+            return False
+        if stats is not None:
+            stats['conflicts'] = stats.get('conflicts', 0) + 1
+        if attempt < max_retries:
+            time.sleep(random.uniform(0, min(max_backoff, backoff * 2 ** attempt)))
+    raise StaleDataError("Order ID {} conflicted with other shippers {} times".format(
+        order_id, max_retries + 1))
@@ -21,6 +21,7 @@ conn = engine1.connect()
     `echo`
     This will log the actions processed by the engine, such as SQL statements and their parameters.
     It defaults to false.
+    To see which statements are slow without logging all of them, use sqlalchemy_core/instrumentation.py instead.
 
     `encoding`
     This defines the string encoding used by SQLAlchemy. It defaults to utf-8, and mostDBAPIs support this encoding by default.
@@ -1,8 +1,7 @@
-from sqlalchemy import MetaData, create_engine
+from sqlalchemy import create_engine
 
 
 engine = create_engine('sqlite:///cookies_trans.db')
-metadata = MetaData()
 
 """
     There is already a good example of when we might want to do this in our existing database.
@@ -13,49 +12,10 @@ metadata = MetaData()
 
 """
 
-from datetime import datetime
-
-from sqlalchemy import (MetaData, Table, Column, Integer, Numeric, String,
-                        DateTime, ForeignKey, Boolean, create_engine, CheckConstraint)
-
-metadata = MetaData()
-
-cookies = Table('cookies', metadata,
-                Column('cookie_id', Integer(), primary_key=True),
-                Column('cookie_name', String(50), index=True),
-                Column('cookie_recipe_url', String(255)),
-                Column('cookie_sku', String(55)),
-                Column('quantity', Integer()),
-                Column('unit_cost', Numeric(12, 2)),
-                CheckConstraint('quantity >= 0', name='quantity_positive')
-                )
-
-users = Table('users', metadata,
-              Column('user_id', Integer(), primary_key=True),
-              Column('username', String(15), nullable=False, unique=True),
-              Column('email_address', String(255), nullable=False),
-              Column('phone', String(20), nullable=False),
-              Column('password', String(25), nullable=False),
-              Column('created_on', DateTime(), default=datetime.now),
-              Column('updated_on', DateTime(), default=datetime.now, onupdate=datetime.now)
-              )
-
-orders = Table('orders', metadata,
-               Column('order_id', Integer()),
-               Column('user_id', ForeignKey('users.user_id')),
-               Column('shipped', Boolean(), default=False)
-               )
-
-line_items = Table('line_items', metadata,
-                   Column('line_items_id', Integer(), primary_key=True),
-                   Column('order_id', ForeignKey('orders.order_id')),
-                   Column('cookie_id', ForeignKey('cookies.cookie_id')),
-                   Column('quantity', Integer()),
-                   Column('extended_cost', Numeric(12, 2))
-                   )
-
-# metadata.create_all(engine)
-connection = engine.connect()
+from sqlalchemy_core.shipping import metadata, cookies, users, orders, line_items
+
+# the tables, with the version_id counter of the cookies, are declared in shipping.py; running this module
+# creates them in cookies_trans.db (see the end of the module)
 
 from sqlalchemy import select, insert, update
 
@@ -148,8 +108,6 @@ def ship_it(order_id):
         print(error)
 
 
-print(ship_it(1))
-
 """
     We can see that we don’t have enough cookies in our inventory to fulfill the second order;
     however, in our fast-paced warehouse, these orders might be processed at the same time.
@@ -157,8 +115,27 @@ print(ship_it(1))
 
 """
 
-s = select([cookies.c.cookie_name, cookies.c.quantity])
-results = connection.execute(s).fetchall()
+"""
+    :Shipping a batch of orders
+    ship_it issues one UPDATE per line item and one more for the order. ship_orders (in shipping.py) ships a
+    whole batch with a fixed number of statements, and ship_it_optimistic uses the version_id counter of the
+    cookies instead of holding a lock: see shipping.py.
+"""
+
+from sqlalchemy_core.shipping import ship_orders, ship_it_optimistic
+
+
+if __name__ == '__main__':
+    metadata.create_all(engine)
+    connection = engine.connect()
+
+    print(ship_it(1))
+
+    s = select([cookies.c.cookie_name, cookies.c.quantity])
+    results = connection.execute(s).fetchall()
+
+    for r in results:
+        print(r)
 
-for r in results:
-    print(r)
+    print(ship_orders([1, 2], connection))
+    print(ship_it_optimistic(1, connection))
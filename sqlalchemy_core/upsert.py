@@ -0,0 +1,234 @@
+import sqlite3
+from collections import namedtuple
+from itertools import chain
+
+from sqlalchemy import Index, Table, UniqueConstraint, and_, bindparam, column, func, literal, or_, select, table as table_clause
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session, class_mapper
+from sqlalchemy.sql.expression import ClauseElement, Insert
+
+"""
+    :Bulk upsert
+    session.add(User(username='cookiemon', ...)) for a user that already exists fails with an IntegrityError
+    and rolls back the whole unit of work. The catalogue and customer syncs insert the new rows and update the
+    existing ones instead, with one INSERT ... ON CONFLICT (...) DO UPDATE executed for every row:
+
+        stats = upsert(connection, cookies, rows, rules={'quantity': 'add'})
+        stats = upsert(session, User, rows)
+        stats.inserted, stats.updated
+
+    1- The conflict target is the unique column(s) of the table (cookie_sku, username) unless given.
+    2- rules says how each column of an existing row changes: 'overwrite' (the default for the columns of the
+       rows), 'keep', 'add' (restocking: quantity = coalesce(quantity, 0) + the new quantity), a SQL expression
+       or a function of (existing column, new value column) that returns one.
+    3- Columns the rows do not have are set to their onupdate value (updated_on); for a mapped class, the
+       version_id column is bumped, so ship_it_optimistic notices the change.
+    4- The rows are written in chunks, all in one transaction. Each chunk is one executemany of the statement,
+       after counting which of its keys exist with one IN (...), so a chunk has as many rows as that query
+       can bind variables (999 before SQLite 3.32, 32766 since, 32767 for PostgreSQL).
+
+    Given a session (flushed first), or a connection already in a transaction, the upsert runs in a SAVEPOINT
+    and is left for the caller to commit: a failure only rolls back the upsert, not the caller's other changes.
+
+    SQLite (>= 3.24) and PostgreSQL are supported; SQLAlchemy 1.3 only builds ON CONFLICT for PostgreSQL, so
+    the SQLite statement is compiled here. A multi-row VALUES statement would save little on SQLite and
+    SQLAlchemy 1.3 takes most of a second to compile one of a few thousand rows; on PostgreSQL,
+    create_engine(url, executemany_mode='values') has psycopg2 send the executemany as pages of VALUES.
+    The inserted/updated counts are exact unless another writer changes the table at the same time. A key that
+    appears twice in the rows starts a new chunk, so the second row updates the first. Objects already loaded
+    in a session are not refreshed: expire them after the upsert.
+"""
+
+UpsertStats = namedtuple('UpsertStats', 'rows inserted updated chunks')
+
+RULES = ('overwrite', 'keep', 'add')
+
+
+def batch_transaction(connection):
+    """A transaction for a batch: a SAVEPOINT within the caller's transaction, if there is one."""
+    if not connection.in_transaction():
+        return connection.begin()
+    if connection.dialect.name == 'sqlite' and not connection.connection.in_transaction:
+        # pysqlite only starts its transaction at the first INSERT, UPDATE or DELETE; a SAVEPOINT before it
+        # would start one of its own, which its RELEASE commits
+        connection.execute('BEGIN')
+    return connection.begin_nested()
+
+
+def max_variables(dialect):
+    """The most bound variables one statement can have on the dialect."""
+    if dialect.name == 'sqlite':
+        return 32766 if sqlite3.sqlite_version_info >= (3, 32, 0) else 999
+    return 32767
+
+
+class _SQLiteUpsert(Insert):
+    conflict_target = ()
+    set_ = ()
+
+
+@compiles(_SQLiteUpsert, 'sqlite')
+def _compile_sqlite_upsert(element, compiler, **kw):
+    return '{} ON CONFLICT ({}) DO UPDATE SET {}'.format(
+        compiler.visit_insert(element, **kw),
+        ', '.join(compiler.preparer.quote(target.name) for target in element.conflict_target),
+        ', '.join('{} = {}'.format(compiler.preparer.quote(target.name), compiler.process(value, **kw))
+                  for target, value in element.set_))
+
+
+def _sqlite_upsert(table, conflict_target, set_rules):
+    excluded = table_clause('excluded', *[column(target.name, target.type) for target in table.c])
+    statement = _SQLiteUpsert(table)
+    statement.conflict_target = conflict_target
+    statement.set_ = [(target, rule(target, excluded.c[target.name])) for target, rule in set_rules]
+    return statement
+
+
+def _postgresql_upsert(table, conflict_target, set_rules):
+    statement = postgresql.insert(table)
+    return statement.on_conflict_do_update(
+        index_elements=conflict_target,
+        set_={target.name: rule(target, statement.excluded[target.name]) for target, rule in set_rules})
+
+
+_BUILDERS = {'sqlite': _sqlite_upsert, 'postgresql': _postgresql_upsert}
+
+
+def _target(target):
+    """(table, version_id column or None) of a Table or a mapped class."""
+    if isinstance(target, Table):
+        return target, None
+    mapper = class_mapper(target)
+    return mapper.local_table, mapper.version_id_col
+
+
+def unique_columns(table):
+    """The columns of the one unique constraint (or unique index) of the table."""
+    candidates = [tuple(constraint.columns) for constraint in table.constraints
+                  if isinstance(constraint, UniqueConstraint)]
+    candidates += [tuple(index.columns) for index in table.indexes if isinstance(index, Index) and index.unique]
+    candidates = list(dict.fromkeys(candidates))
+    if len(candidates) != 1:
+        raise ValueError('{} has {} unique constraints, give the conflict columns'.format(
+            table.name, len(candidates)))
+    return candidates[0]
+
+
+def _rule(rule):
+    """A function of (existing column, new value column) for rule."""
+    if isinstance(rule, ClauseElement):
+        return lambda existing, new: rule
+    if rule == 'overwrite':
+        return lambda existing, new: new
+    if rule == 'add':
+        return lambda existing, new: func.coalesce(existing, 0) + new
+    if callable(rule):
+        return rule
+    raise ValueError('unknown upsert rule {!r}, use one of {}, an expression or a function'.format(
+        rule, ', '.join(RULES)))
+
+
+def _onupdate(default):
+    if default.is_clause_element:
+        return lambda existing, new: default.arg
+    if default.is_callable:
+        # called once per chunk, like a Core update() calls it once per statement
+        return lambda existing, new: literal(default.arg(None), existing.type)
+    return lambda existing, new: literal(default.arg, existing.type)
+
+
+def _set_rules(table, version, names, conflict_target, rules):
+    """[(column, function of (existing, new))] of the DO UPDATE SET clause."""
+    rules = dict(rules or {})
+    unknown = set(rules) - set(table.c.keys())
+    if unknown:
+        raise ValueError('no such columns in {}: {}'.format(table.name, ', '.join(sorted(unknown))))
+    set_rules = []
+    for target in table.c:
+        if target in conflict_target or target.primary_key:
+            continue
+        rule = rules.get(target.key)
+        if rule is None:
+            if target.key in names:
+                rule = 'overwrite'
+            elif version is not None and target is version:
+                rule = lambda existing, new: existing + 1
+            elif target.onupdate is not None:
+                rule = _onupdate(target.onupdate)
+            else:
+                continue
+        if not (isinstance(rule, str) and rule == 'keep'):
+            set_rules.append((target, _rule(rule)))
+    return set_rules
+
+
+def _chunks(rows, names, keys, size):
+    """Lists of at most size rows, where no key appears twice."""
+    chunk, seen = [], set()
+    for row in rows:
+        if set(row) != names:
+            raise ValueError('every row must have the columns {}'.format(', '.join(sorted(names))))
+        key = tuple(row[name] for name in keys)
+        if len(chunk) == size or key in seen:
+            yield chunk
+            chunk, seen = [], set()
+        chunk.append(row)
+        seen.add(key)
+    if chunk:
+        yield chunk
+
+
+def _existing(connection, conflict_target, keys, chunk):
+    """How many of the keys of the chunk are already in the table."""
+    if len(conflict_target) == 1:
+        # one expanding parameter rather than a BindParameter per key, which SQLAlchemy is slow to build
+        statement = select([func.count()]).where(conflict_target[0].in_(bindparam('keys', expanding=True)))
+        return connection.execute(statement, keys=[row[keys[0]] for row in chunk]).scalar()
+    condition = or_(*[and_(*[target == row[key] for target, key in zip(conflict_target, keys)]) for row in chunk])
+    return connection.execute(select([func.count()]).where(condition)).scalar()
+
+
+def upsert(connectable, target, rows, conflict=None, rules=None, variables=None):
+    """Insert the rows (dicts of column values) of target (a Table or a mapped class), updating the ones whose
+    conflict columns match an existing row; returns UpsertStats(rows, inserted, updated, chunks).
+
+    connectable is an engine, a connection or a session (which is flushed first, and left for the caller to
+    commit).
+    """
+    if isinstance(connectable, Engine):
+        with connectable.connect() as connection:
+            return upsert(connection, target, rows, conflict, rules, variables)
+    if isinstance(connectable, Session):
+        connectable.flush()
+        return upsert(connectable.connection(), target, rows, conflict, rules, variables)
+    connection = connectable
+    builder = _BUILDERS.get(connection.dialect.name)
+    if builder is None:
+        raise NotImplementedError('upsert supports {}, not {}'.format(
+            ' and '.join(sorted(_BUILDERS)), connection.dialect.name))
+    table, version = _target(target)
+    conflict_target = tuple(table.c[name] for name in conflict) if conflict else unique_columns(table)
+    keys = [key_column.key for key_column in conflict_target]
+
+    rows = iter(rows)
+    first = next(rows, None)
+    if first is None:
+        return UpsertStats(0, 0, 0, 0)
+    names = set(first)
+    if not set(keys) <= names:
+        raise ValueError('the rows must have the conflict columns {}'.format(', '.join(keys)))
+    set_rules = _set_rules(table, version, names, conflict_target, rules)
+    size = max(1, (variables or max_variables(connection.dialect)) // len(keys))
+
+    total = inserted = chunks = 0
+    with batch_transaction(connection):
+        for chunk in _chunks(chain([first], rows), names, keys, size):
+            existing = _existing(connection, conflict_target, keys, chunk)
+            connection.execute(builder(table, conflict_target, set_rules), chunk)
+            total += len(chunk)
+            inserted += len(chunk) - existing
+            chunks += 1
+    return UpsertStats(total, inserted, total - inserted, chunks)
+
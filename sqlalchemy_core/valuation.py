@@ -0,0 +1,93 @@
+from collections import namedtuple
+
+import numpy as np
+from sqlalchemy import select
+
+from sqlalchemy_core.columnar import CHUNK_SIZE, iter_chunks
+
+"""
+    :Batch valuation
+    select([cookies.c.cookie_name, cast(cookies.c.quantity * cookies.c.unit_cost, Numeric(12, 2))]) values the
+    inventory one formatted row at a time, and nothing checks LineItems.extended_cost, which is entered by hand,
+    against the cookie's unit_cost. For the nightly valuation of the whole catalogue and every line item, the
+    columns are fetched in chunks (see columnar.py) and valued in NumPy, in integer cents throughout:
+
+        inventory = value_inventory(connection, cookies)
+        inventory.totals                            # same keys and rounding as inventory_totals.recompute()
+        inventory.cookie_id, inventory.value_cents  # value of every cookie
+
+        lines = value_line_items(connection, line_items, cookies)
+        lines.order_id, lines.order_cents           # cost of every order, from quantity * unit_cost
+        lines.mismatched, lines.drift_cents         # line items whose extended_cost is not that, and by how much
+
+    unit_cost is a Numeric(12, 2), so rounding each value to cents is exact; NULL quantities and costs count as
+    0, as in the inventory_totals triggers.
+"""
+
+InventoryValuation = namedtuple('InventoryValuation', 'cookie_id value_cents totals')
+LineItemValuation = namedtuple('LineItemValuation',
+                               'order_id order_cents expected_cents recorded_cents mismatched drift_cents')
+
+
+def as_int64(array):
+    """Integer (or integer cents) column of a chunk as int64, NULL (NaN) as 0."""
+    if array.dtype.kind == 'f':
+        return np.rint(np.nan_to_num(array)).astype(np.int64)
+    return array.astype(np.int64, copy=False)
+
+
+def group_sum(keys, values):
+    """(distinct keys, sum of values per key), exact for integer values."""
+    if not len(keys):
+        return keys, values
+    order = np.argsort(keys, kind='stable')
+    keys, values = keys[order], values[order]
+    starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    return keys[starts], np.add.reduceat(values, starts)
+
+
+def _concatenate(arrays, dtype=np.int64):
+    return np.concatenate(arrays) if arrays else np.empty(0, dtype=dtype)
+
+
+def value_inventory(connectable, cookies, chunk_size=CHUNK_SIZE):
+    """The value in cents of every cookie, and the totals of the cookies table."""
+    statement = select([cookies.c.cookie_id, cookies.c.quantity, cookies.c.unit_cost,
+                        cookies.c.cookie_name.isnot(None).label('named')])
+    cookie_ids, values = [], []
+    total_units = sku_count = 0
+    for chunk in iter_chunks(statement, connectable, chunk_size=chunk_size, numeric='cents'):
+        quantity = as_int64(chunk['quantity'])
+        value = quantity * as_int64(chunk['unit_cost'])
+        cookie_ids.append(as_int64(chunk['cookie_id']))
+        values.append(value)
+        total_units += int(quantity.sum())
+        sku_count += int(np.count_nonzero(chunk['named']))
+    value_cents = _concatenate(values)
+    totals = {'total_units': total_units, 'sku_count': sku_count,
+              'inventory_value_cents': int(value_cents.sum())}
+    return InventoryValuation(_concatenate(cookie_ids), value_cents, totals)
+
+
+def value_line_items(connectable, line_items, cookies, chunk_size=CHUNK_SIZE):
+    """Order costs and extended_cost reconciliation of every line item, from the unit_cost of its cookie."""
+    statement = select([line_items.c.line_items_id, line_items.c.order_id, line_items.c.quantity,
+                        line_items.c.extended_cost, cookies.c.unit_cost]).select_from(
+        line_items.join(cookies, line_items.c.cookie_id == cookies.c.cookie_id))
+    order_ids, order_cents, mismatched, drift = [], [], [], []
+    expected_total = recorded_total = 0
+    for chunk in iter_chunks(statement, connectable, chunk_size=chunk_size, numeric='cents'):
+        expected = as_int64(chunk['quantity']) * as_int64(chunk['unit_cost'])
+        recorded = as_int64(chunk['extended_cost'])
+        keys, sums = group_sum(as_int64(chunk['order_id']), expected)
+        order_ids.append(keys)
+        order_cents.append(sums)
+        wrong = expected != recorded
+        mismatched.append(as_int64(chunk['line_items_id'])[wrong])
+        drift.append(recorded[wrong] - expected[wrong])
+        expected_total += int(expected.sum())
+        recorded_total += int(recorded.sum())
+    # an order can span two chunks
+    order_id, order_cents = group_sum(_concatenate(order_ids), _concatenate(order_cents))
+    return LineItemValuation(order_id, order_cents, expected_total, recorded_total,
+                             _concatenate(mismatched), _concatenate(drift))
@@ -0,0 +1,215 @@
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.session import make_transient_to_detached
+
+from sqlalchemy_orm.models import Cookie, User
+
+"""
+    :Entity cache
+    The identity map only lives as long as a session, so every new session looks the same catalogue rows up again
+    with session.query(Cookie).filter(Cookie.cookie_name == ...).one(). EntityCache keeps the column values of
+    Cookie and User rows across sessions, by primary key and by their unique columns (cookie_name, username):
+
+        cookie = entity_cache.get_by(session, Cookie, 'cookie_name', 'chocolate chip')
+        user = entity_cache.get(session, User, 1)
+
+    A hit builds the object from the cached values and attaches it to the session as if it had been loaded,
+    without any SQL. The cache holds at most maxsize rows, evicting the least recently used, and an entry
+    expires ttl seconds after it was loaded.
+
+    Entries are invalidated from the events of the sessions the cache is registered with. Nothing is registered
+    by default: call entity_cache.register(Session) with the sessionmaker (or session) whose changes it must see.
+
+    `after_flush`
+    Every Cookie or User the flush updated or deleted.
+
+    `after_bulk_update`, `after_bulk_delete`
+    query.update() and query.delete() do not say which rows they changed, so every entry of the model goes.
+
+    `after_commit`
+    The same entries again: until the flushed changes are committed, other sessions still read the old rows
+    and may have cached them. A row read before an invalidation of its model is not cached either, in case the
+    invalidation was for the row it read.
+
+    Rows are not cached by a session whose transaction has flushed changes to their model, since what it reads
+    back may be its own uncommitted changes.
+
+    Changes made outside the ORM sessions (Core statements, other processes) are only picked up when entries expire.
+"""
+
+
+class EntityCache:
+
+    def __init__(self, keys=None, maxsize=10000, ttl=300, clock=time.monotonic):
+        # model -> the unique columns it can be looked up by, besides its primary key
+        self.keys = dict(keys or {})
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._unique = {}
+        # model -> number of invalidations so far, a store is skipped if it changed during the query
+        self._generations = {}
+        self._lock = threading.RLock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+                'size': len(self._entries)}
+
+    def get(self, session, model, ident):
+        """The model instance with primary key ident, or None, like query.get()."""
+        key = (model, ident if isinstance(ident, tuple) else (ident,))
+        values = self._lookup(key)
+        if values is None:
+            generation = self._generations.get(model, 0)
+            instance = session.query(model).get(ident)
+            if instance is not None:
+                self._store(session, instance, generation)
+            return instance
+        return self._attach(session, model, key[1], values)
+
+    def get_by(self, session, model, column, value):
+        """The model instance whose unique column equals value, like filter(...).one()."""
+        key = self._unique.get((model, column, value))
+        values = self._lookup(key) if key is not None else None
+        if values is None or values.get(column) != value:
+            if key is None:
+                with self._lock:
+                    self.misses += 1
+            generation = self._generations.get(model, 0)
+            instance = session.query(model).filter(getattr(model, column) == value).one()
+            self._store(session, instance, generation)
+            return instance
+        return self._attach(session, model, key[1], values)
+
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires, values = entry
+            if expires <= self.clock():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return values
+
+    def _attach(self, session, model, ident, values):
+        mapper = inspect(model)
+        instance = session.identity_map.get(mapper.identity_key_from_primary_key(list(ident)))
+        if instance is not None:
+            return instance
+        instance = mapper.class_manager.new_instance()
+        for attr, value in values.items():
+            set_committed_value(instance, attr, value)
+        make_transient_to_detached(instance)
+        session.add(instance)
+        return instance
+
+    def _store(self, session, instance, generation):
+        state = inspect(instance)
+        mapper = state.mapper
+        if mapper.class_ not in self.keys or state.modified or \
+                mapper.class_ in session.info.get('entity_cache_flushed', ()):
+            return
+        values = {attr.key: state.dict[attr.key] for attr in mapper.column_attrs if attr.key in state.dict}
+        key = (mapper.class_, state.identity)
+        with self._lock:
+            if self._generations.get(mapper.class_, 0) != generation:
+                return
+            self._remove(key)
+            self._entries[key] = (self.clock() + self.ttl, values)
+            for column in self.keys[mapper.class_]:
+                self._unique[(mapper.class_, column, values.get(column))] = key
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            for column in self.keys.get(key[0], ()):
+                unique = (key[0], column, entry[1].get(column))
+                if self._unique.get(unique) == key:
+                    del self._unique[unique]
+        return entry is not None
+
+    def invalidate(self, model, ident):
+        with self._lock:
+            self._generations[model] = self._generations.get(model, 0) + 1
+            if self._remove((model, ident if isinstance(ident, tuple) else (ident,))):
+                self.invalidations += 1
+
+    def invalidate_model(self, model):
+        with self._lock:
+            self._generations[model] = self._generations.get(model, 0) + 1
+            for key in [key for key in self._entries if key[0] is model]:
+                self._remove(key)
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._unique.clear()
+
+    def register(self, target):
+        """Invalidate from the events of a Session class, a sessionmaker or a session."""
+        event.listen(target, 'after_flush', self._after_flush)
+        event.listen(target, 'after_bulk_update', self._after_bulk)
+        event.listen(target, 'after_bulk_delete', self._after_bulk)
+        event.listen(target, 'after_commit', self._after_commit)
+        event.listen(target, 'after_rollback', self._after_rollback)
+        return self
+
+    def _after_flush(self, session, flush_context):
+        # model -> the identities flushed in the transaction, None once a bulk statement changed any row
+        flushed = session.info.setdefault('entity_cache_flushed', {})
+        for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+            state = inspect(instance)
+            if state.mapper.class_ in self.keys:
+                identities = flushed.setdefault(state.mapper.class_, set())
+                if state.identity is not None:
+                    if identities is not None:
+                        identities.add(state.identity)
+                    self.invalidate(state.mapper.class_, state.identity)
+
+    def _after_bulk(self, context):
+        if context.mapper.class_ in self.keys:
+            context.session.info.setdefault('entity_cache_flushed', {})[context.mapper.class_] = None
+            self.invalidate_model(context.mapper.class_)
+
+    def _after_commit(self, session):
+        for model, identities in session.info.pop('entity_cache_flushed', {}).items():
+            if identities is None:
+                self.invalidate_model(model)
+            else:
+                for ident in identities:
+                    self.invalidate(model, ident)
+
+    def _after_rollback(self, session):
+        session.info.pop('entity_cache_flushed', None)
+
+
+entity_cache = EntityCache(keys={Cookie: ('cookie_name',), User: ('username',)})
@@ -0,0 +1,169 @@
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.session import make_transient, make_transient_to_detached
+
+from sqlalchemy_orm.models import LineItems, Order
+
+"""
+    :Batched order writer
+    session.add(order) and session.commit() insert an Order and then its LineItems one statement at a time,
+    as the flush needs the order_id of each order before it can insert its line items. write_orders takes a
+    whole checkout burst of new orders (built as usual, Order(user=...) with LineItems(cookie=...,
+    quantity=..., extended_cost=...) in order.line_items) and writes it with four statements:
+
+        write_orders(session, orders)
+        session.commit()
+
+    1- A block of order_id and line_items_id keys is taken for the batch (allocate_keys), so every key is
+       known before anything is inserted.
+    2- All the orders are inserted with one executemany, then all the line items with another, in the
+       session's transaction.
+    3- The objects are then made persistent in the session, as if they had been flushed: their keys, user_id,
+       order_id and cookie_id are set and the Python side defaults (shipped=False) filled in.
+
+    The users and cookies the orders refer to must already have been flushed. Like bulk_save_objects, the
+    batch fires no ORM flush events.
+
+    The session does not know the objects are new in its transaction, so write_orders keeps them in
+    session.info['written_orders'] until the transaction commits: if it is rolled back (or the savepoint they
+    were written in), they are made transient again, without the keys they were given, as a rollback does
+    with pending objects. If one of the INSERTs fails, they are put back as they were before the call.
+
+    On PostgreSQL the keys come from the sequence of the primary key, so concurrent writers never collide.
+    SQLite has no sequence: the block starts after the largest key, and a concurrent writer taking the same
+    keys makes the INSERT fail with an IntegrityError, unless the transaction holds the write lock from its
+    first statement (isolation_level='IMMEDIATE', as in benchmarks/bench_optimistic_shipping.py).
+"""
+
+
+def allocate_keys(connection, column, count):
+    """count unused values of the integer primary key column, in increasing order."""
+    if connection.dialect.name == 'postgresql':
+        sequence = func.pg_get_serial_sequence(column.table.name, column.name)
+        statement = select([func.nextval(sequence)]).select_from(func.generate_series(1, count))
+        return sorted(row[0] for row in connection.execute(statement))
+    start = connection.execute(select([func.coalesce(func.max(column), 0)])).scalar() + 1
+    return list(range(start, start + count))
+
+
+def _default(column):
+    default = column.default
+    if default is None or not (default.is_scalar or default.is_callable):
+        return None
+    return default.arg(None) if default.is_callable else default.arg
+
+
+def _row(instance, mapper):
+    """{column key: value} of the instance, setting the Python side defaults on it as a flush would."""
+    state = inspect(instance)
+    row = {}
+    for prop in mapper.column_attrs:
+        column = prop.columns[0]
+        value = state.dict.get(prop.key)
+        if value is None:
+            value = _default(column)
+            if value is not None:
+                set_committed_value(instance, prop.key, value)
+        row[column.key] = value
+    return row
+
+
+def _key_of(related):
+    if related is None:
+        return None
+    identity = inspect(related).identity
+    if identity is None:
+        raise ValueError('{!r} has no primary key yet, flush it before writing the orders that use it'.format(
+            related))
+    return identity[0]
+
+
+# the attributes write_orders sets, which are taken off again when the batch is undone
+KEYS = {Order: ('order_id', 'user_id'), LineItems: ('line_items_id', 'order_id', 'cookie_id')}
+
+
+def _unwrite(instances):
+    for instance in instances:
+        make_transient(instance)
+        state = inspect(instance)
+        for key in KEYS[state.class_]:
+            state.dict.pop(key, None)
+
+
+def _after_rollback(session):
+    # the transaction rolled back is the first savepoint or root transaction from the current one up
+    boundary = session.transaction
+    while boundary.parent is not None and not boundary.nested:
+        boundary = boundary.parent
+    kept = []
+    for transaction, instances in session.info.get('written_orders', ()):
+        written_in = transaction
+        while written_in is not None and written_in is not boundary:
+            written_in = written_in.parent
+        if written_in is None:
+            kept.append((transaction, instances))
+        else:
+            _unwrite(instances)
+    session.info['written_orders'] = kept
+
+
+def _after_commit(session):
+    if session.transaction.parent is None:
+        session.info.pop('written_orders', None)
+
+
+def _track(session, transaction, instances):
+    if not event.contains(session, 'after_rollback', _after_rollback):
+        event.listen(session, 'after_rollback', _after_rollback)
+        event.listen(session, 'after_commit', _after_commit)
+    session.info.setdefault('written_orders', []).append((transaction, instances))
+
+
+def write_orders(session, orders):
+    """Insert the new orders and their line items with one executemany each, and make them persistent in
+    session; the session's transaction is left for the caller to commit."""
+    orders = list(orders)
+    line_items = [line_item for order in orders for line_item in order.line_items]
+    for instance in orders + line_items:
+        if inspect(instance).key is not None:
+            raise ValueError('{!r} is already persistent'.format(instance))
+    pending = [instance for instance in orders + line_items if instance in session]
+    for instance in orders + line_items:
+        if inspect(instance).session_id is not None:
+            # Order(user=...) cascades the new order into the user's session; take it out without cascading
+            make_transient(instance)
+    if not orders:
+        return orders
+
+    try:
+        connection = session.connection()
+        order_mapper, line_item_mapper = inspect(Order), inspect(LineItems)
+        order_ids = allocate_keys(connection, Order.__table__.c.order_id, len(orders))
+        line_item_ids = allocate_keys(connection, LineItems.__table__.c.line_items_id, len(line_items))
+
+        # the values are the ones in the database once the INSERTs run, so they are set without change history
+        line_item_ids = iter(line_item_ids)
+        for order, order_id in zip(orders, order_ids):
+            set_committed_value(order, 'order_id', order_id)
+            if order.user is not None:
+                set_committed_value(order, 'user_id', _key_of(order.user))
+            for line_item in order.line_items:
+                set_committed_value(line_item, 'line_items_id', next(line_item_ids))
+                set_committed_value(line_item, 'order_id', order_id)
+                if line_item.cookie is not None:
+                    set_committed_value(line_item, 'cookie_id', _key_of(line_item.cookie))
+
+        connection.execute(Order.__table__.insert(), [_row(order, order_mapper) for order in orders])
+        if line_items:
+            connection.execute(LineItems.__table__.insert(),
+                               [_row(line_item, line_item_mapper) for line_item in line_items])
+    except Exception:
+        _unwrite(orders + line_items)
+        session.add_all(pending)
+        raise
+
+    for instance in orders + line_items:
+        make_transient_to_detached(instance)
+    session.add_all(orders)
+    _track(session, session.transaction, orders + line_items)
+    return orders
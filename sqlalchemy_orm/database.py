@@ -0,0 +1,26 @@
+from sqlalchemy.orm import sessionmaker
+
+from sqlalchemy_core.database import LazyEngine
+from sqlalchemy_orm.models import Base
+
+"""
+    :Engine and sessions
+    Importing models.py only declares the mapped classes. The engine (an in-memory SQLite database by default)
+    is created, with the tables, the first time a session is asked for:
+
+        session = get_session()
+
+    engine.configure('sqlite:///cookies.db', echo=True) before that points it somewhere else.
+    Session is the sessionmaker every session comes from; sessions are bound to the engine when created.
+"""
+
+engine = LazyEngine('sqlite:///:memory:', Base.metadata)
+Session = sessionmaker()
+
+
+def get_engine():
+    return engine.get()
+
+
+def get_session(**kwargs):
+    return Session(bind=engine.get(), **kwargs)
@@ -0,0 +1,150 @@
+import csv
+import json
+import time
+from collections import namedtuple
+from datetime import datetime
+from decimal import Decimal
+from itertools import islice
+
+from sqlalchemy import Boolean, DateTime, Integer, Numeric
+from sqlalchemy.orm import class_mapper
+
+from sqlalchemy_orm.models import Cookie
+
+"""
+    :Streaming bulk ingest
+    Supplier feeds come as CSV or JSON Lines files with millions of rows, so we never build the full list
+    of rows the way the bulk examples in orm_data.py and database_ops.py do. Every stage is a generator:
+
+    1- read_rows reads the file lazily, one dict per line.
+    2- coerce_rows keeps the columns of the mapped table and converts the text to the column types.
+    3- ingest executes fixed-size chunks, each one in its own transaction, so memory stays constant
+       and a failure only rolls back the chunk being written.
+
+    A Core executemany needs the same keys in every row, while JSON Lines records may leave fields out: the
+    rows of a chunk that miss some of the keys of the others get the column default, or None, for them.
+
+    The chunks can be written with a Core executemany, Session.bulk_insert_mappings or
+    Session.bulk_save_objects. None of them fetch primary keys or fire ORM events.
+"""
+
+METHODS = ('executemany', 'bulk_insert_mappings', 'bulk_save_objects')
+
+
+class IngestStats(namedtuple('IngestStats', ['rows', 'chunks', 'seconds'])):
+
+    @property
+    def rows_per_sec(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        return '{self.rows} rows in {self.chunks} chunks, {self.seconds:.2f}s ' \
+               '({self.rows_per_sec:.0f} rows/sec)'.format(self=self)
+
+
+def read_csv(f):
+    return csv.DictReader(f)
+
+
+def read_jsonl(f):
+    for line in f:
+        if line.strip():
+            yield json.loads(line)
+
+
+def read_rows(path):
+    """Yield one dict per record of a .csv, .jsonl or .ndjson file."""
+    reader = read_csv if path.endswith('.csv') else read_jsonl
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in reader(f):
+            yield row
+
+
+def _converter(column):
+    if isinstance(column.type, Boolean):
+        return lambda value: value if isinstance(value, bool) else \
+            str(value).lower() in ('1', 't', 'true', 'y', 'yes')
+    if isinstance(column.type, DateTime):
+        return lambda value: value if isinstance(value, datetime) else datetime.fromisoformat(value)
+    if isinstance(column.type, Integer):
+        return int
+    if isinstance(column.type, Numeric):
+        if column.type.asdecimal:
+            return lambda value: Decimal(str(value))
+        return float
+    return column.type.python_type
+
+
+def coerce_rows(rows, model=Cookie):
+    """Convert the values of each row to the types of the mapped columns of the model.
+
+    Keys that are not mapped attributes are dropped and empty strings become None.
+    """
+    mapper = class_mapper(model)
+    converters = {attr.key: _converter(attr.columns[0]) for attr in mapper.column_attrs}
+    for row in rows:
+        yield {key: None if value is None or value == '' else converters[key](value)
+               for key, value in row.items() if key in converters}
+
+
+def chunked(rows, chunk_size):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _default(column):
+    default = column.default
+    if default is None or not (default.is_scalar or default.is_callable):
+        return None
+    # a callable default (datetime.now) is called once per chunk, as a Core insert() calls it once per statement
+    return default.arg(None) if default.is_callable else default.arg
+
+
+def fill_rows(chunk, table):
+    """The rows of the chunk with the keys of all of them, missing ones set to the column default or None."""
+    keys = set().union(*chunk)
+    if all(len(row) == len(keys) for row in chunk):
+        return chunk
+    defaults = {key: _default(table.c[key]) for key in keys}
+    return [dict(defaults, **row) for row in chunk]
+
+
+def _new_instance(mapper, row):
+    instance = mapper.class_manager.new_instance()
+    for key, value in row.items():
+        setattr(instance, key, value)
+    return instance
+
+
+def ingest(session, rows, model=Cookie, method='executemany', chunk_size=10000):
+    """Insert the rows (dicts of column values) in chunks of chunk_size, committing after each one."""
+    if method not in METHODS:
+        raise ValueError('method must be one of {}'.format(', '.join(METHODS)))
+    mapper = class_mapper(model)
+    table = mapper.local_table
+    rows_written = chunks = 0
+    start = time.perf_counter()
+    for chunk in chunked(rows, chunk_size):
+        try:
+            if method == 'executemany':
+                session.execute(table.insert(), fill_rows(chunk, table))
+            elif method == 'bulk_insert_mappings':
+                session.bulk_insert_mappings(mapper, chunk)
+            else:
+                session.bulk_save_objects([_new_instance(mapper, row) for row in chunk])
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        rows_written += len(chunk)
+        chunks += 1
+    return IngestStats(rows_written, chunks, time.perf_counter() - start)
+
+
+def ingest_file(session, path, model=Cookie, method='executemany', chunk_size=10000):
+    """Stream a CSV or JSON Lines file into the table of the model."""
+    return ingest(session, coerce_rows(read_rows(path), model), model, method, chunk_size)
@@ -0,0 +1,150 @@
+import logging
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+from sqlalchemy import event
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.orm import Query, lazyload, selectinload, joinedload, subqueryload, noload, raiseload
+
+"""
+    :Loader strategies
+    Relationships load lazily by default: ship_it gets an Order, then order.line_items (one query), then
+    li.cookie for every line item (one query each), which is 2 + N queries per order.
+    order_loading() returns the query options that load the relationships of an order up front instead:
+
+    `selectin`
+    One extra SELECT ... WHERE id IN (...) per relationship, for every parent loaded by the query.
+    The best default for collections such as Order.line_items.
+
+    `joined`
+    A LEFT OUTER JOIN in the same query. Good for many-to-one relationships such as LineItems.cookie
+    and Order.user; for collections it repeats the parent columns on every row.
+
+    `subquery`, `lazy` (the default), `noload` and `raise` are accepted as well.
+
+        session.query(Order).options(*order_loading(line_items='selectin', cookie='joined')).get(order_id)
+"""
+
+LOADERS = {'selectin': selectinload,
+           'joined': joinedload,
+           'subquery': subqueryload,
+           'lazy': lazyload,
+           'noload': noload,
+           'raise': raiseload}
+
+
+def _loader(strategy):
+    try:
+        return LOADERS[strategy]
+    except KeyError:
+        raise ValueError('Unknown loader strategy {!r}, expected one of {}'.format(
+            strategy, ', '.join(sorted(LOADERS))))
+
+
+def order_loading(line_items='selectin', cookie='joined', user=None):
+    """Options for a query of Order: Order.line_items, LineItems.cookie (through line_items) and Order.user.
+
+    A strategy of None leaves the relationship as mapped. cookie is only applied along with line_items.
+    """
+    options = []
+    if line_items is not None:
+        option = _loader(line_items)('line_items')
+        if cookie is not None:
+            option = getattr(option, _loader(cookie).__name__)('cookie')
+        options.append(option)
+    if user is not None:
+        options.append(_loader(user)('user'))
+    return options
+
+
+"""
+    :N+1 detection
+    Inside `with detect_lazy_loads(session, threshold=1):` every lazy load of the session that emits SQL is
+    counted per relationship. Loading the same relationship more than `threshold` times is what an N+1 looks
+    like: with action='raise' the lazy load that crosses the threshold raises NPlusOneError (so the traceback
+    points at the loop that triggers it), with action='log' the counts are logged as a warning when the block
+    ends. Lazy loads answered from the identity map do not emit SQL and are not counted.
+
+    Counting uses the public before_compile query event: the query of a lazy load has `lazy_loaded_from` set
+    to the state of the parent object. Lazy loads are baked queries, which are compiled once and then reused
+    without the event, so the session does not bake queries inside the block (enable_baked_queries=False).
+    Other sessions are left alone; it is meant for tests and staging.
+"""
+
+logger = logging.getLogger(__name__)
+_install_lock = threading.Lock()
+_installed = False
+
+
+class NPlusOneError(InvalidRequestError):
+    pass
+
+
+class LazyLoadCounter:
+
+    def __init__(self, threshold, action):
+        self.threshold = threshold
+        self.action = action
+        self.counts = Counter()
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+    def exceeded(self):
+        return {key: count for key, count in self.counts.items() if count > self.threshold}
+
+    def record(self, key):
+        self.counts[key] += 1
+        if self.action == 'raise' and self.counts[key] > self.threshold:
+            raise NPlusOneError('{} lazy loads of {} (threshold {})'.format(
+                self.counts[key], key, self.threshold))
+
+
+def _relationship_key(parent, query):
+    """'Parent.relationship' for the lazy load of `query`, e.g. 'LineItems.cookie'."""
+    entity = query.column_descriptions[0]['entity']
+    keys = [rel.key for rel in parent.mapper.relationships if issubclass(entity, rel.mapper.class_)]
+    # the relationship being loaded is still unloaded on the parent
+    keys = [key for key in keys if key in parent.unloaded] or keys
+    return '{}.{}'.format(parent.class_.__name__, '|'.join(sorted(keys)))
+
+
+def _count_lazy_load(query):
+    parent = query.lazy_loaded_from
+    if parent is None or query.session is None:
+        return
+    counters = query.session.info.get('lazy_load_counters')
+    if counters:
+        key = _relationship_key(parent, query)
+        for counter in counters:
+            counter.record(key)
+
+
+def _install():
+    global _installed
+    with _install_lock:
+        if not _installed:
+            event.listen(Query, 'before_compile', _count_lazy_load, bake_ok=True)
+            _installed = True
+
+
+@contextmanager
+def detect_lazy_loads(session, threshold=1, action='raise'):
+    """Count the lazy loads of `session` inside the block, see above."""
+    if action not in ('raise', 'log'):
+        raise ValueError("action must be 'raise' or 'log'")
+    _install()
+    counter = LazyLoadCounter(threshold, action)
+    counters = session.info.setdefault('lazy_load_counters', [])
+    counters.append(counter)
+    enable_baked_queries, session.enable_baked_queries = session.enable_baked_queries, False
+    try:
+        yield counter
+    finally:
+        session.enable_baked_queries = enable_baked_queries
+        counters.remove(counter)
+        if action == 'log' and counter.exceeded():
+            logger.warning('N+1 lazy loads: %s', ', '.join(
+                '{} x{}'.format(key, count) for key, count in sorted(counter.exceeded().items())))
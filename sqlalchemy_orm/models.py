@@ -1,5 +1,4 @@
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
 from sqlalchemy import Column, Integer, Numeric, String, Boolean
 
 Base = declarative_base()
@@ -10,6 +9,10 @@ Base = declarative_base()
     2- Inherit from the Base.
     3- Define the table name.
     4- Define an attribute and set it to be a primary key.
+
+    This module only declares the mapped classes, so importing it creates no engine and touches no database:
+    the engine and sessions come from database.py, the session states demo is in session_states.py and
+    ship_it/ship_it_optimistic are in shipping.py.
 """
 
 
@@ -19,9 +22,13 @@ class Cookie(Base):
     cookie_id = Column(Integer(), primary_key=True)
     cookie_name = Column(String(50), index=True)
     cookie_recipe_url = Column(String(255))
-    cookie_sku = Column(String(55))
+    cookie_sku = Column(String(55), unique=True)
     quantity = Column(Integer())
     unit_cost = Column(Numeric(12, 2))
+    version_id = Column(Integer(), nullable=False, default=1)
+
+    # Every UPDATE of a cookie checks and bumps version_id, see ship_it_optimistic
+    __mapper_args__ = {'version_id_col': version_id}
 
     def __init__(self, name, recipe_url=None, sku=None, quantity=0, unit_cost=0.00):
         self.cookie_name = name
@@ -38,7 +45,10 @@ class Cookie(Base):
                "unit_cost={self.unit_cost})".format(self=self)
 
 
-print(Cookie.__table__)
+from sqlalchemy_core.inventory_totals import maintain_totals
+
+# running totals of the cookies table, maintained by triggers, see sqlalchemy_core/inventory_totals.py
+inventory_totals = maintain_totals(Cookie.__table__)
 
 from datetime import datetime
 from sqlalchemy import DateTime
@@ -74,8 +84,6 @@ class User(Base):
                "password='{self.password}')".format(self=self)
 
 
-print(User.__table__)
-
 from sqlalchemy import ForeignKey
 from sqlalchemy.orm import relationship, backref
 
@@ -120,7 +128,6 @@ class LineItems(Base):
         A __repr__ method defines how the object should be represented.
         It typically is the constructor call required to re-create the instance.
         This will show up later in our print output.
-        Creates the tables in the database defined by the engine.
 
     """
 
@@ -132,182 +139,7 @@ class LineItems(Base):
             self=self)
 
 
-from sqlalchemy import create_engine
-
-engine = create_engine('sqlite:///:memory:')
-Base.metadata.create_all(engine)
-
-"""
-    :The SQLAlchemy Session - States
-    When we use a query to get an object, we get back an object that is connected to a session.
-    That object could move through several states in relationship to the session.
-
-    `Session States`
-
-    Understanding the session states can be useful for troubleshooting exceptions and handling unexpected behaviors.
-    There are four possible states for data object instances:
-
-    `Transient`
-    The instance is not in session, and is not in the database.
-
-    `Pending`
-    The instance has been added to the session with add(), but hasn’t been flushed or committed.
-
-    `Persistent`
-    The object in session has a corresponding record in the database.
-
-    `Detached`
-    The instance is no longer connected to the session, but has a record in the database.
-    We can watch an instance move through these states as we work with it. We’ll start by creating an instance of a cookie.
-
-"""
-
-engine = create_engine('sqlite:///:memory:', echo=False)
-Session = sessionmaker(bind=engine)
-
-session = Session()
-
-# in-memory db is db that works on the ram
-# That is why each time we should create the tables
-Base.metadata.create_all(engine)
-
-cc_cookie = Cookie('chocolate chip',
-                   'http://some.aweso.me/cookie/recipe.html',
-                   'CC01', 12, 0.50)
-
-from sqlalchemy import inspect
-
-insp = inspect(cc_cookie)
-print('\n')
-# Transient
-for state in ['transient', 'pending', 'persistent', 'detached']:
-    print('{:>10}: {}'.format(state, getattr(insp, state)))
-
-session.add(cc_cookie)
-print('\n')
-# pending
-for state in ['transient', 'pending', 'persistent', 'detached']:
-    print('{:>10}: {}'.format(state, getattr(insp, state)))
-
-session.commit()
-print('\n')
-# persistent
-for state in ['transient', 'pending', 'persistent', 'detached']:
-    print('{:>10}: {}'.format(state, getattr(insp, state)))
-
-session.expunge(cc_cookie)
-print('\n')
-# detached
-for state in ['transient', 'pending', 'persistent', 'detached']:
-    print('{:>10}: {}'.format(state, getattr(insp, state)))
-
-# Changes History
-
-session.add(cc_cookie)
-cc_cookie.cookie_name = 'Change chocolate chip'
-
-print(insp.modified)
-
-for attr, attr_state in insp.attrs.items():
-    if attr_state.history.has_changes():
-        print('{}: {}'.format(attr, attr_state.value))
-        print('History: {}\n'.format(attr_state.history))
-
-"""
-    So far, we have been using and joining different tables in our queries.
-    However, what if we have a self-referential table (reflexive relationship) like a table of managers and their reports?
-    The ORM allows us to establish a relationship that points to the same table; however,
-    we need to specify an option called remote_side to make the relationship a many to one.
-"""
-
-# Exceptions - MultipleResultsFound, DetachedInstanceError
-
-# the exception has occurred. In this case, it is because our query returned two rows and we told it to return one
-# and only one.
-
-dcc = Cookie('dark chocolate chip',
-             'http://some.aweso.me/cookie/recipe_dark.html',
-             'CC02', 1, 0.75)
-session.add(dcc)
-session.commit()
-
-# results = session.query(Cookie).one()
-
-from sqlalchemy.orm.exc import MultipleResultsFound
-
-try:
-    results = session.query(Cookie).one()
-except MultipleResultsFound as exc:
-    print('Exception: We found too many cookies... is that even possible?')
-
-"""
-    DetachedInstanceError
-    This exception occurs when we attempt to access an attribute on an instance that needs
-    to be loaded from the database, but the instance we are using is not currently attached to the database.
-    Before we can explore this exception, we need to set up the records we are going to operate on.
-"""
-
-cookiemon = User('cookiemon', 'mon@cookie.com', '111-111-1111', 'password')
-session.add(cookiemon)
-o1 = Order()
-o1.user = cookiemon
-session.add(o1)
-
-cc = session.query(Cookie).filter(Cookie.cookie_name ==
-                                  "Change chocolate chip").one()
-line1 = LineItems(order=o1, cookie=cc, quantity=2, extended_cost=1.00)
-
-session.add(line1)
-session.commit()
-
-order = session.query(Order).first()
-session.expunge(order)
-# order.line_items.all()
-
-from sqlalchemy.exc import IntegrityError
-
-try:
-    cookiemon = User('cookiemon', 'mon@cookie.com', '111-111-1111', 'password')
-    session.add(cookiemon)
-    o1 = Order()
-    o1.user = cookiemon
-    session.add(o1)
-
-    cc = session.query(Cookie).filter(Cookie.cookie_name ==
-                                      "Change chocolate chip").one()
-    line1 = LineItems(order=o1, cookie=cc, quantity=2, extended_cost=1.00)
-
-    session.add(line1)
-    session.commit()
-except IntegrityError as error:
-    print("Error")
-    # print('ERROR: {}'.format(error.orig.message))
-    # session.rollback()
-
-# Transactions
-
-
-# print(print(session.query(Cookie.cookie_name, Cookie.quantity).all()))
-
-from sqlalchemy.exc import IntegrityError
-
-
-def ship_it(order_id):
-    order = session.query(Order).get(order_id)
-    for li in order.line_items:
-        li.cookie.quantity = li.cookie.quantity - li.quantity
-        session.add(li.cookie)
-    order.shipped = True
-    session.add(order)
-    try:
-        session.commit()
-        print("shipped order ID: {}".format(order_id))
-    except IntegrityError as error:
-        print('ERROR: {!s}'.format(error.orig))
-        session.rollback()
-
-
-# print(ship_it(2))
+from sqlalchemy_core import hierarchy
 
 
 class Employee(Base):
@@ -319,5 +151,22 @@ class Employee(Base):
 
     manager = relationship("Employee", backref=backref('reports'), remote_side=[id])
 
+    # one recursive CTE per call instead of one query per level of `reports`, see sqlalchemy_core/hierarchy.py
+
+    @classmethod
+    def subtree(cls, session, root_id):
+        """Query of (Employee, depth) for root_id and everyone below them, level by level."""
+        tree = hierarchy.subtree_cte(cls.__table__, root_id)
+        return session.query(cls, tree.c.depth).join(tree, cls.id == tree.c.id).order_by(tree.c.depth, cls.id)
+
+    @classmethod
+    def manager_chain(cls, session, employee_id):
+        """Query of the managers of employee_id, from their manager up to the root."""
+        chain = hierarchy.manager_chain_cte(cls.__table__, employee_id)
+        return session.query(cls).join(chain, cls.id == chain.c.id).order_by(chain.c.depth)
+
+    @classmethod
+    def headcounts(cls, session, manager_id=None):
+        """(id, name, headcount, depth) rows for every manager, or only manager_id."""
+        return session.execute(hierarchy.headcount_query(cls.__table__, manager_id)).fetchall()
 
-Base.metadata.create_all(engine)
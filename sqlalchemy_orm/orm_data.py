@@ -1,6 +1,7 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy_orm.models import User, Cookie, LineItems, Order, Base, Employee
+from sqlalchemy_orm.models import User, Cookie, LineItems, Order, Base, Employee, inventory_totals
+from sqlalchemy_core.inventory_totals import read_totals
 
 """
     The Session
@@ -129,6 +130,8 @@ print(c1.cookie_id)
     use bulk_save_objects or its related methods. This is especially true if you are ingesting data from an external
     data source such as a CSV or a large JSON document with nested arrays.
 
+    -> sqlalchemy_orm/ingest.py streams CSV/JSON Lines files through any of these methods in fixed-size chunks.
+
 """
 
 cookies = session.query(Cookie).all()
@@ -159,6 +162,8 @@ for cookie in session.query(Cookie):
     Use the scalar() method sparingly, as it raises errors if a query ever returns more than one row with one column.
     In a query that selects entire records, it will return the entire record object, which can be confusing and cause errors.”
 
+    -> For very large tables, sqlalchemy_orm/streaming.py fetches in batches with yield_per() and expunges every batch.
+
 """
 
 print(session.query(Cookie.cookie_name, Cookie.quantity).first())
@@ -189,6 +194,8 @@ print([result.cookie_name for result in query])
 # efficient and best practices way of limiting results
 query = session.query(Cookie).order_by(Cookie.quantity).limit(2)
 print([result.cookie_name for result in query])
+# TIP: for page after page, .offset(n).limit(2) gets slower with every page; keyset_page(session.query(Cookie),
+# [Cookie.quantity, Cookie.cookie_id], 2, token) continues from the last row instead, see sqlalchemy_core/pagination.py
 
 # Built-in sql func: SUM, COUNT
 
@@ -209,6 +216,9 @@ rec_count = session.query(func.count(Cookie.cookie_name) \
 print(rec_count.keys())
 print(rec_count.inventory_count)
 
+# the same totals without scanning cookies, from the summary row kept up to date by triggers
+print(read_totals(session, inventory_totals))
+
 # Filtering
 record = session.query(Cookie).filter(Cookie.cookie_name == 'chocolate chip').first()
 print(record)
@@ -232,6 +242,9 @@ query = session.query(Cookie.cookie_name,
 for result in query:
     print('{} - {}'.format(result.cookie_name, result.inv_cost))
 
+# valuing the whole catalogue (and checking line_items.extended_cost) in integer cents, in columnar chunks:
+# sqlalchemy_core/valuation.py
+
 from sqlalchemy import and_, or_, not_
 
 query = session.query(Cookie).filter(
@@ -267,6 +280,8 @@ print(cc_cookie.quantity)
 query = session.query(Cookie)
 query = query.filter(Cookie.cookie_name == "chocolate chip")
 query.update({Cookie.quantity: Cookie.quantity - 20})
+# TIP: adjusting the stock of many cookies is one adjust_stock(session, Cookie.__table__, [(cookie_id, -20), ...])
+# for the whole batch instead of one update per cookie, see sqlalchemy_core/adjustments.py
 
 cc_cookie = query.first()
 print(cc_cookie.quantity)
@@ -322,6 +337,8 @@ o1 = Order()
 o1.user = cookiemon
 session.add(o1)
 
+# TIP: catalogue lookups like these can be served across sessions by entity_cache.get_by(session, Cookie,
+# 'cookie_name', "chocolate chip") once it is registered with the sessionmaker, see sqlalchemy_orm/cache.py
 cc = session.query(Cookie).filter(Cookie.cookie_name ==
                                   "chocolate chip").one()
 line1 = LineItems(cookie=cc, quantity=2, extended_cost=1.00)
@@ -353,6 +370,9 @@ o2.line_items.append(line2)
 session.add(o2)
 session.commit()
 
+# TIP: a burst of new orders is written with one INSERT for the orders and one for their line items by
+# write_orders(session, orders) before the commit, see sqlalchemy_orm/checkout.py
+
 # Joins
 
 query = session.query(Order.order_id, User.username, User.phone,
@@ -385,6 +405,11 @@ session.commit()
 for report in marsha.reports:
     print(report.name)
 
+# One query for the whole tree below marsha, however deep (one query per level with `reports`)
+
+for report, depth in Employee.subtree(session, marsha.id):
+    print(depth, report.name)
+
 # Grouping
 
 query = session.query(User.username, func.count(Order.order_id))
@@ -0,0 +1,68 @@
+from collections import namedtuple
+
+from sqlalchemy import inspect
+
+from sqlalchemy_orm.models import Cookie, User, Order, LineItems
+
+"""
+    :Read models
+    Listing pages never modify the Cookie and Order rows they show, yet session.query(Cookie) builds a full
+    entity per row: instrumented attributes, an InstanceState tracking changes and an identity map entry.
+    read_all() and iter_read() run the same query but return read models instead: tuples with the column
+    attributes of the model as named fields (cookie.cookie_name, order.shipped, ...) and the model's __repr__,
+    built straight from the result rows without going through the session's identity map:
+
+        cookies = read_all(session.query(Cookie).filter(Cookie.quantity > 0).order_by(Cookie.cookie_name))
+        for order in iter_read(session.query(Order).filter(Order.shipped == False)):
+            ...
+
+    Read models are immutable and hold only the columns, so relationships (order.line_items, line_item.cookie)
+    are not available: join and query the columns you need instead. They compare equal by value, as tuples.
+"""
+
+_read_models = {}
+
+
+def read_model(model):
+    """The read model class of a mapped class: a namedtuple of its column attributes, with its __repr__."""
+    cls = _read_models.get(model)
+    if cls is None:
+        fields = [attr.key for attr in inspect(model).column_attrs]
+        namespace = {'__slots__': (), '__model__': model}
+        if '__repr__' in vars(model):
+            namespace['__repr__'] = vars(model)['__repr__']
+        cls = type(model.__name__ + 'Row', (namedtuple(model.__name__ + 'Row', fields),), namespace)
+        _read_models[model] = cls
+    return cls
+
+
+def _columns_statement(query):
+    model = query._only_entity_zero().class_
+    cls = read_model(model)
+    return cls, query.with_entities(*[getattr(model, field) for field in cls._fields]).statement
+
+
+def iter_read(query, batch_size=1000):
+    """Yield read models for the rows of an entity query (session.query(Model)...), batch_size rows per fetch."""
+    cls, statement = _columns_statement(query)
+    result = query.session.execute(statement, params=query._params)
+    make = cls._make
+    while True:
+        rows = result.fetchmany(batch_size)
+        if not rows:
+            break
+        for row in rows:
+            yield make(row)
+
+
+def read_all(query):
+    """List of read models for the rows of an entity query."""
+    cls, statement = _columns_statement(query)
+    make = cls._make
+    return [make(row) for row in query.session.execute(statement, params=query._params)]
+
+
+CookieRow = read_model(Cookie)
+UserRow = read_model(User)
+OrderRow = read_model(Order)
+LineItemsRow = read_model(LineItems)
@@ -0,0 +1,159 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from sqlalchemy_orm.models import Base, Cookie, User, Order, LineItems
+
+"""
+    :The SQLAlchemy Session - States
+    When we use a query to get an object, we get back an object that is connected to a session.
+    That object could move through several states in relationship to the session.
+
+    `Session States`
+
+    Understanding the session states can be useful for troubleshooting exceptions and handling unexpected behaviors.
+    There are four possible states for data object instances:
+
+    `Transient`
+    The instance is not in session, and is not in the database.
+
+    `Pending`
+    The instance has been added to the session with add(), but hasn’t been flushed or committed.
+
+    `Persistent`
+    The object in session has a corresponding record in the database.
+
+    `Detached`
+    The instance is no longer connected to the session, but has a record in the database.
+    We can watch an instance move through these states as we work with it. We’ll start by creating an instance of a cookie.
+
+"""
+
+engine = create_engine('sqlite:///:memory:', echo=False)
+Session = sessionmaker(bind=engine)
+
+session = Session()
+
+# in-memory db is db that works on the ram
+# That is why each time we should create the tables
+Base.metadata.create_all(engine)
+
+cc_cookie = Cookie('chocolate chip',
+                   'http://some.aweso.me/cookie/recipe.html',
+                   'CC01', 12, 0.50)
+
+from sqlalchemy import inspect
+
+insp = inspect(cc_cookie)
+print('\n')
+# Transient
+for state in ['transient', 'pending', 'persistent', 'detached']:
+    print('{:>10}: {}'.format(state, getattr(insp, state)))
+
+session.add(cc_cookie)
+print('\n')
+# pending
+for state in ['transient', 'pending', 'persistent', 'detached']:
+    print('{:>10}: {}'.format(state, getattr(insp, state)))
+
+session.commit()
+print('\n')
+# persistent
+for state in ['transient', 'pending', 'persistent', 'detached']:
+    print('{:>10}: {}'.format(state, getattr(insp, state)))
+
+session.expunge(cc_cookie)
+print('\n')
+# detached
+for state in ['transient', 'pending', 'persistent', 'detached']:
+    print('{:>10}: {}'.format(state, getattr(insp, state)))
+
+# Changes History
+
+session.add(cc_cookie)
+cc_cookie.cookie_name = 'Change chocolate chip'
+
+print(insp.modified)
+
+for attr, attr_state in insp.attrs.items():
+    if attr_state.history.has_changes():
+        print('{}: {}'.format(attr, attr_state.value))
+        print('History: {}\n'.format(attr_state.history))
+
+"""
+    So far, we have been using and joining different tables in our queries.
+    However, what if we have a self-referential table (reflexive relationship) like a table of managers and their reports?
+    The ORM allows us to establish a relationship that points to the same table; however,
+    we need to specify an option called remote_side to make the relationship a many to one.
+"""
+
+# Exceptions - MultipleResultsFound, DetachedInstanceError
+
+# the exception has occurred. In this case, it is because our query returned two rows and we told it to return one
+# and only one.
+
+dcc = Cookie('dark chocolate chip',
+             'http://some.aweso.me/cookie/recipe_dark.html',
+             'CC02', 1, 0.75)
+session.add(dcc)
+session.commit()
+
+# results = session.query(Cookie).one()
+
+from sqlalchemy.orm.exc import MultipleResultsFound
+
+try:
+    results = session.query(Cookie).one()
+except MultipleResultsFound as exc:
+    print('Exception: We found too many cookies... is that even possible?')
+
+"""
+    DetachedInstanceError
+    This exception occurs when we attempt to access an attribute on an instance that needs
+    to be loaded from the database, but the instance we are using is not currently attached to the database.
+    Before we can explore this exception, we need to set up the records we are going to operate on.
+"""
+
+cookiemon = User('cookiemon', 'mon@cookie.com', '111-111-1111', 'password')
+session.add(cookiemon)
+o1 = Order()
+o1.user = cookiemon
+session.add(o1)
+
+cc = session.query(Cookie).filter(Cookie.cookie_name ==
+                                  "Change chocolate chip").one()
+line1 = LineItems(order=o1, cookie=cc, quantity=2, extended_cost=1.00)
+
+session.add(line1)
+session.commit()
+
+order = session.query(Order).first()
+session.expunge(order)
+# order.line_items.all()
+
+from sqlalchemy.exc import IntegrityError
+
+try:
+    cookiemon = User('cookiemon', 'mon@cookie.com', '111-111-1111', 'password')
+    session.add(cookiemon)
+    o1 = Order()
+    o1.user = cookiemon
+    session.add(o1)
+
+    cc = session.query(Cookie).filter(Cookie.cookie_name ==
+                                      "Change chocolate chip").one()
+    line1 = LineItems(order=o1, cookie=cc, quantity=2, extended_cost=1.00)
+
+    session.add(line1)
+    session.commit()
+except IntegrityError as error:
+    print("Error")
+    # print('ERROR: {}'.format(error.orig.message))
+    # session.rollback()
+
+# TIP: to insert a user, or update them when the username exists, use upsert(session, User, [row]) (one
+# INSERT ... ON CONFLICT DO UPDATE per chunk of rows), see sqlalchemy_core/upsert.py
+
+# Transactions
+
+
+# print(print(session.query(Cookie.cookie_name, Cookie.quantity).all()))
@@ -0,0 +1,89 @@
+import logging
+import random
+import time
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
+
+from sqlalchemy_orm.database import get_session
+from sqlalchemy_orm.loading import order_loading
+from sqlalchemy_orm.models import Order
+
+"""
+    :Shipping orders
+    Both functions take the session to work in, or use a new one from database.get_session(), which they
+    close before returning.
+    The line items and their cookies are loaded with the order, see loading.py.
+"""
+
+logger = logging.getLogger(__name__)
+
+
+def ship_it(order_id, session=None):
+    if session is None:
+        session = get_session()
+        try:
+            return ship_it(order_id, session)
+        finally:
+            session.close()
+    order = session.query(Order).options(*order_loading()).get(order_id)
+    for li in order.line_items:
+        li.cookie.quantity = li.cookie.quantity - li.quantity
+        session.add(li.cookie)
+    order.shipped = True
+    session.add(order)
+    try:
+        session.commit()
+        print("shipped order ID: {}".format(order_id))
+    except IntegrityError as error:
+        print('ERROR: {!s}'.format(error.orig))
+        session.rollback()
+
+
+"""
+    :Optimistic concurrency
+    Because Cookie has a version_id_col, the UPDATE emitted for a cookie only matches the row when its
+    version_id is still the one we loaded, and the session raises StaleDataError on commit when another
+    session changed the cookie in the meantime. Rather than failing the order, we roll back, wait a short,
+    randomised and bounded amount of time and load everything again.
+    Note that query.update() does not check or bump version_id.
+    version_id only protects the cookies: the order is marked shipped with an UPDATE that only matches it
+    while it is not shipped, so an order that is missing or that another session already shipped takes no
+    stock and returns False.
+"""
+
+
+def ship_it_optimistic(order_id, session=None, max_retries=5, backoff=0.01, max_backoff=0.5,
+                       stats=None):
+    if session is None:
+        session = get_session()
+        try:
+            return ship_it_optimistic(order_id, session, max_retries, backoff, max_backoff, stats)
+        finally:
+            session.close()
+    for attempt in range(max_retries + 1):
+        try:
+            order = session.query(Order).options(*order_loading()).get(order_id)
+            unshipped = session.query(Order).filter(Order.order_id == order_id, Order.shipped == False)
+            if order is None or order.shipped or unshipped.update({Order.shipped: True}) != 1:
+                session.rollback()
+                logger.warning('order %s does not exist or is already shipped', order_id)
+                return False
+            for li in order.line_items:
+                li.cookie.quantity = li.cookie.quantity - li.quantity
+            session.commit()
+            return True
+        except StaleDataError:
+            session.rollback()
+        except IntegrityError as error:
+            session.rollback()
+            logger.warning('order %s not shipped: %s', order_id, error.orig)
+            return False
+        if stats is not None:
+            stats['conflicts'] = stats.get('conflicts', 0) + 1
+        if attempt < max_retries:
+            time.sleep(random.uniform(0, min(max_backoff, backoff * 2 ** attempt)))
+    raise StaleDataError("Order ID {} conflicted with other sessions {} times".format(
+        order_id, max_retries + 1))
+
+
@@ -0,0 +1,69 @@
+from sqlalchemy_orm.models import Cookie, Order, LineItems
+
+"""
+    :Streaming large scans
+    Iterating over session.query(Cookie) is better than .all(), but the ORM still fetches every row
+    before returning the first object, and each object then sits in the session's identity map.
+    yield_per() makes the query fetch and build objects batch_size rows at a time; iter_batches loads them
+    in a session of its own, which only holds weak references to unchanged objects, so a batch is released
+    as soon as the caller drops it, memory stays flat however large the table is, and the query's session
+    never sees the objects. The scan's session is closed, detaching what is left, when the iteration ends,
+    including when the caller stops early (break, an exception, close()).
+
+    :CAUTION
+    The objects never belong to the query's session and are detached once the scan ends, so treat them as
+    read-only: changes to them are not flushed (session.merge() one to change it). yield_per() cannot be
+    combined with eager loading of collections (joinedload/subqueryload of Order.line_items, for instance).
+    Listings that only read the rows can skip the entities altogether, see read_models.py.
+"""
+
+
+def iter_batches(query, batch_size=1000):
+    """Yield lists of up to batch_size objects of an entity query, loaded in a session of their own that
+    uses the connection (and the transaction) of the query's session, and is closed when the iteration ends.
+
+    The scan's session is not emptied after each batch: expunge_all() would leave the rest of the yield_per
+    query adding objects to the identity map it replaced, and an expunge() per object costs more than loading
+    it.
+    """
+    session = query.session
+    if session.autoflush:
+        # as the query would in its own session
+        session.flush()
+    entity = query.column_descriptions[0]['entity']
+    scan = type(session)(bind=session.connection(mapper=entity), autoflush=False)
+    batch = []
+    try:
+        for instance in query.with_session(scan).yield_per(batch_size):
+            batch.append(instance)
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    finally:
+        scan.close()
+
+
+def iter_instances(query, batch_size=1000):
+    """Yield the objects of an entity query one at a time, batch_size rows per fetch."""
+    batches = iter_batches(query, batch_size)
+    try:
+        for batch in batches:
+            for instance in batch:
+                yield instance
+    finally:
+        # expunge the current batch now, rather than whenever batches is garbage collected
+        batches.close()
+
+
+def stream_cookies(session, batch_size=1000):
+    return iter_instances(session.query(Cookie).order_by(Cookie.cookie_id), batch_size)
+
+
+def stream_orders(session, batch_size=1000):
+    return iter_instances(session.query(Order).order_by(Order.order_id), batch_size)
+
+
+def stream_line_items(session, batch_size=1000):
+    return iter_instances(session.query(LineItems).order_by(LineItems.line_items_id), batch_size)
@@ -1,8 +1,18 @@
 from testing_database.db import dal
-from sqlalchemy.sql import select
+from sqlalchemy.sql import select, bindparam
 
+"""
+    :Statement cache
+    get_orders_by_customer only ever produces four shapes of query
+    (filtered on shipped or not, with or without details), so we build each of them once
+    with bindparams for the customer name and the shipped flag, compile each shape once
+    per kind of dialect, and reuse the compiled form on every call.
+    Every db_init creates a new engine and dialect, so the cache is keyed on the dialect class
+    and paramstyle rather than the dialect itself: it stays at four entries per database kind.
+"""
 
-def get_orders_by_customer(cust_name, shipped=None, details=False):
+
+def _build_orders_query(shipped, details):
     columns = [dal.orders.c.order_id, dal.users.c.username, dal.users.c.phone]
     joins = dal.users.join(dal.orders)
     if details:
@@ -12,8 +22,46 @@ def get_orders_by_customer(cust_name, shipped=None, details=False):
         joins = joins.join(dal.line_items).join(dal.cookies)
     cust_orders = select(columns)
     cust_orders = cust_orders.select_from(joins).where(
-        dal.users.c.username == cust_name)
+        dal.users.c.username == bindparam('cust_name'))
+    if shipped:
+        cust_orders = cust_orders.where(
+            dal.orders.c.shipped == bindparam('shipped'))
+    return cust_orders
+
+
+# (filter on shipped, details) -> select
+order_queries = {(shipped, details): _build_orders_query(shipped, details)
+                 for shipped in (False, True)
+                 for details in (False, True)}
+
+# (dialect class, paramstyle, filter on shipped, details) -> compiled select
+_compiled_queries = {}
+
+
+def compiled_orders_query(dialect, shipped=None, details=False):
+    key = (type(dialect), dialect.paramstyle, shipped is not None, details)
+    compiled = _compiled_queries.get(key)
+    if compiled is None:
+        compiled = order_queries[key[2:]].compile(dialect=dialect)
+        _compiled_queries[key] = compiled
+    return compiled
+
+
+def get_orders_by_customer(cust_name, shipped=None, details=False):
+    cust_orders = compiled_orders_query(dal.connection.dialect, shipped, details)
+    params = {'cust_name': cust_name}
     if shipped is not None:
-        cust_orders = cust_orders.where(dal.orders.c.shipped == shipped)
-    result = dal.connection.execute(cust_orders).fetchall()
+        params['shipped'] = shipped
+    result = dal.connection.execute(cust_orders, params).fetchall()
     return result
+
+
+def get_orders_by_customer_arrays(cust_name, shipped=None, details=False, numeric='float64'):
+    """get_orders_by_customer as {column name: numpy array}, see sqlalchemy_core/columnar.py."""
+    from sqlalchemy_core.columnar import fetch_arrays
+
+    params = {'cust_name': cust_name}
+    if shipped is not None:
+        params['shipped'] = shipped
+    return fetch_arrays(compiled_orders_query(dal.connection.dialect, shipped, details), dal.connection, params,
+                        numeric=numeric)
@@ -0,0 +1,73 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy.engine.url import make_url
+
+from testing_database import app, db
+
+"""
+    :asyncio
+    SQLAlchemy and sqlite3 block, so calling dal.connection.execute() from a coroutine stalls the event loop
+    for as long as the query runs. AsyncDataAccessLayer runs every call on a small pool of dedicated executor
+    threads instead: each thread uses its own pooled connection (dal.connection is per thread), and the
+    coroutine awaits the result, so hundreds of lookups can be in flight while the loop keeps serving.
+
+    SQLite gets one dedicated executor thread by default: its queries hold the GIL for most of their run,
+    so more threads mostly add contention with the event loop. An in-memory SQLite database only exists for
+    the thread that created it, so it always gets a single thread, and db_init itself runs on that thread.
+"""
+
+
+class AsyncDataAccessLayer:
+
+    def __init__(self, dal=db.dal):
+        self.dal = dal
+        self.executor = None
+        self.workers = 0
+
+    async def db_init(self, conn_string, workers=None, **pool_options):
+        url = make_url(conn_string)
+        if url.get_backend_name() == 'sqlite':
+            if url.database in (None, '', ':memory:'):
+                workers = 1
+            workers = workers or 1
+        workers = workers or 4
+        if url.database not in (None, '', ':memory:'):
+            pool_options.setdefault('pool_size', workers)
+        await self.close()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='dal')
+        self.workers = workers
+        await self.run(self.dal.db_init, conn_string, **pool_options)
+
+    async def run(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(fn, *args, **kwargs))
+
+    async def close(self):
+        if self.executor is not None:
+            executor, self.executor = self.executor, None
+            # waiting for the queries in flight blocks, so it is done on the loop's default executor
+            await asyncio.get_running_loop().run_in_executor(
+                None, functools.partial(self._shutdown, executor, self.workers))
+
+    def _shutdown(self, executor, workers):
+        if workers == 1:
+            # the connection belongs to the executor thread (the in-memory database only exists there), so it
+            # is closed on that thread, after the queries queued before
+            executor.submit(self.dal.dispose)
+            executor.shutdown(wait=True)
+        else:
+            executor.shutdown(wait=True)
+            self.dal.dispose()
+
+
+adal = AsyncDataAccessLayer()
+
+
+async def prep_db():
+    return await adal.run(db.prep_db)
+
+
+async def get_orders_by_customer(cust_name, shipped=None, details=False):
+    return await adal.run(app.get_orders_by_customer, cust_name, shipped, details)
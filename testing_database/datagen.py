@@ -0,0 +1,345 @@
+import math
+import random
+from datetime import datetime, timedelta
+from itertools import islice
+
+"""
+    :Synthetic data
+    prep_db() and the inventory_list/customer_list/order_items examples only create a handful of rows, which is
+    fine for correctness tests but cannot reproduce a performance problem. The generators below produce the same
+    schema at any size, deterministically for a given seed, and with the skew real data has:
+
+    + cookie (and track) popularity follows a Zipf distribution, so a few items appear in most line items;
+    + users (and customers) are picked with a Zipf distribution too, which gives a heavy tail of orders per user;
+    + every foreign key points at a row that exists, and extended costs (invoice totals) match their line items.
+
+    Rows are produced lazily, one table at a time, so tens of millions of rows never sit in memory, and
+    load() writes them in chunks with executemany.
+"""
+
+# a prime, so multiplying ranks by it modulo n shuffles popular ids across the whole id range
+_SCATTER = 2654435761
+_BASE_DATE = datetime(2020, 1, 1)
+
+
+class Zipf:
+    """Draw ranks 1..n with P(k) proportional to 1 / k**s, in constant time and memory.
+
+    Uses the inverse of the continuous approximation of the Zipf CDF, then scatters the
+    ranks over the ids so that the most popular ids are not simply the lowest ones.
+    """
+
+    def __init__(self, n, s, rnd):
+        self.n = n
+        self.s = s
+        self.rnd = rnd
+        self.h_max = self._h(n + 1.0)
+
+    def _h(self, x):
+        if self.s == 1.0:
+            return math.log(x)
+        return (x ** (1.0 - self.s) - 1.0) / (1.0 - self.s)
+
+    def _h_inverse(self, y):
+        if self.s == 1.0:
+            return math.exp(y)
+        return (y * (1.0 - self.s) + 1.0) ** (1.0 / (1.0 - self.s))
+
+    def rank(self):
+        return min(self.n, int(self._h_inverse(self.rnd.random() * self.h_max)))
+
+    def __call__(self):
+        """Return an id in 1..n."""
+        return (self.rank() - 1) * _SCATTER % self.n + 1
+
+
+def _unit(key, salt):
+    """A deterministic number in [0, 1) for an id, so independent streams agree on derived values."""
+    return ((key * _SCATTER + salt) * 40503 % 4294967296) / 4294967296.0
+
+
+def _geometric(rnd, mean):
+    """1 + a geometric variable, with the given mean."""
+    if mean <= 1:
+        return 1
+    p = 1.0 / mean
+    return 1 + int(math.log(1.0 - rnd.random()) / math.log(1.0 - p))
+
+
+def chunked(rows, chunk_size):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class CookieShopData:
+    """Users, cookies, orders and line items for the cookies/users/orders/line_items tables."""
+
+    flavours = ['chocolate chip', 'dark chocolate chip', 'peanut butter', 'oatmeal raisin',
+                'molasses', 'sugar', 'snickerdoodle', 'shortbread', 'gingerbread', 'macadamia']
+
+    def __init__(self, users=1000, cookies=100, orders=5000, items_per_order=3, cookie_skew=1.1,
+                 user_skew=1.2, seed=0):
+        self.n_users = users
+        self.n_cookies = cookies
+        self.n_orders = orders
+        self.items_per_order = items_per_order
+        self.cookie_skew = cookie_skew
+        self.user_skew = user_skew
+        self.seed = seed
+
+    def _random(self, stream):
+        return random.Random('{}:{}'.format(self.seed, stream))
+
+    def unit_cost(self, cookie_id):
+        return round(0.25 + int(_unit(cookie_id, 1) * 56) * 0.05, 2)
+
+    def cookies(self):
+        rnd = self._random('cookies')
+        for cookie_id in range(1, self.n_cookies + 1):
+            flavour = self.flavours[cookie_id % len(self.flavours)]
+            yield {'cookie_id': cookie_id,
+                   'cookie_name': '{} {}'.format(flavour, cookie_id),
+                   'cookie_recipe_url': 'http://some.aweso.me/cookie/{}.html'.format(cookie_id),
+                   'cookie_sku': 'SKU{:08d}'.format(cookie_id),
+                   'quantity': rnd.randint(0, 500),
+                   'unit_cost': self.unit_cost(cookie_id)}
+
+    def users(self):
+        for user_id in range(1, self.n_users + 1):
+            created_on = _BASE_DATE + timedelta(minutes=user_id)
+            yield {'user_id': user_id,
+                   'username': 'user{}'.format(user_id),
+                   'email_address': 'user{}@cookie.com'.format(user_id),
+                   'phone': '{:03d}-{:03d}-{:04d}'.format(user_id % 1000, user_id // 1000 % 1000,
+                                                          user_id % 10000),
+                   'password': 'password',
+                   'created_on': created_on,
+                   'updated_on': created_on}
+
+    def orders(self):
+        rnd = self._random('orders')
+        user = Zipf(self.n_users, self.user_skew, rnd)
+        for order_id in range(1, self.n_orders + 1):
+            yield {'order_id': order_id,
+                   'user_id': user(),
+                   'shipped': rnd.random() < 0.5}
+
+    def line_items(self):
+        rnd = self._random('line_items')
+        cookie = Zipf(self.n_cookies, self.cookie_skew, rnd)
+        line_items_id = 0
+        for order_id in range(1, self.n_orders + 1):
+            for _ in range(_geometric(rnd, self.items_per_order)):
+                line_items_id += 1
+                cookie_id = cookie()
+                quantity = min(24, _geometric(rnd, 3))
+                yield {'line_items_id': line_items_id,
+                       'order_id': order_id,
+                       'cookie_id': cookie_id,
+                       'quantity': quantity,
+                       'extended_cost': round(quantity * self.unit_cost(cookie_id), 2)}
+
+    def tables(self):
+        """(table name, rows) in an order that satisfies the foreign keys."""
+        return [('cookies', self.cookies()),
+                ('users', self.users()),
+                ('orders', self.orders()),
+                ('line_items', self.line_items())]
+
+
+class ChinookData:
+    """The Chinook schema of generate_models_db/models.py, `scale` times the size of the sample database."""
+
+    genres = ['Rock', 'Jazz', 'Metal', 'Alternative & Punk', 'Rock And Roll', 'Blues', 'Latin', 'Reggae',
+              'Pop', 'Soundtrack', 'Bossa Nova', 'Easy Listening', 'Heavy Metal', 'R&B/Soul',
+              'Electronica/Dance', 'World', 'Hip Hop/Rap', 'Science Fiction', 'TV Shows',
+              'Sci Fi & Fantasy', 'Drama', 'Comedy', 'Alternative', 'Classical', 'Opera']
+    media_types = ['MPEG audio file', 'Protected AAC audio file', 'Protected MPEG-4 video file',
+                   'Purchased AAC audio file', 'AAC audio file']
+    countries = ['USA', 'Canada', 'France', 'Brazil', 'Germany', 'United Kingdom', 'Czech Republic',
+                 'Portugal', 'India', 'Sweden']
+
+    def __init__(self, scale=1, skew=1.1, seed=0):
+        self.scale = scale
+        self.skew = skew
+        self.seed = seed
+        self.n_artists = 275 * scale
+        self.n_albums = 347 * scale
+        self.n_tracks = 3503 * scale
+        self.n_playlists = 18 * scale
+        self.n_customers = 59 * scale
+        self.n_invoices = 412 * scale
+
+    def _random(self, stream):
+        return random.Random('{}:{}'.format(self.seed, stream))
+
+    def media_type_id(self, track_id):
+        # one track in twenty is a (more expensive) video
+        return 3 if _unit(track_id, 2) < 0.05 else 1 + int(_unit(track_id, 3) * 2) * 3 % 5
+
+    def unit_price(self, track_id):
+        return 1.99 if self.media_type_id(track_id) == 3 else 0.99
+
+    def artists(self):
+        for artist_id in range(1, self.n_artists + 1):
+            yield {'ArtistId': artist_id, 'Name': 'Artist {}'.format(artist_id)}
+
+    def albums(self):
+        rnd = self._random('albums')
+        artist = Zipf(self.n_artists, self.skew, rnd)
+        for album_id in range(1, self.n_albums + 1):
+            yield {'AlbumId': album_id, 'Title': 'Album {}'.format(album_id), 'ArtistId': artist()}
+
+    def genre_rows(self):
+        for genre_id, name in enumerate(self.genres, 1):
+            yield {'GenreId': genre_id, 'Name': name}
+
+    def media_type_rows(self):
+        for media_type_id, name in enumerate(self.media_types, 1):
+            yield {'MediaTypeId': media_type_id, 'Name': name}
+
+    def tracks(self):
+        rnd = self._random('tracks')
+        album = Zipf(self.n_albums, self.skew, rnd)
+        genre = Zipf(len(self.genres), self.skew, rnd)
+        for track_id in range(1, self.n_tracks + 1):
+            milliseconds = int(rnd.lognormvariate(12.3, 0.4))
+            yield {'TrackId': track_id, 'Name': 'Track {}'.format(track_id), 'AlbumId': album(),
+                   'MediaTypeId': self.media_type_id(track_id), 'GenreId': genre(),
+                   'Composer': None, 'Milliseconds': milliseconds, 'Bytes': milliseconds * 32,
+                   'UnitPrice': self.unit_price(track_id)}
+
+    def playlists(self):
+        for playlist_id in range(1, self.n_playlists + 1):
+            yield {'PlaylistId': playlist_id, 'Name': 'Playlist {}'.format(playlist_id)}
+
+    def playlist_tracks(self):
+        rnd = self._random('playlist_tracks')
+        for playlist_id in range(1, self.n_playlists + 1):
+            size = min(self.n_tracks, _geometric(rnd, 480))
+            for track_id in sorted(rnd.sample(range(1, self.n_tracks + 1), size)):
+                yield {'PlaylistId': playlist_id, 'TrackId': track_id}
+
+    def employees(self):
+        titles = ['General Manager', 'Sales Manager', 'Sales Support Agent', 'Sales Support Agent',
+                  'Sales Support Agent', 'IT Manager', 'IT Staff', 'IT Staff']
+        reports_to = [None, 1, 2, 2, 2, 1, 6, 6]
+        for employee_id, (title, manager_id) in enumerate(zip(titles, reports_to), 1):
+            yield {'EmployeeId': employee_id, 'LastName': 'Employee{}'.format(employee_id),
+                   'FirstName': 'Staff', 'Title': title, 'ReportsTo': manager_id,
+                   'HireDate': _BASE_DATE - timedelta(days=400 * employee_id),
+                   'Email': 'staff{}@chinookcorp.com'.format(employee_id)}
+
+    def customers(self):
+        for customer_id in range(1, self.n_customers + 1):
+            yield {'CustomerId': customer_id, 'FirstName': 'Customer', 'LastName': str(customer_id),
+                   'Country': self.countries[customer_id % len(self.countries)],
+                   'Email': 'customer{}@example.com'.format(customer_id),
+                   'SupportRepId': 3 + customer_id % 3}
+
+    def _invoices(self):
+        rnd = self._random('invoices')
+        customer = Zipf(self.n_customers, self.skew, rnd)
+        track = Zipf(self.n_tracks, self.skew, rnd)
+        invoice_line_id = 0
+        for invoice_id in range(1, self.n_invoices + 1):
+            lines = []
+            for _ in range(_geometric(rnd, 5.4)):
+                invoice_line_id += 1
+                track_id = track()
+                lines.append({'InvoiceLineId': invoice_line_id, 'InvoiceId': invoice_id,
+                              'TrackId': track_id, 'UnitPrice': self.unit_price(track_id), 'Quantity': 1})
+            customer_id = customer()
+            invoice = {'InvoiceId': invoice_id, 'CustomerId': customer_id,
+                       'InvoiceDate': _BASE_DATE + timedelta(hours=invoice_id * 8760 // self.n_invoices),
+                       'BillingCountry': self.countries[customer_id % len(self.countries)],
+                       'Total': round(sum(line['UnitPrice'] for line in lines), 2)}
+            yield invoice, lines
+
+    def invoices(self):
+        for invoice, _ in self._invoices():
+            yield invoice
+
+    def invoice_lines(self):
+        # replays the same random stream as invoices(), so totals and lines agree without keeping either
+        for _, lines in self._invoices():
+            for line in lines:
+                yield line
+
+    def tables(self):
+        return [('Artist', self.artists()),
+                ('Album', self.albums()),
+                ('Genre', self.genre_rows()),
+                ('MediaType', self.media_type_rows()),
+                ('Track', self.tracks()),
+                ('Playlist', self.playlists()),
+                ('PlaylistTrack', self.playlist_tracks()),
+                ('Employee', self.employees()),
+                ('Customer', self.customers()),
+                ('Invoice', self.invoices()),
+                ('InvoiceLine', self.invoice_lines())]
+
+
+def load(connection, metadata, data, chunk_size=50000):
+    """Bulk load every table of `data` into the tables of the same name in `metadata`.
+
+    Keys that are not columns of the target table are dropped. On SQLite, the load skips fsyncs
+    (PRAGMA synchronous=OFF) for its own connection, and puts the connection's setting back afterwards.
+    Returns the number of rows per table.
+    """
+    counts = {}
+    synchronous = None
+    if connection.dialect.name == 'sqlite':
+        synchronous = connection.execute('PRAGMA synchronous').scalar()
+        connection.execute('PRAGMA synchronous=OFF')
+    try:
+        for name, rows in data.tables():
+            table = metadata.tables[name]
+            columns = set(table.c.keys())
+            ins = table.insert()
+            counts[name] = 0
+            with connection.begin():
+                for chunk in chunked(rows, chunk_size):
+                    connection.execute(ins, [{key: value for key, value in row.items() if key in columns}
+                                             for row in chunk])
+                    counts[name] += len(chunk)
+    finally:
+        if synchronous is not None:
+            connection.execute('PRAGMA synchronous={:d}'.format(synchronous))
+    return counts
+
+
+def main(argv=None):
+    import argparse
+    from sqlalchemy import create_engine
+
+    parser = argparse.ArgumentParser(description='Load deterministic synthetic data into a database.')
+    parser.add_argument('url', help='e.g. sqlite:///cookies.db')
+    parser.add_argument('--schema', choices=['cookies', 'chinook'], default='cookies')
+    parser.add_argument('--scale', type=int, default=1,
+                        help='cookies: 1000 users, 100 cookies and 5000 orders per unit; chinook: sample db size')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--chunk-size', type=int, default=50000)
+    args = parser.parse_args(argv)
+
+    if args.schema == 'chinook':
+        from generate_models_db.models import metadata
+        data = ChinookData(scale=args.scale, seed=args.seed)
+    else:
+        from testing_database.db import DataAccessLayer
+        metadata = DataAccessLayer.metadata
+        data = CookieShopData(users=1000 * args.scale, cookies=100 * args.scale, orders=5000 * args.scale,
+                              seed=args.seed)
+    engine = create_engine(args.url)
+    metadata.create_all(engine)
+    with engine.connect() as connection:
+        for name, count in load(connection, metadata, data, args.chunk_size).items():
+            print('{:<15} {:>12}'.format(name, count))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,13 +1,34 @@
+import threading
+import time
 from datetime import datetime
 from sqlalchemy import (MetaData, Table, Column, Integer, Numeric, String,
                         DateTime, ForeignKey, Boolean, create_engine)
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.pool import QueuePool
 from sqlalchemy.sql import insert
 
+from testing_database import datagen
+
 
 class DataAccessLayer:
-    connection = None
+    """
+        Connections are checked out of the engine's pool instead of sharing a single one:
+
+        + per thread: `dal.connection` is the connection of the calling thread, checked out on first use
+          and kept until `dal.release()` is called from that thread.
+        + per request: `with dal.connect() as conn:` checks a connection out and returns it to the pool
+          at the end of the block.
+
+        File databases use a QueuePool of pool_size connections plus up to max_overflow extra ones,
+        waiting at most pool_timeout seconds for a free connection. An in-memory SQLite database only
+        exists for the connection that created it, so it keeps SQLite's one connection per thread pool.
+        Calling db_init again, or dispose(), closes the per thread connections of every thread first.
+    """
     engine = None
     conn_string = None
+    pool_size = 5
+    max_overflow = 10
+    pool_timeout = 30
     metadata = MetaData()
     cookies = Table('cookies',
                     metadata,
@@ -44,16 +65,117 @@ class DataAccessLayer:
                        Column('extended_cost', Numeric(12, 2))
                        )
 
-    def db_init(self, conn_string):
-        self.engine = create_engine(conn_string or self.conn_string)
+    def __init__(self):
+        self._local = threading.local()
+        # the per thread connections, so db_init can close them whichever thread checked them out
+        self._thread_connections = []
+        self._connection = None
+        self._stats_lock = threading.Lock()
+        self._reset_stats()
+
+    def db_init(self, conn_string, pool_size=None, max_overflow=None, pool_timeout=None, instrumentation=None):
+        url = make_url(conn_string or self.conn_string)
+        self.dispose()
+        options = {}
+        if url.get_backend_name() != 'sqlite' or url.database not in (None, '', ':memory:'):
+            options = dict(poolclass=QueuePool,
+                           pool_size=self.pool_size if pool_size is None else pool_size,
+                           max_overflow=self.max_overflow if max_overflow is None else max_overflow,
+                           pool_timeout=self.pool_timeout if pool_timeout is None else pool_timeout)
+            if url.get_backend_name() == 'sqlite':
+                # pooled connections are handed to whichever thread checks them out next
+                options['connect_args'] = {'check_same_thread': False}
+        self.engine = create_engine(url, **options)
+        if instrumentation is not None:
+            # see sqlalchemy_core/instrumentation.py
+            instrumentation.attach(self.engine)
         self.metadata.create_all(self.engine)
-        self.connection = self.engine.connect()
+        self._reset_stats()
+
+    def dispose(self):
+        """Close the per thread connections of every thread and dispose of the engine's pool."""
+        with self._stats_lock:
+            connections, self._thread_connections = self._thread_connections, []
+        for connection in connections:
+            connection.close()
+        self._local = threading.local()
+        if self.engine is not None:
+            self.engine.dispose()
+
+    def _reset_stats(self):
+        self.checkouts = 0
+        self.wait_time = 0.0
+        self.max_wait = 0.0
+
+    def checkout(self):
+        start = time.perf_counter()
+        connection = self.engine.connect()
+        waited = time.perf_counter() - start
+        with self._stats_lock:
+            self.checkouts += 1
+            self.wait_time += waited
+            self.max_wait = max(self.max_wait, waited)
+        return connection
+
+    def connect(self):
+        """Check out a connection for one request; use it as a context manager to return it."""
+        return self.checkout()
+
+    @property
+    def connection(self):
+        if self._connection is not None:
+            return self._connection
+        if self.engine is None:
+            return None
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or connection.closed:
+            connection = self._local.connection = self.checkout()
+            with self._stats_lock:
+                self._thread_connections = [other for other in self._thread_connections if not other.closed]
+                self._thread_connections.append(connection)
+        return connection
+
+    @connection.setter
+    def connection(self, connection):
+        # a connection assigned explicitly is shared by every thread, as it used to be
+        self._connection = connection
+
+    @connection.deleter
+    def connection(self):
+        self._connection = None
+
+    def release(self):
+        """Return the connection of the calling thread to the pool."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def pool_status(self):
+        pool = self.engine.pool
+        status = {'pool': type(pool).__name__,
+                  'checkouts': self.checkouts,
+                  'wait_time': self.wait_time,
+                  'max_wait': self.max_wait,
+                  'avg_wait': self.wait_time / self.checkouts if self.checkouts else 0.0}
+        # only QueuePool counts its connections; SingletonThreadPool (in-memory SQLite) has size as an attribute
+        if isinstance(pool, QueuePool):
+            status.update(size=pool.size(),
+                          checked_out=pool.checkedout(),
+                          checked_in=pool.checkedin(),
+                          overflow=pool.overflow())
+        else:
+            status['size'] = getattr(pool, 'size', None)
+        return status
 
 
 dal = DataAccessLayer()
 
 
-def prep_db():
+def prep_db(data=None):
+    """Insert the fixture rows, or bulk load `data` (e.g. a datagen.CookieShopData) instead."""
+    if data is not None:
+        return datagen.load(dal.connection, dal.metadata, data)
     ins = dal.cookies.insert()
     dal.connection.execute(ins, cookie_name='dark chocolate chip',
                            cookie_recipe_url='http://some.aweso.me/cookie/recipe_dark.html',
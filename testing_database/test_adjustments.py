@@ -0,0 +1,121 @@
+import unittest
+from unittest import mock
+
+from sqlalchemy import CheckConstraint, Column, Integer, MetaData, String, Table, create_engine, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm.exc import StaleDataError
+
+from sqlalchemy_core import adjustments
+from sqlalchemy_core.adjustments import Adjusted, adjust_stock
+from sqlalchemy_orm.models import Base, Cookie
+
+
+class TestAdjustStock(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine('sqlite:///:memory:')
+        metadata = MetaData()
+        self.cookies = Table('cookies', metadata,
+                             Column('cookie_id', Integer(), primary_key=True),
+                             Column('cookie_sku', String(55), unique=True),
+                             Column('quantity', Integer()),
+                             Column('version_id', Integer(), nullable=False, default=1),
+                             CheckConstraint('quantity >= 0', name='quantity_positive'))
+        metadata.create_all(self.engine)
+        self.conn = self.engine.connect()
+        self.conn.execute(self.cookies.insert(), [
+            {'cookie_sku': 'CC0{}'.format(i), 'quantity': 10} for i in range(1, 5)])
+
+    def tearDown(self):
+        self.conn.close()
+
+    def stock(self):
+        return self.conn.execute(select([self.cookies.c.cookie_id, self.cookies.c.quantity]).order_by(
+            self.cookies.c.cookie_id)).fetchall()
+
+    def test_deltas_in_order(self):
+        for method in adjustments.METHODS:
+            self.conn.execute(self.cookies.update().values(quantity=10))
+            results = adjust_stock(self.conn, self.cookies, [(1, -4), (2, -11), (1, -6), (1, -1), (9, 3), (3, 5)],
+                                   method=method)
+            self.assertEqual(results, [Adjusted(1, True, 6), Adjusted(2, False, 10), Adjusted(1, True, 0),
+                                       Adjusted(1, False, 0), Adjusted(9, False, None), Adjusted(3, True, 15)])
+            self.assertEqual(self.stock(), [(1, 0), (2, 10), (3, 15), (4, 10)])
+
+    def test_set_by_sku(self):
+        for method in adjustments.METHODS:
+            results = adjust_stock(self.engine, self.cookies, [('CC04', 3), ('CC02', -1), ('CC04', 7)],
+                                   key='cookie_sku', mode='set', method=method)
+            self.assertEqual([result.applied for result in results], [True, False, True])
+            self.assertEqual(self.stock()[1:], [(2, 10), (3, 10), (4, 7)])
+
+    def test_atomic_and_session(self):
+        session = sessionmaker(bind=self.engine)()
+        results = adjust_stock(session, self.cookies, [(1, -1), (2, -100)], atomic=True)
+        self.assertEqual(results, [Adjusted(1, False, 10), Adjusted(2, False, 10)])
+        adjust_stock(session, self.cookies, [(1, -1), (2, -2)])
+        session.commit()
+        session.close()
+        self.assertEqual(self.stock()[:2], [(1, 9), (2, 8)])
+        self.assertEqual(self.conn.execute(select([self.cookies.c.version_id])).fetchall()[:3], [(2,), (2,), (1,)])
+
+    def test_stock_changed_underneath(self):
+        stale = {1: 10, 2: 50}
+        for method in adjustments.METHODS:
+            with mock.patch.object(adjustments, '_stock', return_value=stale):
+                with self.assertRaises(StaleDataError):
+                    adjust_stock(self.conn, self.cookies, [(1, -5), (2, -30)], method=method)
+            self.assertEqual(self.stock()[:2], [(1, 10), (2, 10)])
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            adjust_stock(self.conn, self.cookies, [(1, 1)], mode='multiply')
+        with self.assertRaises(ValueError):
+            adjust_stock(self.conn, self.cookies, [(1, 1)], method='loop')
+
+
+class TestAdjustStockSession(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine('sqlite:///:memory:')
+        Base.metadata.create_all(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+        self.session.add_all([Cookie('cookie {}'.format(i), sku='CC0{}'.format(i), quantity=10) for i in range(1, 4)])
+        self.session.commit()
+
+    def tearDown(self):
+        self.session.close()
+
+    def quantities(self):
+        return [cookie.quantity for cookie in self.session.query(Cookie).order_by(Cookie.cookie_id)]
+
+    def test_failure_keeps_the_callers_changes(self):
+        self.session.query(Cookie).get(3).quantity = 30
+        self.session.add(Cookie('cookie 4', sku='CC04', quantity=40))
+        with mock.patch.object(adjustments, '_stock', return_value={1: 10, 2: 50}):
+            with self.assertRaises(StaleDataError):
+                adjust_stock(self.session, Cookie.__table__, [(1, -5), (2, -30)])
+        self.session.commit()
+        self.assertEqual(self.quantities(), [10, 10, 30, 40])
+
+    def test_left_for_the_caller_to_commit(self):
+        adjust_stock(self.session, Cookie.__table__, [(1, -5)])
+        self.session.rollback()
+        self.assertEqual(self.quantities(), [10, 10, 10])
+        self.session.query(Cookie).get(3).quantity = 30
+        self.session.flush()
+        adjust_stock(self.session, Cookie.__table__, [(1, -5)])
+        self.session.commit()
+        self.assertEqual(self.quantities(), [5, 10, 30])
+
+    def test_loaded_cookies_are_expired(self):
+        cookie = self.session.query(Cookie).get(1)
+        adjust_stock(self.session, Cookie.__table__, [(1, -5), (2, -5)])
+        self.assertEqual((cookie.quantity, cookie.version_id), (5, 2))
+        cookie.quantity -= 1
+        self.session.commit()
+        self.assertEqual(self.quantities(), [4, 5, 10])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,8 +2,11 @@ import unittest
 
 from decimal import Decimal
 
+from sqlalchemy import create_engine
+
+from testing_database import app
 from testing_database.db import dal, prep_db
-from testing_database.app import get_orders_by_customer
+from testing_database.app import get_orders_by_customer, compiled_orders_query, get_orders_by_customer_arrays
 
 
 class TestApp(unittest.TestCase):
@@ -91,5 +94,30 @@ class TestApp(unittest.TestCase):
         results = get_orders_by_customer('cookiemon', False, True)
         self.assertEqual(results, self.cookie_details)
 
+    def test_orders_by_customer_compiled_once(self):
+        dialect = dal.connection.dialect
+        get_orders_by_customer('cookiemon', False, True)
+        compiled = compiled_orders_query(dialect, False, True)
+        get_orders_by_customer('cakeeater', True, True)
+        self.assertIs(compiled_orders_query(dialect, True, True), compiled)
+        self.assertIsNot(compiled_orders_query(dialect, None, True), compiled)
+
+    def test_compiled_queries_not_kept_per_engine(self):
+        for shipped in (None, True):
+            for details in (False, True):
+                compiled_orders_query(dal.connection.dialect, shipped, details)
+        cached = len(app._compiled_queries)
+        engine = create_engine('sqlite:///:memory:')
+        self.assertIs(compiled_orders_query(engine.dialect, None, True),
+                      compiled_orders_query(dal.connection.dialect, None, True))
+        self.assertEqual(len(app._compiled_queries), cached)
+
+    def test_orders_by_customer_arrays(self):
+        arrays = get_orders_by_customer_arrays('cookiemon', details=True, numeric='cents')
+        self.assertEqual(arrays['cookie_name'].tolist(), ['dark chocolate chip', 'oatmeal raisin'])
+        self.assertEqual(arrays['quantity'].tolist(), [2, 12])
+        self.assertEqual(arrays['extended_cost'].tolist(), [100, 300])
+        self.assertEqual(len(get_orders_by_customer_arrays('bad name')['order_id']), 0)
+
 if __name__ == "__main__":
     TestApp.run()
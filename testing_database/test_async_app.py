@@ -0,0 +1,81 @@
+import asyncio
+import time
+import unittest
+from decimal import Decimal
+
+from testing_database.async_app import AsyncDataAccessLayer, adal, prep_db, get_orders_by_customer
+from testing_database.db import DataAccessLayer
+
+
+class TestAsyncApp(unittest.TestCase):
+    cookie_orders = [(u'wlk001', u'cookiemon', u'111-111-1111')]
+    cookie_details = [
+        (u'wlk001', u'cookiemon', u'111-111-1111',
+            u'dark chocolate chip', 2, Decimal('1.00')),
+        (u'wlk001', u'cookiemon', u'111-111-1111',
+            u'oatmeal raisin', 12, Decimal('3.00'))]
+
+    @classmethod
+    def setUpClass(cls):
+        cls.loop = asyncio.new_event_loop()
+        cls.loop.run_until_complete(adal.db_init('sqlite:///:memory:'))
+        cls.loop.run_until_complete(prep_db())
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.loop.run_until_complete(adal.close())
+        cls.loop.close()
+
+    def run_async(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def test_orders_by_customer_blank(self):
+        results = self.run_async(get_orders_by_customer(''))
+        self.assertEqual(results, [])
+
+    def test_orders_by_customer(self):
+        results = self.run_async(get_orders_by_customer('cookiemon'))
+        self.assertEqual(results, self.cookie_orders)
+
+    def test_orders_by_customer_unshipped_only_details(self):
+        results = self.run_async(get_orders_by_customer('cookiemon', False, True))
+        self.assertEqual(results, self.cookie_details)
+
+    def test_orders_by_customer_concurrent(self):
+        async def lookups():
+            return await asyncio.gather(
+                get_orders_by_customer('cookiemon', True),
+                *[get_orders_by_customer('cookiemon', details=True) for _ in range(100)])
+
+        results = self.run_async(lookups())
+        self.assertEqual(results[0], [])
+        self.assertEqual(results[1:], [self.cookie_details] * 100)
+
+
+class TestAsyncClose(unittest.TestCase):
+
+    def test_close_does_not_block_the_loop(self):
+        async def scenario():
+            adal = AsyncDataAccessLayer(DataAccessLayer())
+            await adal.db_init('sqlite:///:memory:')
+            slow = asyncio.ensure_future(adal.run(time.sleep, 0.3))
+            await asyncio.sleep(0.01)
+            ticks = []
+
+            async def ticker():
+                while not slow.done():
+                    ticks.append(time.perf_counter())
+                    await asyncio.sleep(0.01)
+
+            tick = asyncio.ensure_future(ticker())
+            await adal.close()
+            await asyncio.gather(slow, tick)
+            return adal, ticks
+
+        adal, ticks = asyncio.run(scenario())
+        self.assertIsNone(adal.executor)
+        self.assertGreater(len(ticks), 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
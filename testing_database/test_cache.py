@@ -0,0 +1,161 @@
+import os
+import tempfile
+import unittest
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.orm.exc import NoResultFound
+
+from sqlalchemy_orm.models import Base, Cookie, User
+from sqlalchemy_orm.cache import EntityCache, entity_cache
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestEntityCache(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine('sqlite:///:memory:')
+        Base.metadata.create_all(self.engine)
+        self.Session = sessionmaker(bind=self.engine)
+        session = self.Session()
+        session.add_all([Cookie('chocolate chip', quantity=12, unit_cost=0.50),
+                         Cookie('peanut butter', quantity=24, unit_cost=0.25),
+                         User('cookiemon', 'mon@cookie.com', '111-111-1111', 'password')])
+        session.commit()
+        session.close()
+        self.clock = FakeClock()
+        self.cache = EntityCache(keys={Cookie: ('cookie_name',), User: ('username',)}, maxsize=2, ttl=60,
+                                 clock=self.clock).register(self.Session)
+        self.statements = []
+        event.listen(self.engine, 'before_cursor_execute',
+                     lambda conn, cursor, statement, *args: self.statements.append(statement))
+
+    def lookup(self, model, column, value):
+        session = self.Session()
+        try:
+            instance = self.cache.get_by(session, model, column, value)
+            return {attr.key: getattr(instance, attr.key) for attr in instance.__mapper__.column_attrs}
+        finally:
+            session.close()
+
+    def test_hit_across_sessions(self):
+        first = self.lookup(Cookie, 'cookie_name', 'chocolate chip')
+        queries = len(self.statements)
+        self.assertEqual(self.lookup(Cookie, 'cookie_name', 'chocolate chip'), first)
+        self.assertEqual(len(self.statements), queries)
+        session = self.Session()
+        self.assertEqual(self.cache.get(session, Cookie, first['cookie_id']).quantity, 12)
+        session.close()
+        self.assertEqual(len(self.statements), queries)
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (2, 1))
+
+    def test_attached_instance_is_persistent(self):
+        self.lookup(Cookie, 'cookie_name', 'chocolate chip')
+        session = self.Session()
+        cookie = self.cache.get_by(session, Cookie, 'cookie_name', 'chocolate chip')
+        cookie.quantity = 10
+        session.commit()
+        session.close()
+        self.assertEqual(self.lookup(Cookie, 'cookie_name', 'chocolate chip')['quantity'], 10)
+
+    def test_flush_invalidates(self):
+        self.lookup(User, 'username', 'cookiemon')
+        session = self.Session()
+        session.query(User).filter(User.username == 'cookiemon').one().phone = '222-222-2222'
+        session.commit()
+        session.close()
+        self.assertEqual(self.cache.stats()['invalidations'], 1)
+        self.assertEqual(self.lookup(User, 'username', 'cookiemon')['phone'], '222-222-2222')
+
+    def test_bulk_update_and_delete_invalidate(self):
+        self.lookup(Cookie, 'cookie_name', 'chocolate chip')
+        session = self.Session()
+        session.query(Cookie).update({Cookie.quantity: Cookie.quantity + 1}, synchronize_session=False)
+        session.commit()
+        session.close()
+        self.assertEqual(self.lookup(Cookie, 'cookie_name', 'chocolate chip')['quantity'], 13)
+        session = self.Session()
+        session.query(Cookie).filter(Cookie.cookie_name == 'chocolate chip').delete(synchronize_session=False)
+        session.commit()
+        session.close()
+        with self.assertRaises(NoResultFound):
+            self.lookup(Cookie, 'cookie_name', 'chocolate chip')
+
+    def test_uncommitted_reads_not_cached(self):
+        session = self.Session()
+        session.query(Cookie).update({Cookie.quantity: 0}, synchronize_session=False)
+        self.assertEqual(self.cache.get_by(session, Cookie, 'cookie_name', 'chocolate chip').quantity, 0)
+        session.rollback()
+        session.close()
+        self.assertEqual(self.lookup(Cookie, 'cookie_name', 'chocolate chip')['quantity'], 12)
+
+    def test_ttl_and_lru(self):
+        self.lookup(Cookie, 'cookie_name', 'chocolate chip')
+        self.clock.now = 61
+        self.lookup(Cookie, 'cookie_name', 'chocolate chip')
+        self.assertEqual(self.cache.stats()['expirations'], 1)
+        self.lookup(Cookie, 'cookie_name', 'peanut butter')
+        self.lookup(User, 'username', 'cookiemon')
+        stats = self.cache.stats()
+        self.assertEqual((stats['size'], stats['evictions']), (2, 1))
+
+
+class TestEntityCacheConcurrentSessions(unittest.TestCase):
+    """Two sessions with their own connections, so one does not see the other's uncommitted changes."""
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.db')
+        os.close(handle)
+        self.engine = create_engine('sqlite:///' + self.path)
+        Base.metadata.create_all(self.engine)
+        self.Session = sessionmaker(bind=self.engine)
+        session = self.Session()
+        session.add(Cookie('chocolate chip', quantity=12, unit_cost=0.50))
+        session.commit()
+        session.close()
+        self.cache = EntityCache(keys={Cookie: ('cookie_name',)}).register(self.Session)
+
+    def tearDown(self):
+        self.engine.dispose()
+        os.remove(self.path)
+
+    def quantity(self):
+        session = self.Session()
+        try:
+            return self.cache.get_by(session, Cookie, 'cookie_name', 'chocolate chip').quantity
+        finally:
+            session.close()
+
+    def test_cached_between_flush_and_commit(self):
+        writer = self.Session()
+        writer.query(Cookie).update({Cookie.quantity: 0}, synchronize_session=False)
+        writer.query(Cookie).filter(Cookie.cookie_name == 'chocolate chip').one().unit_cost = 0.60
+        writer.flush()
+        self.assertEqual(self.quantity(), 12)
+        writer.commit()
+        writer.close()
+        self.assertEqual(self.quantity(), 0)
+
+    def test_read_before_invalidation_not_cached(self):
+        writer = self.Session()
+        writer.query(Cookie).update({Cookie.quantity: 0}, synchronize_session=False)
+        # the writer commits after the reader loaded the old row, before the reader stores it
+        event.listen(Cookie, 'load', lambda cookie, context: writer.commit(), once=True)
+        self.assertEqual(self.quantity(), 12)
+        writer.close()
+        self.assertEqual(self.quantity(), 0)
+
+    def test_not_registered_by_default(self):
+        self.assertFalse(event.contains(Session, 'after_flush', entity_cache._after_flush))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import unittest
+from unittest import mock
+
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+from sqlalchemy_orm import checkout
+from sqlalchemy_orm.checkout import allocate_keys, write_orders
+from sqlalchemy_orm.models import Base, Cookie, LineItems, Order, User
+
+
+class TestWriteOrders(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine('sqlite:///:memory:')
+        Base.metadata.create_all(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+        self.cookiemon = User('cookiemon', 'mon@cookie.com', '111-111-1111', 'password')
+        self.cc = Cookie('chocolate chip', sku='CC01', quantity=12, unit_cost=0.50)
+        self.pb = Cookie('peanut butter', sku='PB01', quantity=24, unit_cost=0.25)
+        self.session.add_all([self.cookiemon, self.cc, self.pb, Order(user=self.cookiemon)])
+        self.session.commit()
+        self.statements = []
+        event.listen(self.engine, 'before_cursor_execute',
+                     lambda conn, cursor, statement, *args: self.statements.append(statement.split()[0]))
+
+    def tearDown(self):
+        self.session.close()
+
+    def new_order(self, *items):
+        order = Order(user=self.cookiemon)
+        for cookie, quantity in items:
+            order.line_items.append(LineItems(cookie=cookie, quantity=quantity,
+                                              extended_cost=quantity * cookie.unit_cost))
+        return order
+
+    def test_orders_become_persistent(self):
+        orders = [self.new_order((self.cc, 2)), self.new_order((self.cc, 1), (self.pb, 6)), self.new_order()]
+        self.statements[:] = []
+        write_orders(self.session, orders)
+        self.assertEqual(self.statements, ['SELECT', 'SELECT', 'INSERT', 'INSERT'])
+        states = [inspect(instance) for order in orders for instance in [order] + list(order.line_items)]
+        self.assertTrue(all(state.persistent for state in states))
+        self.assertEqual([order.order_id for order in orders], [2, 3, 4])
+        self.assertEqual(orders[1].line_items[1].cookie_id, self.pb.cookie_id)
+        self.assertIs(orders[0].shipped, False)
+        self.statements[:] = []
+        self.session.flush()
+        # at most the expired cookiemon is loaded again, for the new orders in cookiemon.orders
+        self.assertEqual([statement for statement in self.statements if statement != 'SELECT'], [])
+        self.session.commit()
+        self.assertEqual(len(self.cookiemon.orders), 4)
+        rows = self.session.query(LineItems.line_items_id, LineItems.order_id, LineItems.cookie_id,
+                                  LineItems.quantity).order_by(LineItems.line_items_id).all()
+        self.assertEqual(rows, [(1, 2, 1, 2), (2, 3, 1, 1), (3, 3, 2, 6)])
+        self.assertIs(self.session.query(Order).get(3), orders[1])
+
+    def test_rollback(self):
+        orders = [self.new_order((self.cc, 2)), self.new_order((self.pb, 1))]
+        write_orders(self.session, orders)
+        self.session.rollback()
+        states = [inspect(instance) for order in orders for instance in [order] + list(order.line_items)]
+        self.assertTrue(all(state.transient for state in states))
+        self.assertEqual([order.order_id for order in orders], [None, None])
+        self.assertEqual(orders[1].line_items[0].quantity, 1)
+        self.assertEqual(self.session.query(Order).count(), 1)
+        write_orders(self.session, orders)
+        self.session.commit()
+        self.assertEqual([order.order_id for order in orders], [2, 3])
+        self.assertEqual(self.session.query(LineItems).count(), 2)
+
+    def test_savepoint_rollback(self):
+        first = self.new_order((self.cc, 2))
+        write_orders(self.session, [first])
+        self.session.begin_nested()
+        second = self.new_order((self.pb, 1))
+        write_orders(self.session, [second])
+        self.session.rollback()
+        self.assertTrue(inspect(first).persistent)
+        self.assertTrue(inspect(second).transient)
+        self.session.commit()
+        self.assertEqual([order.order_id for order in self.session.query(Order)], [1, 2])
+
+    def test_failed_insert(self):
+        order = self.new_order((self.cc, 2))
+        self.assertIn(order, self.session)
+        with mock.patch.object(checkout, 'allocate_keys', return_value=[1]):
+            with self.assertRaises(IntegrityError):
+                write_orders(self.session, [order])
+        self.assertTrue(inspect(order).pending)
+        self.assertIsNone(order.order_id)
+        self.assertIsNone(order.line_items[0].line_items_id)
+        self.session.rollback()
+        write_orders(self.session, [order])
+        self.session.commit()
+        self.assertEqual(order.order_id, 2)
+
+    def test_invalid_batches(self):
+        oatmeal = Cookie('oatmeal raisin', sku='EWW01', quantity=100, unit_cost=1.00)
+        with self.assertRaises(ValueError):
+            write_orders(self.session, [self.new_order((oatmeal, 1))])
+        self.session.rollback()
+        with self.assertRaises(ValueError):
+            write_orders(self.session, [self.session.query(Order).first()])
+        self.assertEqual(write_orders(self.session, []), [])
+
+    def test_allocate_keys(self):
+        self.assertEqual(allocate_keys(self.session.connection(), Order.__table__.c.order_id, 3), [2, 3, 4])
+        self.assertEqual(allocate_keys(self.session.connection(), LineItems.__table__.c.line_items_id, 2), [1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
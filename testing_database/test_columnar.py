@@ -0,0 +1,72 @@
+import unittest
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.orm import Session
+
+from generate_models_db.models import Invoice, InvoiceLine
+from sqlalchemy_core.columnar import fetch_arrays, fetch_records, iter_chunks
+
+
+class TestColumnar(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine('sqlite:///:memory:')
+        self.conn = self.engine.connect()
+        Invoice.__table__.create(self.conn)
+        InvoiceLine.__table__.create(self.conn)
+        self.conn.execute(Invoice.__table__.insert(), [
+            {'InvoiceId': 1, 'CustomerId': 1, 'InvoiceDate': datetime(2009, 1, 1, 10, 30), 'Total': 2.97},
+            {'InvoiceId': 2, 'CustomerId': 2, 'InvoiceDate': datetime(2009, 1, 2), 'Total': 1.99}])
+        self.conn.execute(InvoiceLine.__table__.insert(), [
+            {'InvoiceLineId': 1, 'InvoiceId': 1, 'TrackId': 10, 'UnitPrice': 0.99, 'Quantity': 1},
+            {'InvoiceLineId': 2, 'InvoiceId': 1, 'TrackId': 11, 'UnitPrice': 1.98, 'Quantity': 2},
+            {'InvoiceLineId': 3, 'InvoiceId': 2, 'TrackId': 12, 'UnitPrice': 1.99, 'Quantity': 1}])
+        lines, invoices = InvoiceLine.__table__, Invoice.__table__
+        self.statement = select([lines.c.InvoiceLineId, lines.c.UnitPrice, invoices.c.InvoiceDate,
+                                 invoices.c.BillingCity]).select_from(lines.join(invoices)).order_by(
+            lines.c.InvoiceLineId)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def test_dtypes(self):
+        arrays = fetch_arrays(self.statement, self.conn, chunk_size=2)
+        self.assertEqual(list(arrays), ['InvoiceLineId', 'UnitPrice', 'InvoiceDate', 'BillingCity'])
+        self.assertEqual(arrays['InvoiceLineId'].dtype, np.int64)
+        np.testing.assert_array_equal(arrays['UnitPrice'], [0.99, 1.98, 1.99])
+        self.assertEqual(arrays['InvoiceDate'][0], np.datetime64('2009-01-01T10:30'))
+        self.assertEqual(arrays['BillingCity'].dtype, object)
+        self.assertEqual(list(arrays['BillingCity']), [None, None, None])
+
+    def test_cents(self):
+        cents = fetch_arrays(self.statement, self.conn, numeric='cents')['UnitPrice']
+        self.assertEqual(cents.dtype, np.int64)
+        self.assertEqual(cents.tolist(), [99, 198, 199])
+
+    def test_chunks_and_nulls(self):
+        self.conn.execute(InvoiceLine.__table__.insert(), [
+            {'InvoiceLineId': 4, 'InvoiceId': 2, 'TrackId': 13, 'UnitPrice': 0.99, 'Quantity': 1}])
+        statement = select([InvoiceLine.__table__.c.Quantity, Invoice.__table__.c.InvoiceId]).select_from(
+            InvoiceLine.__table__.outerjoin(Invoice.__table__, Invoice.__table__.c.InvoiceId == 3))
+        chunks = list(iter_chunks(statement, self.conn, chunk_size=3))
+        self.assertEqual([len(chunk['Quantity']) for chunk in chunks], [3, 1])
+        self.assertTrue(np.isnan(fetch_arrays(statement, self.conn)['InvoiceId']).all())
+
+    def test_orm_query_and_records(self):
+        session = Session(bind=self.conn)
+        records = fetch_records(session.query(InvoiceLine).filter(InvoiceLine.InvoiceId == 1))
+        self.assertEqual(records.TrackId.tolist(), [10, 11])
+        self.assertAlmostEqual(float((records.UnitPrice * records.Quantity).sum()), 4.95)
+        session.close()
+
+    def test_empty_and_text(self):
+        empty = fetch_arrays(self.statement.where(InvoiceLine.__table__.c.Quantity > 5), self.conn, numeric='cents')
+        self.assertEqual((len(empty['UnitPrice']), empty['UnitPrice'].dtype), (0, np.int64))
+        untyped = fetch_arrays(text('SELECT TrackId FROM InvoiceLine ORDER BY TrackId'), self.conn)
+        self.assertEqual(untyped['TrackId'].tolist(), [10, 11, 12])
+
+
+if __name__ == '__main__':
+    unittest.main()
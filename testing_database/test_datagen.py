@@ -0,0 +1,81 @@
+import unittest
+from collections import Counter
+
+from sqlalchemy import create_engine, select, func
+
+from testing_database.datagen import CookieShopData, ChinookData, Zipf, load
+from testing_database.db import DataAccessLayer, prep_db, dal
+
+
+class TestCookieShopData(unittest.TestCase):
+
+    def setUp(self):
+        self.data = CookieShopData(users=200, cookies=50, orders=1000, seed=7)
+
+    def test_deterministic(self):
+        again = CookieShopData(users=200, cookies=50, orders=1000, seed=7)
+        self.assertEqual(list(self.data.orders()), list(again.orders()))
+        self.assertEqual(list(self.data.line_items()), list(again.line_items()))
+        other = CookieShopData(users=200, cookies=50, orders=1000, seed=8)
+        self.assertNotEqual(list(self.data.line_items()), list(other.line_items()))
+
+    def test_referentially_consistent(self):
+        orders = {order['order_id']: order for order in self.data.orders()}
+        self.assertTrue(all(1 <= order['user_id'] <= 200 for order in orders.values()))
+        for item in self.data.line_items():
+            self.assertIn(item['order_id'], orders)
+            self.assertTrue(1 <= item['cookie_id'] <= 50)
+            self.assertAlmostEqual(item['extended_cost'],
+                                   item['quantity'] * self.data.unit_cost(item['cookie_id']))
+
+    def test_skewed(self):
+        popularity = Counter(item['cookie_id'] for item in self.data.line_items()).most_common()
+        self.assertGreater(popularity[0][1], 5 * popularity[-1][1])
+
+    def test_prep_db(self):
+        dal.db_init('sqlite:///:memory:')
+        counts = prep_db(self.data)
+        self.assertEqual(counts['orders'], 1000)
+        self.assertEqual(dal.connection.execute(select([func.count()]).select_from(dal.line_items)).scalar(),
+                         counts['line_items'])
+
+    def test_load_restores_synchronous(self):
+        dal.db_init('sqlite:///:memory:')
+        dal.connection.execute('PRAGMA synchronous=NORMAL')
+        load(dal.connection, dal.metadata, CookieShopData(users=10, cookies=5, orders=20))
+        self.assertEqual(dal.connection.execute('PRAGMA synchronous').scalar(), 1)
+        with self.assertRaises(KeyError):
+            load(dal.connection, dal.metadata, ChinookData(scale=1))
+        self.assertEqual(dal.connection.execute('PRAGMA synchronous').scalar(), 1)
+
+
+class TestZipf(unittest.TestCase):
+
+    def test_range(self):
+        import random
+        zipf = Zipf(10, 1.0, random.Random(0))
+        self.assertEqual(set(zipf() for _ in range(10000)), set(range(1, 11)))
+
+
+class TestChinookData(unittest.TestCase):
+
+    def test_load(self):
+        from generate_models_db.models import metadata
+        data = ChinookData(scale=2, seed=1)
+        engine = create_engine('sqlite:///:memory:')
+        metadata.create_all(engine)
+        with engine.connect() as conn:
+            counts = load(conn, metadata, data)
+            self.assertEqual(counts['Track'], 3503 * 2)
+            invoice, line = metadata.tables['Invoice'], metadata.tables['InvoiceLine']
+            mismatched = conn.execute(
+                select([func.count()]).select_from(invoice).where(
+                    invoice.c.Total != select([func.round(func.sum(line.c.UnitPrice), 2)]).where(
+                        line.c.InvoiceId == invoice.c.InvoiceId).as_scalar())).scalar()
+            self.assertEqual(mismatched, 0)
+            conn.execute('PRAGMA foreign_keys=ON')
+            self.assertEqual(conn.execute('PRAGMA foreign_key_check').fetchall(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from sqlalchemy import exc
+
+from testing_database.db import DataAccessLayer
+
+
+class TestDataAccessLayerPool(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.dal = DataAccessLayer()
+        self.dal.db_init('sqlite:///' + os.path.join(self.directory, 'cookies.db'),
+                         pool_size=2, max_overflow=1, pool_timeout=1)
+
+    def tearDown(self):
+        self.dal.engine.dispose()
+        shutil.rmtree(self.directory)
+
+    def test_connection_per_thread(self):
+        connections = {}
+
+        def worker(name):
+            connections[name] = self.dal.connection
+            self.assertIs(self.dal.connection, connections[name])
+
+        threads = [threading.Thread(target=worker, args=(name,)) for name in ('a', 'b')]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertIsNot(connections['a'], connections['b'])
+        self.assertEqual(self.dal.pool_status()['checked_out'], 2)
+
+    def test_release(self):
+        connection = self.dal.connection
+        self.dal.release()
+        self.assertTrue(connection.closed)
+        self.assertEqual(self.dal.pool_status()['checked_out'], 0)
+        self.assertIsNot(self.dal.connection, connection)
+
+    def test_connect_per_request(self):
+        with self.dal.connect() as conn:
+            conn.execute(self.dal.cookies.insert(), cookie_name='peanut butter')
+            self.assertEqual(self.dal.pool_status()['checked_out'], 1)
+        self.assertEqual(self.dal.pool_status()['checked_out'], 0)
+        status = self.dal.pool_status()
+        self.assertEqual(status['pool'], 'QueuePool')
+        self.assertEqual(status['size'], 2)
+        self.assertEqual(status['checkouts'], 1)
+
+    def test_pool_timeout(self):
+        connections = [self.dal.connect() for _ in range(3)]
+        self.assertEqual(self.dal.pool_status()['overflow'], 1)
+        with self.assertRaises(exc.TimeoutError):
+            self.dal.connect()
+        for connection in connections:
+            connection.close()
+
+    def test_explicit_zero(self):
+        self.dal.db_init('sqlite:///' + os.path.join(self.directory, 'cookies.db'),
+                         pool_size=1, max_overflow=0, pool_timeout=0)
+        connection = self.dal.connect()
+        start = time.perf_counter()
+        with self.assertRaises(exc.TimeoutError):
+            self.dal.connect()
+        self.assertLess(time.perf_counter() - start, 0.5)
+        connection.close()
+
+    def test_db_init_closes_thread_connections(self):
+        connections = [self.dal.connection]
+        thread = threading.Thread(target=lambda: connections.append(self.dal.connection))
+        thread.start()
+        thread.join()
+        old_pool = self.dal.engine.pool
+        self.assertEqual(old_pool.checkedout(), 2)
+        self.dal.db_init('sqlite:///' + os.path.join(self.directory, 'other.db'), pool_size=2)
+        self.assertTrue(all(connection.closed for connection in connections))
+        self.assertEqual(old_pool.checkedout(), 0)
+        self.assertIsNot(self.dal.connection, connections[0])
+        self.assertEqual(self.dal.pool_status()['checked_out'], 1)
+
+    def test_assigned_connection_is_shared(self):
+        connection = self.dal.connect()
+        self.dal.connection = connection
+        seen = []
+        thread = threading.Thread(target=lambda: seen.append(self.dal.connection))
+        thread.start()
+        thread.join()
+        self.assertIs(seen[0], connection)
+        del self.dal.connection
+        self.assertIsNot(self.dal.connection, connection)
+        connection.close()
+
+
+class TestDataAccessLayerMemory(unittest.TestCase):
+
+    def test_pool_status(self):
+        dal = DataAccessLayer()
+        dal.db_init('sqlite:///:memory:')
+        dal.connection.execute('SELECT 1')
+        status = dal.pool_status()
+        self.assertEqual((status['pool'], status['size'], status['checkouts']), ('SingletonThreadPool', 5, 1))
+        self.assertNotIn('checked_out', status)
+        dal.dispose()
+
+
+if __name__ == "__main__":
+    unittest.main()
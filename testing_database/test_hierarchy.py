@@ -0,0 +1,75 @@
+import unittest
+
+from sqlalchemy import create_engine, MetaData, Table, Column, Integer, String, ForeignKey
+from sqlalchemy.orm import sessionmaker
+
+from sqlalchemy_core.hierarchy import subtree_query, manager_chain_query, headcount_query
+from sqlalchemy_orm.models import Base, Employee
+
+metadata = MetaData()
+employees = Table(
+    'employee', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('manager_id', None, ForeignKey('employee.id')),
+    Column('name', String(255)))
+
+# 1 manages 2 and 3, 2 manages 4 and 5, 5 manages 6
+ORG = [(1, None), (2, 1), (3, 1), (4, 2), (5, 2), (6, 5)]
+
+
+class TestCoreHierarchy(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine('sqlite:///:memory:')
+        metadata.create_all(self.engine)
+        self.engine.execute(employees.insert(), [
+            {'id': id, 'manager_id': manager_id, 'name': 'e{}'.format(id)} for id, manager_id in ORG])
+
+    def test_subtree(self):
+        rows = self.engine.execute(subtree_query(employees, 2)).fetchall()
+        self.assertEqual([(row.id, row.depth) for row in rows], [(2, 0), (4, 1), (5, 1), (6, 2)])
+
+    def test_manager_chain(self):
+        rows = self.engine.execute(manager_chain_query(employees, 6)).fetchall()
+        self.assertEqual([(row.id, row.depth) for row in rows], [(5, 1), (2, 2), (1, 3)])
+        self.assertEqual(self.engine.execute(manager_chain_query(employees, 1)).fetchall(), [])
+
+    def test_headcount(self):
+        rows = self.engine.execute(headcount_query(employees)).fetchall()
+        self.assertEqual([tuple(row) for row in rows], [(1, 'e1', 5, 3), (2, 'e2', 3, 2), (5, 'e5', 1, 1)])
+        rows = self.engine.execute(headcount_query(employees, manager_id=2)).fetchall()
+        self.assertEqual([tuple(row) for row in rows], [(2, 'e2', 3, 2)])
+
+    def test_cycle_stops(self):
+        self.engine.execute(employees.update().where(employees.c.id == 1).values(manager_id=6))
+        rows = self.engine.execute(subtree_query(employees, 1, max_depth=10)).fetchall()
+        self.assertEqual(max(row.depth for row in rows), 10)
+
+
+class TestOrmHierarchy(unittest.TestCase):
+
+    def setUp(self):
+        engine = create_engine('sqlite:///:memory:')
+        Base.metadata.create_all(engine)
+        self.session = sessionmaker(bind=engine)()
+        self.session.add_all([Employee(id=id, manager_id=manager_id, name='e{}'.format(id))
+                              for id, manager_id in ORG])
+        self.session.commit()
+
+    def tearDown(self):
+        self.session.close()
+
+    def test_subtree(self):
+        self.assertEqual([(employee.name, depth) for employee, depth in Employee.subtree(self.session, 5)],
+                         [('e5', 0), ('e6', 1)])
+
+    def test_manager_chain(self):
+        self.assertEqual([employee.id for employee in Employee.manager_chain(self.session, 4)], [2, 1])
+
+    def test_headcounts(self):
+        self.assertEqual([(row.id, row.headcount) for row in Employee.headcounts(self.session)],
+                         [(1, 5), (2, 3), (5, 1)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from sqlalchemy import inspect
+
+from migration_db.index_advisor import (ALEMBIC_DIR, Index, Statement, advise, cookie_shop_workload,
+                                        write_revision)
+from testing_database.datagen import CookieShopData
+from testing_database.db import dal, prep_db
+
+
+class TestStatement(unittest.TestCase):
+
+    def test_columns(self):
+        statement = Statement('SELECT orders.order_id FROM users JOIN orders ON users.user_id = orders.user_id '
+                              'WHERE users.username = ? AND orders.shipped = ? ORDER BY orders.order_id',
+                              {'users', 'orders'})
+        self.assertEqual(statement.equals, {'users': ['username'], 'orders': ['shipped']})
+        self.assertEqual(statement.joins, {'users': ['user_id'], 'orders': ['user_id']})
+        self.assertEqual(statement.flagged_tables('SEARCH users USING INDEX x (username=?)\nSCAN orders'),
+                         ['orders'])
+        self.assertIn(Index('orders', ('user_id', 'shipped')), statement.candidates('orders'))
+
+    def test_flagged_tables_before_sqlite_3_36(self):
+        statement = Statement('SELECT o.order_id FROM users JOIN orders AS o ON users.user_id = o.user_id '
+                              'JOIN line_items AS li ON o.order_id = li.order_id WHERE users.username = ?',
+                              {'users', 'orders', 'line_items'})
+        plan = ('SEARCH TABLE users USING INDEX ix_users_username (username=?)\n'
+                'SCAN TABLE orders AS o\n'
+                'SEARCH TABLE line_items AS li USING AUTOMATIC COVERING INDEX (order_id=?)')
+        self.assertEqual(statement.flagged_tables(plan), ['orders', 'line_items'])
+        self.assertEqual(statement.flagged_tables('SCAN TABLE orders AS o USING COVERING INDEX ix_orders_user_id\n'
+                                                  'SCAN TABLE users USING INDEX ix_users_username'), [])
+        self.assertEqual(statement.flagged_tables('SCAN o\nSEARCH li USING AUTOMATIC COVERING INDEX (order_id=?)'),
+                         ['orders', 'line_items'])
+
+
+class TestIndexAdvisor(unittest.TestCase):
+
+    def setUp(self):
+        dal.db_init('sqlite:///:memory:')
+        prep_db(CookieShopData(users=200, cookies=20, orders=1000))
+
+    def test_advise(self):
+        advice = advise(dal.engine, cookie_shop_workload(200, calls=5), repeat=1)
+        leading = {(index.table, index.columns[0]) for index in advice.indexes}
+        self.assertIn(('orders', 'user_id'), leading)
+        self.assertIn(('line_items', 'order_id'), leading)
+        self.assertEqual(len(advice.before), len(advice.after))
+        # the database is left as it was
+        self.assertEqual([index['name'] for index in inspect(dal.engine).get_indexes('orders')], [])
+
+    def test_advise_drops_candidates_on_error(self):
+        workload = cookie_shop_workload(200, calls=1)
+        runs = []
+
+        def failing_workload():
+            runs.append(1)
+            # the first two runs happen before any candidate index is created
+            if len(runs) > 2:
+                raise RuntimeError('workload failed')
+            workload()
+
+        with self.assertRaises(RuntimeError):
+            advise(dal.engine, failing_workload, repeat=1)
+        self.assertEqual([index['name'] for index in inspect(dal.engine).get_indexes('orders')], [])
+        self.assertEqual([index['name'] for index in inspect(dal.engine).get_indexes('line_items')], [])
+
+    def test_write_revision(self):
+        directory = tempfile.mkdtemp()
+        try:
+            shutil.copy(os.path.join(ALEMBIC_DIR, 'script.py.mako'), directory)
+            shutil.copytree(os.path.join(ALEMBIC_DIR, 'versions'), os.path.join(directory, 'versions'),
+                            ignore=shutil.ignore_patterns('__pycache__'))
+            path = write_revision([Index('orders', ('user_id', 'shipped'))], directory)
+            with open(path) as f:
+                source = f.read()
+            self.assertIn("down_revision = '1b6c56b99ab1'", source)
+            self.assertIn("op.create_index('ix_orders_user_id_shipped', 'orders', ['user_id', 'shipped'])", source)
+            self.assertIn("op.drop_index('ix_orders_user_id_shipped', table_name='orders')", source)
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    unittest.main()
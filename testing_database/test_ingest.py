@@ -0,0 +1,90 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from decimal import Decimal
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+from sqlalchemy_orm.ingest import METHODS, ingest, ingest_file
+from sqlalchemy_orm.models import Base, Cookie
+
+CSV = '''cookie_name,cookie_recipe_url,cookie_sku,quantity,unit_cost,supplier
+chocolate chip,http://some.aweso.me/cookie/recipe.html,CC01,12,0.50,acme
+dark chocolate chip,,CC02,1,0.75,acme
+peanut butter,http://some.aweso.me/cookie/peanut.html,PB01,24,0.25,acme
+'''
+
+JSONL = [
+    {'cookie_name': 'chocolate chip', 'cookie_sku': 'CC01', 'quantity': 12, 'unit_cost': '0.50'},
+    {'cookie_name': 'dark chocolate chip', 'cookie_recipe_url': 'http://some.aweso.me/cookie/dark.html',
+     'cookie_sku': 'CC02', 'unit_cost': 0.75},
+    {},
+    {'cookie_name': 'peanut butter', 'cookie_sku': 'PB01', 'quantity': '24'},
+]
+
+
+class TestIngest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.engine = create_engine('sqlite:///:memory:')
+        Base.metadata.create_all(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+
+    def tearDown(self):
+        self.session.close()
+        shutil.rmtree(self.directory)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def cookies(self):
+        return self.session.query(Cookie.cookie_sku, Cookie.cookie_recipe_url, Cookie.quantity, Cookie.unit_cost,
+                                  Cookie.version_id).order_by(Cookie.cookie_id).all()
+
+    def test_csv(self):
+        path = self.write('cookies.csv', CSV)
+        for method in METHODS:
+            self.session.query(Cookie).delete()
+            stats = ingest_file(self.session, path, method=method, chunk_size=2)
+            self.assertEqual(stats[:2], (3, 2))
+            self.assertEqual(self.cookies(), [
+                ('CC01', 'http://some.aweso.me/cookie/recipe.html', 12, Decimal('0.50'), 1),
+                ('CC02', None, 1, Decimal('0.75'), 1),
+                ('PB01', 'http://some.aweso.me/cookie/peanut.html', 24, Decimal('0.25'), 1)])
+
+    def test_jsonl_with_mixed_keys(self):
+        path = self.write('cookies.jsonl', ''.join(json.dumps(row) + '\n' for row in JSONL))
+        for method in METHODS:
+            self.session.query(Cookie).delete()
+            stats = ingest_file(self.session, path, method=method, chunk_size=3)
+            self.assertEqual(stats[:2], (4, 2))
+            self.assertEqual(self.cookies(), [
+                ('CC01', None, 12, Decimal('0.50'), 1),
+                ('CC02', 'http://some.aweso.me/cookie/dark.html', None, Decimal('0.75'), 1),
+                (None, None, None, None, 1),
+                ('PB01', None, 24, None, 1)])
+
+    def test_failed_chunk_rolls_back_alone(self):
+        rows = [{'cookie_sku': 'CC01'}, {'cookie_sku': 'CC02'}, {'cookie_sku': 'CC03'}, {'cookie_sku': 'CC01'}]
+        for method in METHODS:
+            self.session.query(Cookie).delete()
+            self.session.commit()
+            with self.assertRaises(IntegrityError):
+                ingest(self.session, rows, method=method, chunk_size=2)
+            self.assertEqual([row[0] for row in self.cookies()], ['CC01', 'CC02'])
+
+    def test_unknown_method(self):
+        with self.assertRaises(ValueError):
+            ingest(self.session, [], method='copy')
+
+
+if __name__ == '__main__':
+    unittest.main()
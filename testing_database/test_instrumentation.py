@@ -0,0 +1,79 @@
+import logging
+import time
+import unittest
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+
+from sqlalchemy_core.instrumentation import Instrumentation, statement_template
+from testing_database.db import dal, prep_db
+from testing_database.app import get_orders_by_customer
+
+
+class TestInstrumentation(unittest.TestCase):
+
+    def setUp(self):
+        self.instrumentation = Instrumentation(slow_threshold=0.0)
+        dal.db_init('sqlite:///:memory:', instrumentation=self.instrumentation)
+        prep_db()
+        self.instrumentation.reset()
+
+    def tearDown(self):
+        self.instrumentation.stop_logging()
+        self.instrumentation.detach(dal.engine)
+
+    def test_statement_template(self):
+        self.assertEqual(statement_template('SELECT *\n  FROM cookies WHERE cookie_id IN (?, ?,?)'),
+                         'SELECT * FROM cookies WHERE cookie_id IN (?, ...)')
+        self.assertEqual(statement_template('INSERT INTO t (a, b) VALUES (?, ?), (?, ?), (?, ?)'),
+                         'INSERT INTO t (a, b) VALUES (?, ...), ...')
+
+    def test_counts_per_template(self):
+        for name in ('cookiemon', 'cakeeater', 'pieguy'):
+            get_orders_by_customer(name, details=True)
+        statements = self.instrumentation.snapshot()
+        self.assertEqual(len(statements), 1)
+        stats = statements[0]
+        self.assertEqual(stats['count'], 3)
+        self.assertEqual(sum(stats['histogram'].values()), 3)
+        self.assertGreaterEqual(stats['p99_ms'], stats['p50_ms'])
+        self.assertIn('SEARCH', stats['plan'])
+
+    def test_explain_above_threshold_only(self):
+        self.instrumentation.slow_threshold = 60
+        get_orders_by_customer('cookiemon')
+        stats = self.instrumentation.snapshot()[0]
+        self.assertEqual(stats['slow'], 0)
+        self.assertIsNone(stats['plan'])
+
+    def test_failed_statement(self):
+        with self.assertRaises(OperationalError):
+            dal.connection.execute('SELECT * FROM no_such_table')
+        self.assertNotIn('instrumentation_start', dal.connection.info)
+        get_orders_by_customer('cookiemon')
+        statements = self.instrumentation.snapshot()
+        self.assertEqual([stats['count'] for stats in statements], [1])
+
+    def test_engine_class(self):
+        self.instrumentation.detach(dal.engine)
+        self.instrumentation.attach(Engine)
+        try:
+            get_orders_by_customer('cookiemon')
+        finally:
+            self.instrumentation.detach(Engine)
+        self.assertEqual(self.instrumentation.snapshot()[0]['count'], 1)
+
+    def test_log_line(self):
+        get_orders_by_customer('cookiemon')
+        with self.assertLogs('sqlalchemy_core.instrumentation', logging.INFO) as logs:
+            self.instrumentation.start_logging(interval=0.01)
+            deadline = time.monotonic() + 5
+            while not logs.records and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.instrumentation.stop_logging()
+        self.assertTrue(logs.records, 'no summary line logged within 5 seconds')
+        self.assertIn('statements=1 templates=1', logs.output[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+
+from sqlalchemy import create_engine, MetaData, Table, Column, Integer, String, Numeric
+from sqlalchemy.orm import sessionmaker
+
+from sqlalchemy_core.inventory_totals import install, read_totals, verify, rebuild
+from sqlalchemy_orm.models import Base, Cookie, inventory_totals
+
+
+class TestInventoryTotals(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine('sqlite:///:memory:')
+        Base.metadata.create_all(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+        self.cookies = Cookie.__table__
+
+    def tearDown(self):
+        self.session.close()
+
+    def totals(self):
+        self.assertEqual(verify(self.session, self.cookies, inventory_totals), {})
+        return read_totals(self.session, inventory_totals)
+
+    def test_orm_and_core_writes(self):
+        self.session.add_all([Cookie('chocolate chip', quantity=12, unit_cost=0.50),
+                              Cookie('peanut butter', quantity=24, unit_cost=0.25)])
+        self.session.commit()
+        self.assertEqual(self.totals(), {'total_units': 36, 'sku_count': 2, 'inventory_value_cents': 1200})
+
+        self.session.execute(self.cookies.insert(), [
+            {'cookie_name': 'oatmeal raisin', 'quantity': 100, 'unit_cost': 1.00},
+            {'cookie_name': None, 'quantity': 1, 'unit_cost': 0.33}])
+        self.assertEqual(self.totals(), {'total_units': 137, 'sku_count': 3, 'inventory_value_cents': 11233})
+
+        cookie = self.session.query(Cookie).filter(Cookie.cookie_name == 'chocolate chip').one()
+        cookie.quantity = 2
+        self.session.query(Cookie).filter(Cookie.quantity > 20).update(
+            {Cookie.quantity: Cookie.quantity - 20}, synchronize_session=False)
+        self.session.query(Cookie).filter(Cookie.cookie_name.is_(None)).delete(synchronize_session=False)
+        self.session.commit()
+        self.assertEqual(self.totals(), {'total_units': 86, 'sku_count': 3, 'inventory_value_cents': 8200})
+
+    def test_rollback(self):
+        self.session.add(Cookie('chocolate chip', quantity=12, unit_cost=0.50))
+        self.session.flush()
+        self.session.rollback()
+        self.assertEqual(self.totals(), {'total_units': 0, 'sku_count': 0, 'inventory_value_cents': 0})
+
+    def test_install_verify_rebuild(self):
+        engine = create_engine('sqlite:///:memory:')
+        cookies = Table('cookies', MetaData(),
+                        Column('cookie_id', Integer(), primary_key=True),
+                        Column('cookie_name', String(50)),
+                        Column('quantity', Integer()),
+                        Column('unit_cost', Numeric(12, 2)))
+        cookies.create(engine)
+        with engine.connect() as conn:
+            conn.execute(cookies.insert(), [{'cookie_name': 'a', 'quantity': 3, 'unit_cost': 0.10}])
+            summary = install(conn, cookies)
+            self.assertEqual(read_totals(conn, summary)['inventory_value_cents'], 30)
+            conn.execute(summary.update().values(total_units=0))
+            self.assertEqual(verify(conn, cookies, summary), {'total_units': (0, 3)})
+            rebuild(conn, cookies, summary)
+            self.assertEqual(verify(conn, cookies, summary), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
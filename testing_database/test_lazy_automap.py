@@ -0,0 +1,81 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.ext.automap import automap_base
+from sqlalchemy.orm import Session
+
+from reflection.lazy_automap import lazy_automap_base
+
+
+class TestLazyAutomap(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.engine = create_engine('sqlite:///' + os.path.join(self.directory, 'music.db'))
+        for sql in ('CREATE TABLE artist (id INTEGER PRIMARY KEY, name VARCHAR(50))',
+                    'CREATE TABLE album (id INTEGER PRIMARY KEY, title VARCHAR(50), '
+                    'artist_id INTEGER REFERENCES artist (id))',
+                    'CREATE TABLE genre (id INTEGER PRIMARY KEY, name VARCHAR(50))',
+                    'CREATE TABLE track (id INTEGER PRIMARY KEY, album_id INTEGER REFERENCES album (id), '
+                    'genre_id INTEGER REFERENCES genre (id))',
+                    'CREATE TABLE playlist (id INTEGER PRIMARY KEY, name VARCHAR(50))',
+                    'CREATE TABLE playlist_track (playlist_id INTEGER REFERENCES playlist (id), '
+                    'track_id INTEGER REFERENCES track (id), PRIMARY KEY (playlist_id, track_id))',
+                    "INSERT INTO artist VALUES (1, 'AC/DC')",
+                    "INSERT INTO album VALUES (1, 'Let There Be Rock', 1)",
+                    "INSERT INTO genre VALUES (1, 'Rock')",
+                    'INSERT INTO track VALUES (1, 1, 1)',
+                    "INSERT INTO playlist VALUES (1, 'Music')",
+                    'INSERT INTO playlist_track VALUES (1, 1)'):
+            self.engine.execute(sql)
+        self.path = os.path.join(self.directory, 'music.reflection')
+
+    def tearDown(self):
+        self.engine.dispose()
+        shutil.rmtree(self.directory)
+
+    def test_maps_only_what_the_class_needs(self):
+        Base = lazy_automap_base(self.engine)
+        self.assertEqual(Base.classes.keys(), ['album', 'artist', 'genre', 'playlist', 'track'])
+        artist = Base.classes.artist
+        self.assertEqual(Base.classes.mapped(), ['album', 'artist'])
+        session = Session(self.engine)
+        self.assertEqual([album.title for album in session.query(artist).one().album_collection],
+                         ['Let There Be Rock'])
+        session.close()
+
+    def test_relationships_added_as_classes_are_mapped(self):
+        Base = lazy_automap_base(self.engine)
+        Base.classes.artist
+        album = Base.classes._data['album']
+        self.assertNotIn('track_collection', inspect(album).relationships)
+        playlist = Base.classes.playlist
+        self.assertIn('track_collection', inspect(album).relationships)
+        session = Session(self.engine)
+        track = session.query(playlist).one().track_collection[0]
+        self.assertEqual((track.album.artist.name, track.genre.name), ('AC/DC', 'Rock'))
+        self.assertEqual([p.name for p in track.playlist_collection], ['Music'])
+        session.close()
+
+    def test_same_relationships_as_prepare(self):
+        eager = automap_base()
+        eager.prepare(self.engine, reflect=True)
+        lazy = lazy_automap_base(self.engine)
+        for name in ('album', 'track', 'playlist', 'artist', 'genre'):
+            getattr(lazy.classes, name)
+        for name in lazy.classes.keys():
+            self.assertEqual(sorted(inspect(getattr(lazy.classes, name)).relationships.keys()),
+                             sorted(inspect(getattr(eager.classes, name)).relationships.keys()))
+
+    def test_cache_file(self):
+        lazy_automap_base(self.engine, self.path)
+        Base = lazy_automap_base(self.engine, self.path)
+        self.assertEqual(Base.classes._automap.cache.status, 'hit')
+        self.assertEqual(Base.classes.genre.__table__.c.keys(), ['id', 'name'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import logging
+import unittest
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from sqlalchemy_orm.models import Base, Cookie, User, Order, LineItems
+from sqlalchemy_orm.loading import order_loading, detect_lazy_loads, NPlusOneError
+
+
+class TestLoading(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine('sqlite:///:memory:')
+        Base.metadata.create_all(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+        cookies = [Cookie('cookie {}'.format(i), quantity=100, unit_cost=0.5) for i in range(5)]
+        order = Order(user=User('cookiemon', 'mon@cookie.com', '111-111-1111', 'password'))
+        for cookie in cookies:
+            order.line_items.append(LineItems(cookie=cookie, quantity=2, extended_cost=1.00))
+        self.session.add(order)
+        self.session.commit()
+        self.session.close()
+        self.statements = []
+        event.listen(self.engine, 'before_cursor_execute',
+                     lambda conn, cursor, statement, *args: self.statements.append(statement))
+
+    def tearDown(self):
+        self.session.close()
+
+    def load_order(self, *options):
+        order = self.session.query(Order).options(*options).get(1)
+        return [(li.cookie.cookie_name, li.quantity) for li in order.line_items], order.user.username
+
+    def test_lazy_is_n_plus_one(self):
+        self.load_order()
+        # order, line items, 5 cookies, user
+        self.assertEqual(len(self.statements), 8)
+
+    def test_selectin_joined(self):
+        self.assertEqual(len(self.load_order(*order_loading(user='joined'))[0]), 5)
+        self.assertEqual(len(self.statements), 2)
+
+    def test_joined_everything(self):
+        self.load_order(*order_loading(line_items='joined', cookie='joined', user='joined'))
+        self.assertEqual(len(self.statements), 1)
+
+    def test_unknown_strategy(self):
+        with self.assertRaises(ValueError):
+            order_loading(line_items='eager')
+
+    def test_detector_raises(self):
+        with self.assertRaises(NPlusOneError):
+            with detect_lazy_loads(self.session, threshold=2):
+                self.load_order()
+
+    def test_detector_quiet_with_eager_loading(self):
+        with detect_lazy_loads(self.session, threshold=0) as counter:
+            self.load_order(*order_loading(user='selectin'))
+        self.assertEqual(counter.total, 0)
+
+    def test_detector_logs(self):
+        with self.assertLogs('sqlalchemy_orm.loading', logging.WARNING) as logs:
+            with detect_lazy_loads(self.session, threshold=1, action='log') as counter:
+                self.load_order()
+        self.assertEqual(counter.counts['LineItems.cookie'], 5)
+        self.assertIn('LineItems.cookie x5', logs.output[0])
+
+    def test_detector_counts_baked_lazy_loads(self):
+        # the lazy loads are baked outside the block first
+        self.load_order()
+        self.session.close()
+        other = sessionmaker(bind=self.engine)()
+        with detect_lazy_loads(self.session, threshold=0, action='log') as counter:
+            other.query(Order).get(1).line_items
+            self.load_order()
+        other.close()
+        self.assertEqual(counter.counts, {'Order.line_items': 1, 'LineItems.cookie': 5, 'Order.user': 1})
+        self.assertTrue(self.session.enable_baked_queries)
+
+
+if __name__ == '__main__':
+    unittest.main()
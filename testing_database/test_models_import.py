@@ -0,0 +1,64 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from sqlalchemy_orm import database
+from sqlalchemy_orm.models import Cookie
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# self time of the repository's own modules when importing both model modules, SQLAlchemy excluded
+OWN_IMPORT_BUDGET_MS = 75
+# everything, SQLAlchemy included
+TOTAL_IMPORT_BUDGET_MS = 1500
+
+
+def import_times(modules, cwd):
+    """{module: (self ms, cumulative ms)} from python -X importtime, and the stdout of the import."""
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import ' + ', '.join(modules)],
+                            cwd=cwd, env=env, capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:') and '|' in line and 'self [us]' not in line:
+            own, cumulative, name = line[len('import time:'):].split('|')
+            times[name.strip()] = (int(own) / 1000, int(cumulative) / 1000)
+    return times, result.stdout
+
+
+class TestModelsImport(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_import_budget_and_no_side_effects(self):
+        modules = ['sqlalchemy_orm.models', 'sqlalchemy_core.models']
+        times, stdout = import_times(modules, self.directory)
+        own = sum(self_ms for name, (self_ms, _) in times.items()
+                  if name.split('.')[0] in ('sqlalchemy_orm', 'sqlalchemy_core'))
+        total = sum(times[name][1] for name in modules)
+        self.assertLess(own, OWN_IMPORT_BUDGET_MS)
+        self.assertLess(total, TOTAL_IMPORT_BUDGET_MS)
+        self.assertEqual(stdout, '')
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_engine_created_on_first_session(self):
+        engine = database.LazyEngine('sqlite:///:memory:', Cookie.metadata)
+        self.assertFalse(engine.created)
+        session = database.Session(bind=engine.get())
+        self.assertTrue(engine.created)
+        self.assertIs(engine.get(), engine.get())
+        self.assertEqual(session.query(Cookie).count(), 0)
+        session.close()
+        engine.configure('sqlite://')
+        self.assertFalse(engine.created)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+from decimal import Decimal
+
+from sqlalchemy import create_engine, desc, select
+from sqlalchemy.orm import Session
+
+from sqlalchemy_core.pagination import InvalidToken, decode_token, encode_token, iter_pages, keyset_page
+from sqlalchemy_orm.models import Base, Cookie
+
+
+class TestPagination(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine('sqlite:///:memory:')
+        Base.metadata.create_all(self.engine)
+        self.session = Session(bind=self.engine)
+        self.session.add_all([Cookie('cookie {}'.format(i), sku='SKU{}'.format(i), quantity=i % 4,
+                                     unit_cost=i % 7 / 4.0)
+                              for i in range(1, 48)])
+        self.session.commit()
+
+    def tearDown(self):
+        self.session.close()
+
+    def ids(self, pages):
+        return [row.cookie_id for page in pages for row in page.rows]
+
+    def test_pages_cover_the_ordered_query(self):
+        ordering = [Cookie.quantity, Cookie.cookie_id]
+        pages = list(iter_pages(self.session.query(Cookie), ordering, page_size=10))
+        self.assertEqual([len(page.rows) for page in pages], [10, 10, 10, 10, 7])
+        self.assertIsNone(pages[-1].next_token)
+        expected = [cookie.cookie_id for cookie in self.session.query(Cookie).order_by(*ordering)]
+        self.assertEqual(self.ids(pages), expected)
+
+    def test_descending_and_mixed_orderings(self):
+        for ordering in ([desc(Cookie.unit_cost), desc(Cookie.cookie_id)],
+                         [desc(Cookie.quantity), Cookie.cookie_id]):
+            query = self.session.query(Cookie.cookie_id, Cookie.quantity, Cookie.unit_cost)
+            expected = [row.cookie_id for row in query.order_by(*ordering)]
+            self.assertEqual(self.ids(iter_pages(query, ordering, page_size=6)), expected)
+
+    def test_core_select(self):
+        cookies = Cookie.__table__
+        ordering = [cookies.c.quantity, cookies.c.cookie_id]
+        with self.engine.connect() as conn:
+            first = keyset_page(select([cookies]).where(cookies.c.quantity > 1), ordering, 5, connectable=conn)
+            pages = [first] + list(iter_pages(select([cookies]).where(cookies.c.quantity > 1), ordering, 5,
+                                              first.next_token, conn))
+            expected = [row.cookie_id for row in conn.execute(
+                select([cookies]).where(cookies.c.quantity > 1).order_by(*ordering))]
+        self.assertEqual(self.ids(pages), expected)
+        # the same ordering through the ORM continues from a Core token
+        page = keyset_page(self.session.query(Cookie), [Cookie.quantity, Cookie.cookie_id], 5, first.next_token)
+        self.assertEqual([cookie.cookie_id for cookie in page.rows], expected[5:10])
+
+    def test_invalid_tokens(self):
+        token = keyset_page(self.session.query(Cookie), [Cookie.quantity, Cookie.cookie_id], 5).next_token
+        with self.assertRaises(InvalidToken):
+            keyset_page(self.session.query(Cookie), [desc(Cookie.quantity), Cookie.cookie_id], 5, token)
+        with self.assertRaises(InvalidToken):
+            decode_token([Cookie.cookie_id], 'not a token')
+        ordering = [Cookie.unit_cost, Cookie.cookie_id]
+        self.assertEqual(decode_token(ordering, encode_token(ordering, [Decimal('0.25'), 3])), [Decimal('0.25'), 3])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from sqlalchemy_orm.models import Base, Cookie, User, Order, LineItems
+from sqlalchemy_orm.read_models import read_all, iter_read, read_model, CookieRow
+
+
+class TestReadModels(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine('sqlite:///:memory:')
+        Base.metadata.create_all(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+        user = User('cookiemon', 'mon@cookie.com', '111-111-1111', 'password')
+        order = Order(user=user)
+        for i, name in enumerate(('chocolate chip', 'oatmeal raisin', 'peanut butter')):
+            cookie = Cookie(name, 'http://some.aweso.me/{}.html'.format(i), 'CC0{}'.format(i), 10 * i, 0.50)
+            LineItems(order=order, cookie=cookie, quantity=i + 1, extended_cost=0.50 * (i + 1))
+        self.session.add(order)
+        self.session.commit()
+        self.session.close()
+
+    def tearDown(self):
+        self.session.close()
+
+    def test_same_values_and_repr_as_entities(self):
+        query = self.session.query(Cookie).filter(Cookie.quantity > 0).order_by(Cookie.cookie_name)
+        entities = query.all()
+        self.session.expunge_all()
+        rows = read_all(query)
+        self.assertEqual([repr(row) for row in rows], [repr(entity) for entity in entities])
+        self.assertEqual([(row.cookie_id, row.unit_cost) for row in rows],
+                         [(entity.cookie_id, entity.unit_cost) for entity in entities])
+        self.assertIsInstance(rows[0], CookieRow)
+
+    def test_bypasses_the_session(self):
+        rows = read_all(self.session.query(LineItems).order_by(LineItems.line_items_id))
+        orders = list(iter_read(self.session.query(Order), batch_size=1))
+        self.assertEqual(len(self.session.identity_map), 0)
+        self.assertEqual([row.quantity for row in rows], [1, 2, 3])
+        self.assertEqual([(order.order_id, order.shipped) for order in orders], [(1, False)])
+
+    def test_read_only(self):
+        row = read_all(self.session.query(User))[0]
+        with self.assertRaises(AttributeError):
+            row.username = 'changed'
+        self.assertFalse(hasattr(row, '__dict__'))
+        self.assertIs(read_model(User), type(row))
+
+
+if __name__ == '__main__':
+    unittest.main()
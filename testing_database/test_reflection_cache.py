@@ -0,0 +1,97 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from sqlalchemy import create_engine, MetaData
+
+from reflection.reflection_cache import ReflectionCache
+
+
+class TestReflectionCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.engine = create_engine('sqlite:///' + os.path.join(self.directory, 'shop.db'))
+        for sql in ('CREATE TABLE artist (id INTEGER PRIMARY KEY, name VARCHAR(50))',
+                    'CREATE TABLE album (id INTEGER PRIMARY KEY, artist_id INTEGER REFERENCES artist (id))',
+                    'CREATE TABLE track (id INTEGER PRIMARY KEY, album_id INTEGER REFERENCES album (id))',
+                    'CREATE TABLE genre (id INTEGER PRIMARY KEY, name VARCHAR(50))'):
+            self.engine.execute(sql)
+        self.path = os.path.join(self.directory, 'shop.reflection')
+
+    def tearDown(self):
+        self.engine.dispose()
+        shutil.rmtree(self.directory)
+
+    def reflect(self):
+        cache = ReflectionCache(self.path)
+        metadata = cache.reflect(self.engine)
+        return cache, metadata
+
+    def test_hit(self):
+        cache, metadata = self.reflect()
+        self.assertEqual(cache.status, 'full')
+        cache, cached = self.reflect()
+        self.assertEqual((cache.status, cache.inspected), ('hit', []))
+        self.assertEqual(sorted(cached.tables), ['album', 'artist', 'genre', 'track'])
+        self.assertEqual([fk.column.table.name for fk in cached.tables['track'].foreign_keys], ['album'])
+
+    def test_changed_table_and_referencing_tables(self):
+        self.reflect()
+        self.engine.execute('ALTER TABLE artist ADD COLUMN country VARCHAR(50)')
+        cache, metadata = self.reflect()
+        self.assertEqual((cache.status, cache.inspected), ('partial', ['artist']))
+        self.assertIn('country', metadata.tables['artist'].c)
+        self.assertIs(list(metadata.tables['album'].foreign_keys)[0].column.table, metadata.tables['artist'])
+        self.assertIs(list(metadata.tables['track'].foreign_keys)[0].column.table, metadata.tables['album'])
+
+    def test_same_as_reflect(self):
+        reflected = MetaData()
+        reflected.reflect(bind=self.engine)
+        cached = self.reflect()[1]
+        for name, table in reflected.tables.items():
+            self.assertEqual([(column.name, repr(column.type), column.nullable, column.primary_key)
+                              for column in table.c],
+                             [(column.name, repr(column.type), column.nullable, column.primary_key)
+                              for column in cached.tables[name].c])
+            self.assertEqual(sorted(fk.target_fullname for fk in table.foreign_keys),
+                             sorted(fk.target_fullname for fk in cached.tables[name].foreign_keys))
+
+    def test_only(self):
+        self.reflect()
+        metadata = ReflectionCache(self.path).reflect(self.engine, only=['album'])
+        self.assertEqual(sorted(metadata.tables), ['album', 'artist'])
+        self.assertEqual(str(metadata.tables['album'].join(metadata.tables['artist']).onclause),
+                         'artist.id = album.artist_id')
+
+    def test_new_and_dropped_tables(self):
+        self.reflect()
+        self.engine.execute('CREATE INDEX ix_genre_name ON genre (name)')
+        self.engine.execute('CREATE TABLE label (id INTEGER PRIMARY KEY)')
+        self.engine.execute('DROP TABLE track')
+        cache, metadata = self.reflect()
+        self.assertEqual(cache.inspected, ['genre', 'label'])
+        self.assertEqual(sorted(metadata.tables), ['album', 'artist', 'genre', 'label'])
+        self.assertEqual([index.name for index in metadata.tables['genre'].indexes], ['ix_genre_name'])
+        self.assertEqual(self.reflect()[0].status, 'hit')
+
+    def test_other_database_same_schema_version(self):
+        self.reflect()
+        other = create_engine('sqlite:///' + os.path.join(self.directory, 'other.db'))
+        for sql in ('CREATE TABLE invoice (id INTEGER PRIMARY KEY, total NUMERIC(10, 2))',
+                    'CREATE TABLE customer (id INTEGER PRIMARY KEY)',
+                    'CREATE TABLE employee (id INTEGER PRIMARY KEY)',
+                    'CREATE TABLE playlist (id INTEGER PRIMARY KEY)'):
+            other.execute(sql)
+        self.assertEqual(other.execute('PRAGMA schema_version').scalar(),
+                         self.engine.execute('PRAGMA schema_version').scalar())
+        cache = ReflectionCache(self.path)
+        metadata = cache.reflect(other)
+        other.dispose()
+        self.assertEqual(cache.status, 'partial')
+        self.assertEqual(sorted(metadata.tables), ['customer', 'employee', 'invoice', 'playlist'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,204 @@
+import unittest
+from unittest import mock
+
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm.exc import StaleDataError
+
+from sqlalchemy_core import shipping
+from sqlalchemy_orm import shipping as orm_shipping
+from sqlalchemy_orm.models import Base, Cookie, LineItems, Order, User
+
+
+def other_shipper(engine, times):
+    """Bump the version_id of every cookie just before the next times cookie UPDATEs, as another shipper would.
+
+    The bump is made in the shipper's own transaction, so it is rolled back with the conflicting attempt.
+    """
+    left = [times]
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def bump(conn, cursor, statement, parameters, context, executemany):
+        if left[0] and statement.startswith('UPDATE cookies'):
+            left[0] -= 1
+            cursor.connection.execute('UPDATE cookies SET version_id = version_id + 1')
+
+    return left
+
+
+class CoreShippingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine('sqlite:///:memory:')
+        shipping.metadata.create_all(self.engine)
+        self.conn = self.engine.connect()
+        self.conn.execute(shipping.users.insert(), username='cookiemon', email_address='mon@cookie.com',
+                          phone='111-111-1111', password='password')
+        self.conn.execute(shipping.cookies.insert(), [{'cookie_name': 'chocolate chip', 'quantity': 12},
+                                                      {'cookie_name': 'dark chocolate chip', 'quantity': 1}])
+        self.conn.execute(shipping.orders.insert(), [{'order_id': 1, 'user_id': 1}, {'order_id': 2, 'user_id': 1}])
+        self.conn.execute(shipping.line_items.insert(), [{'order_id': 1, 'cookie_id': 1, 'quantity': 9},
+                                                         {'order_id': 2, 'cookie_id': 2, 'quantity': 2}])
+
+    def tearDown(self):
+        self.conn.close()
+
+    def stock(self):
+        c = shipping.cookies.c
+        return self.conn.execute(select([c.quantity, c.version_id]).order_by(c.cookie_id)).fetchall()
+
+    def shipped(self, order_id):
+        o = shipping.orders.c
+        return self.conn.execute(select([o.shipped]).where(o.order_id == order_id)).scalar()
+
+
+class TestShipOrders(CoreShippingTest):
+
+    def setUp(self):
+        super().setUp()
+        self.conn.execute(shipping.orders.insert(), [{'order_id': 3, 'user_id': 1}, {'order_id': 4, 'user_id': 1}])
+        self.conn.execute(shipping.line_items.insert(), [{'order_id': 3, 'cookie_id': 1, 'quantity': 2},
+                                                         {'order_id': 3, 'cookie_id': 2, 'quantity': 1},
+                                                         {'order_id': 4, 'cookie_id': 1, 'quantity': 2}])
+
+    def test_partial_batch(self):
+        result = shipping.ship_orders([1, 2, 3, 4, 9], self.conn)
+        # order 2 wants 2 of the 1 dark chocolate chip, order 4 the chocolate chips left after 1 and 3
+        self.assertEqual(result, shipping.Shipment([1, 3], [2, 4], [9], None))
+        self.assertEqual(self.stock(), [(1, 2), (0, 2)])
+        self.assertEqual([self.shipped(order_id) for order_id in range(1, 5)], [True, False, True, False])
+
+    def test_orders_shipped_twice(self):
+        self.assertEqual(shipping.ship_orders([1], self.conn).shipped, [1])
+        result = shipping.ship_orders([1, 4], self.conn)
+        self.assertEqual(result, shipping.Shipment([4], [], [1], None))
+        self.assertEqual(self.stock()[0], (1, 3))
+
+    def test_stock_changed_underneath(self):
+        read = self.conn.execute
+
+        def stale_stock(statement, *args, **kwargs):
+            # the stock is read, then another shipper takes the chocolate chips
+            result = read(statement, *args, **kwargs)
+            if str(statement).startswith('SELECT ship_batch.order_id, line_items.cookie_id'):
+                read(shipping.cookies.update().where(shipping.cookies.c.cookie_id == 1).values(quantity=1))
+            return result
+
+        with mock.patch.object(self.conn, 'execute', stale_stock):
+            result = shipping.ship_orders([1, 3], self.conn)
+        self.assertEqual(result.shipped, [])
+        self.assertIsInstance(result.error, IntegrityError)
+        self.assertFalse(self.shipped(1))
+        self.assertEqual(self.stock(), [(12, 1), (1, 1)])
+        # nothing is left behind: the batch ships once the stock is back
+        self.assertEqual(shipping.ship_orders([1, 3], self.conn).shipped, [1, 3])
+
+    def test_other_errors_roll_back_and_raise(self):
+        with mock.patch.object(shipping, 'update', side_effect=RuntimeError('boom')):
+            with self.assertRaises(RuntimeError):
+                shipping.ship_orders([1, 3], self.conn)
+        self.assertFalse(self.conn.in_transaction())
+        self.assertEqual(shipping.ship_orders([1, 3], self.conn).shipped, [1, 3])
+
+    def test_empty_batch(self):
+        self.assertEqual(shipping.ship_orders([], self.conn), shipping.Shipment([], [], [], None))
+
+
+class TestShipItOptimisticCore(CoreShippingTest):
+
+    def test_ships_without_conflict(self):
+        stats = {}
+        self.assertTrue(shipping.ship_it_optimistic(1, self.conn, stats=stats))
+        self.assertEqual(stats, {})
+        self.assertEqual(self.stock(), [(3, 2), (1, 1)])
+        self.assertTrue(self.shipped(1))
+
+    def test_retries_after_conflict(self):
+        other_shipper(self.engine, 2)
+        stats = {}
+        self.assertTrue(shipping.ship_it_optimistic(1, self.conn, max_retries=2, backoff=0, stats=stats))
+        self.assertEqual(stats, {'conflicts': 2})
+        self.assertEqual(self.stock(), [(3, 2), (1, 1)])
+
+    def test_gives_up_after_max_retries(self):
+        other_shipper(self.engine, 10)
+        stats = {}
+        with self.assertRaises(StaleDataError):
+            shipping.ship_it_optimistic(1, self.conn, max_retries=2, backoff=0, stats=stats)
+        self.assertEqual(stats, {'conflicts': 3})
+        self.assertEqual([quantity for quantity, _ in self.stock()], [12, 1])
+        self.assertFalse(self.shipped(1))
+
+    def test_not_enough_stock(self):
+        self.assertFalse(shipping.ship_it_optimistic(2, self.conn))
+        self.assertEqual(self.stock(), [(12, 1), (1, 1)])
+        self.assertFalse(self.shipped(2))
+
+    def test_shipped_twice(self):
+        self.assertTrue(shipping.ship_it_optimistic(1, self.conn))
+        with self.assertLogs('sqlalchemy_core.shipping'):
+            self.assertFalse(shipping.ship_it_optimistic(1, self.conn))
+        self.assertEqual(self.stock(), [(3, 2), (1, 1)])
+
+    def test_missing_order(self):
+        with self.assertLogs('sqlalchemy_core.shipping'):
+            self.assertFalse(shipping.ship_it_optimistic(9, self.conn))
+        self.assertEqual(self.stock(), [(12, 1), (1, 1)])
+
+
+class TestShipItOptimisticOrm(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine('sqlite:///:memory:')
+        Base.metadata.create_all(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+        cookiemon = User('cookiemon', 'mon@cookie.com', '111-111-1111', 'password')
+        self.cc = Cookie('chocolate chip', sku='CC01', quantity=12, unit_cost=0.50)
+        order = Order(user=cookiemon)
+        order.line_items.append(LineItems(cookie=self.cc, quantity=9, extended_cost=4.50))
+        self.session.add(order)
+        self.session.commit()
+        self.order_id = order.order_id
+
+    def tearDown(self):
+        self.session.close()
+
+    def test_retries_after_conflict(self):
+        other_shipper(self.engine, 2)
+        stats = {}
+        self.assertTrue(orm_shipping.ship_it_optimistic(self.order_id, self.session, max_retries=2, backoff=0,
+                                                        stats=stats))
+        self.assertEqual(stats, {'conflicts': 2})
+        self.assertEqual((self.cc.quantity, self.cc.version_id), (3, 2))
+
+    def test_gives_up_after_max_retries(self):
+        other_shipper(self.engine, 10)
+        stats = {}
+        with self.assertRaises(StaleDataError):
+            orm_shipping.ship_it_optimistic(self.order_id, self.session, max_retries=1, backoff=0, stats=stats)
+        self.assertEqual(stats, {'conflicts': 2})
+        self.session.expire_all()
+        self.assertEqual(self.cc.quantity, 12)
+        self.assertFalse(self.session.query(Order).get(self.order_id).shipped)
+
+    def test_shipped_twice(self):
+        self.assertTrue(orm_shipping.ship_it_optimistic(self.order_id, self.session))
+        with self.assertLogs('sqlalchemy_orm.shipping'):
+            self.assertFalse(orm_shipping.ship_it_optimistic(self.order_id, self.session))
+        self.assertEqual((self.cc.quantity, self.cc.version_id), (3, 2))
+
+    def test_shipped_by_another_session(self):
+        self.engine.execute(Order.__table__.update().values(shipped=True))
+        with self.assertLogs('sqlalchemy_orm.shipping'):
+            self.assertFalse(orm_shipping.ship_it_optimistic(self.order_id, self.session))
+        self.assertEqual(self.cc.quantity, 12)
+
+    def test_missing_order(self):
+        with self.assertLogs('sqlalchemy_orm.shipping'):
+            self.assertFalse(orm_shipping.ship_it_optimistic(self.order_id + 1, self.session))
+        self.assertEqual(self.cc.quantity, 12)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.orm import sessionmaker
+
+from sqlalchemy_orm.models import Base, Cookie
+from sqlalchemy_orm.streaming import iter_batches, stream_cookies
+
+
+class TestStreaming(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine('sqlite:///:memory:')
+        Base.metadata.create_all(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+        self.session.add_all([Cookie('cookie {}'.format(i), sku='SKU{}'.format(i), quantity=i) for i in range(10)])
+        self.session.commit()
+
+    def tearDown(self):
+        self.session.close()
+
+    def test_batches_are_detached(self):
+        seen = []
+        for batch in iter_batches(self.session.query(Cookie).order_by(Cookie.cookie_id), batch_size=4):
+            self.assertTrue(all(inspect(cookie).persistent for cookie in batch))
+            self.assertEqual(len(self.session.identity_map), 0)
+            seen.append(batch)
+        self.assertEqual([len(batch) for batch in seen], [4, 4, 2])
+        self.assertTrue(all(inspect(cookie).detached for batch in seen for cookie in batch))
+        self.assertEqual(len(self.session.identity_map), 0)
+
+    def test_stops_early(self):
+        cookies = []
+        for cookie in stream_cookies(self.session, batch_size=4):
+            cookies.append(cookie)
+            if len(cookies) == 6:
+                break
+        self.assertEqual([cookie.quantity for cookie in cookies], list(range(6)))
+        self.assertTrue(all(inspect(cookie).detached for cookie in cookies))
+
+    def test_consumer_raises(self):
+        batches = iter_batches(self.session.query(Cookie), batch_size=4)
+        with self.assertRaises(ZeroDivisionError):
+            for batch in batches:
+                1 / 0
+        batches.close()
+        self.assertTrue(all(inspect(cookie).detached for cookie in batch))
+
+    def test_sees_pending_changes(self):
+        self.session.add(Cookie('oatmeal raisin', sku='EWW01', quantity=100))
+        self.session.query(Cookie).get(1).quantity = 50
+        quantities = [cookie.quantity for cookie in stream_cookies(self.session, batch_size=4)]
+        self.assertEqual(quantities, [50] + list(range(1, 10)) + [100])
+        self.session.rollback()
+        self.assertEqual(self.session.query(Cookie).count(), 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
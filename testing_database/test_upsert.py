@@ -0,0 +1,102 @@
+import time
+import unittest
+from decimal import Decimal
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import sessionmaker
+
+from sqlalchemy_core.inventory_totals import verify
+from sqlalchemy_core.upsert import _postgresql_upsert, _set_rules, upsert
+from sqlalchemy_orm.models import Base, Cookie, User, inventory_totals
+
+
+def cookie_rows(numbers, quantity=10, unit_cost=0.5):
+    return [{'cookie_name': 'cookie {}'.format(i), 'cookie_sku': 'SKU{}'.format(i), 'quantity': quantity,
+             'unit_cost': unit_cost} for i in numbers]
+
+
+class TestUpsert(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine('sqlite:///:memory:')
+        Base.metadata.create_all(self.engine)
+        self.conn = self.engine.connect()
+        self.cookies = Cookie.__table__
+
+    def tearDown(self):
+        self.conn.close()
+
+    def cookie(self, sku):
+        return self.conn.execute(select([self.cookies]).where(self.cookies.c.cookie_sku == sku)).first()
+
+    def test_insert_then_update_in_chunks(self):
+        self.assertEqual(upsert(self.conn, Cookie, cookie_rows(range(300)), variables=200), (300, 300, 0, 2))
+        stats = upsert(self.conn, Cookie, cookie_rows(range(200, 500), quantity=3, unit_cost=0.75),
+                       rules={'quantity': 'add'}, variables=200)
+        self.assertEqual(stats, (300, 200, 100, 2))
+        self.assertEqual(self.cookie('SKU250')[4:], (13, Decimal('0.75'), 2))
+        self.assertEqual(self.cookie('SKU450')[4:], (3, Decimal('0.75'), 1))
+        self.assertEqual(self.cookie('SKU10')[4:], (10, Decimal('0.50'), 1))
+        self.assertEqual(verify(self.conn, self.cookies, inventory_totals), {})
+
+    def test_repeated_keys_apply_in_order(self):
+        rows = cookie_rows([1, 2, 1], quantity=4)
+        self.assertEqual(upsert(self.conn, self.cookies, rows, rules={'quantity': 'add'}), (3, 2, 1, 2))
+        self.assertEqual(self.cookie('SKU1').quantity, 8)
+
+    def test_failure_keeps_the_sessions_changes(self):
+        session = sessionmaker(bind=self.engine)()
+        session.add(User('cakeeater', 'cakeeater@cake.com', '222-222-2222', 'password'))
+        session.flush()
+        session.add(Cookie('chocolate chip', sku='SKU1', quantity=1))
+        with self.assertRaises(ValueError):
+            upsert(session, Cookie, cookie_rows([1, 2]) + [{'cookie_sku': 'SKU3'}])
+        session.commit()
+        self.assertEqual(session.query(User.username).all(), [('cakeeater',)])
+        self.assertEqual(session.query(Cookie.cookie_sku, Cookie.quantity).all(), [('SKU1', 1)])
+        self.assertEqual(upsert(session, Cookie, cookie_rows([1, 2]), rules={'quantity': 'add'}), (2, 1, 1, 1))
+        session.rollback()
+        self.assertEqual(session.query(Cookie.cookie_sku, Cookie.quantity).all(), [('SKU1', 1)])
+        session.close()
+
+    def test_users_keep_created_on_and_bump_updated_on(self):
+        session = sessionmaker(bind=self.engine)()
+        row = {'username': 'cookiemon', 'email_address': 'mon@cookie.com', 'phone': '111-111-1111',
+               'password': 'password'}
+        self.assertEqual(upsert(session, User, [row]), (1, 1, 0, 1))
+        session.commit()
+        cookiemon = session.query(User).one()
+        created_on, updated_on = cookiemon.created_on, cookiemon.updated_on
+        time.sleep(0.01)
+        self.assertEqual(upsert(session, User, [dict(row, email_address='cookiemon@cookie.com')]), (1, 0, 1, 1))
+        session.commit()
+        session.refresh(cookiemon)
+        self.assertEqual(cookiemon.email_address, 'cookiemon@cookie.com')
+        self.assertEqual(cookiemon.created_on, created_on)
+        self.assertGreater(cookiemon.updated_on, updated_on)
+        session.close()
+
+    def test_rules_and_errors(self):
+        upsert(self.conn, Cookie, cookie_rows([1]))
+        upsert(self.conn, Cookie, cookie_rows([1], quantity=2, unit_cost=9),
+               rules={'unit_cost': 'keep', 'quantity': lambda existing, new: existing - new})
+        self.assertEqual(self.cookie('SKU1')[4:6], (8, Decimal('0.50')))
+        with self.assertRaises(ValueError):
+            upsert(self.conn, Cookie, cookie_rows([1]), rules={'flavour': 'keep'})
+        with self.assertRaises(ValueError):
+            upsert(self.conn, Cookie, [{'cookie_name': 'no sku'}])
+        self.assertEqual(upsert(self.conn, Cookie, []), (0, 0, 0, 0))
+
+    def test_postgresql_statement(self):
+        rules = _set_rules(self.cookies, self.cookies.c.version_id, {'cookie_sku', 'quantity'},
+                           (self.cookies.c.cookie_sku,), {'quantity': 'add'})
+        sql = str(_postgresql_upsert(self.cookies, (self.cookies.c.cookie_sku,), rules).compile(
+            dialect=postgresql.dialect()))
+        self.assertIn('ON CONFLICT (cookie_sku) DO UPDATE SET', sql)
+        self.assertIn('quantity = (coalesce(cookies.quantity, %(coalesce_1)s) + excluded.quantity)', sql)
+        self.assertIn('version_id = (cookies.version_id + %(version_id_1)s)', sql)
+
+
+if __name__ == '__main__':
+    unittest.main()
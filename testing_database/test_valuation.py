@@ -0,0 +1,57 @@
+import unittest
+
+import numpy as np
+from sqlalchemy import create_engine
+
+from sqlalchemy_core.inventory_totals import recompute
+from sqlalchemy_core.valuation import value_inventory, value_line_items, group_sum
+from testing_database.datagen import CookieShopData, load
+from testing_database.db import DataAccessLayer
+
+
+class TestValuation(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine('sqlite:///:memory:')
+        self.dal = DataAccessLayer()
+        self.conn = self.engine.connect()
+        self.dal.metadata.create_all(self.conn)
+        load(self.conn, self.dal.metadata, CookieShopData(users=50, cookies=40, orders=200))
+
+    def tearDown(self):
+        self.conn.close()
+
+    def test_inventory_matches_sql(self):
+        inventory = value_inventory(self.conn, self.dal.cookies, chunk_size=7)
+        self.assertEqual(inventory.totals, recompute(self.conn, self.dal.cookies))
+        self.assertEqual(len(inventory.cookie_id), 40)
+        cookies = self.dal.cookies
+        row = self.conn.execute(cookies.select().where(cookies.c.cookie_id == 3)).first()
+        self.assertEqual(inventory.value_cents[inventory.cookie_id == 3][0], int(row.quantity * row.unit_cost * 100))
+
+    def test_nulls_count_as_zero(self):
+        cookies = self.dal.cookies
+        self.conn.execute(cookies.insert().values(cookie_id=41, quantity=None, unit_cost=None))
+        self.conn.execute(cookies.insert().values(cookie_id=42, cookie_name='x', quantity=3, unit_cost=None))
+        inventory = value_inventory(self.conn, cookies, chunk_size=7)
+        self.assertEqual(inventory.totals, recompute(self.conn, cookies))
+        self.assertEqual(inventory.value_cents[-2:].tolist(), [0, 0])
+
+    def test_line_items(self):
+        line_items = self.dal.line_items
+        self.conn.execute(line_items.update().where(line_items.c.line_items_id.in_([5, 9])).values(
+            extended_cost=line_items.c.extended_cost + 0.25))
+        lines = value_line_items(self.conn, line_items, self.dal.cookies, chunk_size=10)
+        self.assertEqual(lines.mismatched.tolist(), [5, 9])
+        self.assertEqual(lines.drift_cents.tolist(), [25, 25])
+        self.assertEqual(lines.recorded_cents - lines.expected_cents, 50)
+        self.assertEqual(lines.order_id.tolist(), list(range(1, 201)))
+        self.assertEqual(int(lines.order_cents.sum()), lines.expected_cents)
+
+    def test_group_sum(self):
+        keys, sums = group_sum(np.array([3, 1, 3, 2, 1]), np.array([1, 2, 3, 4, 5], dtype=np.int64))
+        self.assertEqual((keys.tolist(), sums.tolist()), ([1, 2, 3], [7, 4, 4]))
+
+
+if __name__ == '__main__':
+    unittest.main()